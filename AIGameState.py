@@ -1,19 +1,127 @@
 import numpy as np
 from ship import MoveOutcome
+from rewardFunction import GetMoveOutcomesOfRound
+
+# the latest maxSeqLength state vectors in a preallocated array, every vector is written twice
+# (slot and slot + maxSeqLength) so the window is always one contiguous slice
+class StateVectorRing:
+	def __init__(self, maxSeqLength, stateDimension, dtype=None):
+		if dtype is None:
+			dtype = np.float32
+		self.maxSeqLength = maxSeqLength
+		self.stateDimension = stateDimension
+		self.vectors = np.zeros((2 * self.maxSeqLength, self.stateDimension), dtype=dtype)
+		self.numAppended = 0
+	
+	def Clear(self):
+		self.vectors[:] = 0
+		self.numAppended = 0
+	
+	def __len__(self):
+		return min(self.numAppended, self.maxSeqLength)
+	
+	def GetHead(self):
+		return (self.numAppended - 1) % self.maxSeqLength
+	
+	def Append(self, stateVector):
+		slot = self.numAppended % self.maxSeqLength
+		self.vectors[slot] = stateVector
+		self.vectors[slot + self.maxSeqLength] = stateVector
+		self.numAppended += 1
+	
+	# appends a copy of the latest vector to be patched with SetLatestValues
+	def AppendLatestCopy(self):
+		if self.numAppended < 1:
+			raise Exception('StateVectorRing has no vector to copy.')
+		self.Append(self.vectors[self.GetHead()])
+	
+	def SetLatestValues(self, indices, values):
+		head = self.GetHead()
+		self.vectors[head, indices] = values
+		self.vectors[head + self.maxSeqLength, indices] = values
+	
+	def GetLatest(self):
+		return self.vectors[self.GetHead()]
+	
+	# (maxSeqLength, stateDimension) view, oldest first and zero rows before the first vectors of a game.
+	# the view is overwritten by the next append, copy what must outlive it
+	def GetWindow(self):
+		start = self.GetHead() + 1 if self.numAppended > 0 else 0
+		return self.vectors[start:start + self.maxSeqLength]
+
+# raw form of a state kept in the replay buffer instead of its state vector:
+#	[rows, cols, alive ships, pieces been hit, outcome grid padded to maxBoardCells] as uint8
+# a record of a state window is the records of its maxSeqLength states, oldest first, all zero before
+# the first states of a game. state vectors are only built when a batch of records is decoded
+class StateRecordCodec:
+	def __init__(self, normedBoard, maxSeqLength, maxBoardCells=None):
+		if maxBoardCells is None:
+			maxBoardCells = normedBoard.normedBoardPositions
+		self.normedBoard = normedBoard
+		self.maxSeqLength = maxSeqLength
+		self.maxBoardCells = maxBoardCells
+		self.headerLength = 4
+		self.stateRecordLength = self.headerLength + self.maxBoardCells
+		self.oneHotLength = self.normedBoard.GetOneHotLength()
+		self.stateDimension = self.oneHotLength + 2
+	
+	def GetRecordLength(self):
+		return self.maxSeqLength * self.stateRecordLength
+	
+	def EncodeState(self, moveOutcomes, aliveShips, piecesBeenHit, stateRecord=None):
+		rows, cols = moveOutcomes.shape
+		if rows * cols > self.maxBoardCells or max(rows, cols, aliveShips, piecesBeenHit) > 255:
+			raise Exception('StateRecordCodec cannot store a {}x{} board with {} alive ships and {} pieces hit.'.format(rows, cols, aliveShips, piecesBeenHit))
+		if stateRecord is None:
+			stateRecord = np.zeros(self.stateRecordLength, dtype=np.uint8)
+		stateRecord[:self.headerLength] = (rows, cols, aliveShips, piecesBeenHit)
+		stateRecord[self.headerLength:self.headerLength + rows * cols] = moveOutcomes.ravel()
+		return stateRecord
+	
+	def GetCellIndex(self, row, col, cols):
+		return self.headerLength + row * cols + col
+	
+	def GetCounterIndices(self):
+		return [2, 3]
+	
+	# (N, record length) uint8 records into the (N, maxSeqLength * state dimension) model input
+	def DecodeStates(self, records):
+		records = np.asarray(records, dtype=np.uint8)
+		numRecords = records.shape[0]
+		stateRecords = records.reshape((numRecords * self.maxSeqLength, self.stateRecordLength))
+		stateVectors = np.zeros((len(stateRecords), self.stateDimension), dtype=np.float32)
+		# states are grouped by board shape, records of empty window slots stay zero
+		boardShapes = stateRecords[:,0].astype(np.int64) * 256 + stateRecords[:,1]
+		for boardShape in np.unique(boardShapes[stateRecords[:,0] > 0]):
+			rows, cols = int(boardShape) // 256, int(boardShape) % 256
+			stateIndices = np.flatnonzero(boardShapes == boardShape)
+			shapeRecords = stateRecords[stateIndices]
+			moveOutcomesBatch = shapeRecords[:,self.headerLength:self.headerLength + rows * cols].reshape((len(stateIndices), rows, cols))
+			shapeVectors = np.zeros((len(stateIndices), self.stateDimension), dtype=np.float32)
+			self.normedBoard.EncodeMoveOutcomesBatch(moveOutcomesBatch, shapeVectors[:,:self.oneHotLength])
+			shapeVectors[:,self.oneHotLength:] = shapeRecords[:,2:4]
+			stateVectors[stateIndices] = shapeVectors
+		return stateVectors.reshape((numRecords, self.maxSeqLength * self.stateDimension))
 
 class AIGameState:
-	def __init__(self, normedBoard, maxSeqLength):
+	def __init__(self, normedBoard, maxSeqLength, maxBoardCells=None):
 		self.normedBoard = normedBoard
 		self.boardDimensions = self.normedBoard.GetBoardDimensions()
 		self.maxSeqLength = maxSeqLength
 		self.maxMoveOutcome = len(MoveOutcome) + 1 # add 1 for empty hit result
+		self.stateVectors = StateVectorRing(self.maxSeqLength, self.normedBoard.GetOneHotLength() + 2)
+		self.stateRecordCodec = StateRecordCodec(self.normedBoard, self.maxSeqLength, maxBoardCells)
+		self.stateRecords = StateVectorRing(self.maxSeqLength, self.stateRecordCodec.stateRecordLength, dtype=np.uint8)
 		self.ClearState()
 		
 	def ClearState(self):
 		self.stateSeq = []
-		self.stateSeqVectors = []
+		self.stateVectors.Clear()
+		self.stateRecords.Clear()
 		self.rewards = []
 		self.numModelMovesAt = {}
+		self.moveOutcomes = None
+		self.roundMoveOutcomes = np.zeros((len(MoveOutcome)))
 	
 	def GetMovesAtPosition(self, position):
 		if not position in self.numModelMovesAt:
@@ -28,44 +136,86 @@ class AIGameState:
 			self.numModelMovesAt[position] = 1
 		
 	def AppendState(self, state):		
-		if len(self.stateSeqVectors) > self.maxSeqLength and len(self.stateSeqVectors) > 1:
-			self.stateSeqVectors = self.stateSeqVectors[1:]
+		if len(self.stateSeq) > self.maxSeqLength and len(self.stateSeq) > 1:
 			self.stateSeq = self.stateSeq[1:]
+		if state.isDelta:
+			self.AppendStateDelta(state)
+		else:
+			if not self.moveOutcomes is None and self.moveOutcomes.shape == state.moveOutcomes.shape:
+				self.roundMoveOutcomes = self.GetRoundMoveOutcomeVector([state.moveOutcomes, self.moveOutcomes])
+			else:
+				self.roundMoveOutcomes = self.GetRoundMoveOutcomeVector([state.moveOutcomes])
+			self.moveOutcomes = np.array(state.moveOutcomes)
+			self.stateVectors.Append(self.CreateStateVector(state))
+			self.stateRecords.Append(self.stateRecordCodec.EncodeState(state.moveOutcomes, state.aliveShips, state.piecesBeenHit))
 		self.stateSeq.append(state)
-		stateVec = self.CreateStateVector(state)
-		self.stateSeqVectors.append(stateVec)
 	
-	def CreateMoveOutcomesVector(self, moveOutcomes):
-		normalizedMoveOutcomes = np.zeros((self.boardDimensions[0],self.boardDimensions[1],self.maxMoveOutcome))
+	# appends a copy of the latest state vector with only what the delta changed re-encoded
+	def AppendStateDelta(self, state):
+		if self.moveOutcomes is None or len(self.stateVectors) < 1:
+			raise Exception('AIGameState received a state delta before a full state.')
+		oneHotLength = self.normedBoard.GetOneHotLength()
+		self.roundMoveOutcomes = np.zeros((len(MoveOutcome)))
+		self.stateVectors.AppendLatestCopy()
+		self.stateRecords.AppendLatestCopy()
 		
-		for rowNumber in range(moveOutcomes.shape[0]):
-			for colNumber in range(moveOutcomes.shape[1]):
-				moveOutcome = int(moveOutcomes[rowNumber,colNumber])
-				normalizedRow, normalizedCol = self.normedBoard.NormalizeBoardPosition(rowNumber, colNumber)
-				normalizedMoveOutcomes[normalizedRow,normalizedCol,moveOutcome] = 1		
-		return np.array(normalizedMoveOutcomes).flatten()
+		if not state.changedLocation is None:
+			row, col = state.changedLocation[0], state.changedLocation[1]
+			previousMoveOutcome = int(self.moveOutcomes[row,col])
+			changedMoveOutcome = int(state.changedMoveOutcome)
+			if changedMoveOutcome != previousMoveOutcome:
+				self.roundMoveOutcomes[changedMoveOutcome] += 1
+				self.moveOutcomes[row,col] = changedMoveOutcome
+				self.stateRecords.SetLatestValues([self.stateRecordCodec.GetCellIndex(row, col, self.moveOutcomes.shape[1])], [changedMoveOutcome])
+				if self.normedBoard.IsOneHotIndexMapInjective(self.moveOutcomes.shape):
+					oneHotIndex = self.normedBoard.GetOneHotIndexMap(self.moveOutcomes.shape)[row,col]
+					self.stateVectors.SetLatestValues([oneHotIndex + previousMoveOutcome, oneHotIndex + changedMoveOutcome], [0, 1])
+				else:
+					self.stateVectors.SetLatestValues(slice(0, oneHotLength), self.normedBoard.EncodeMoveOutcomes(self.moveOutcomes))
+		
+		self.stateVectors.SetLatestValues([oneHotLength, oneHotLength + 1], [state.aliveShips, state.piecesBeenHit])
+		self.stateRecords.SetLatestValues(self.stateRecordCodec.GetCounterIndices(), [state.aliveShips, state.piecesBeenHit])
+	
+	# latest maxSeqLength state vectors, oldest first, see StateVectorRing.GetWindow
+	def GetStateWindow(self):
+		return self.stateVectors.GetWindow()
+	
+	# copy of the latest state window in its raw form, see StateRecordCodec
+	def GetStateRecord(self):
+		return self.stateRecords.GetWindow().flatten()
+	
+	def GetStateRecordCodec(self):
+		return self.stateRecordCodec
+	
+	# counts of the outcomes that changed with the latest state
+	def GetLatestRoundMoveOutcomeVector(self):
+		return self.roundMoveOutcomes
+	
+	def CreateMoveOutcomesVector(self, moveOutcomes):
+		return self.normedBoard.EncodeMoveOutcomes(moveOutcomes)
 	
 	def CreateStateVector(self, state):
 		if state is None or state.moveOutcomes is None or state.moveOutcomes.shape[0] < 1:
 			raise Exception('AIGameState CreateStateVector called on invalid state data.')
 		self.normedBoard.SetActualBoardDimensions(state.moveOutcomes.shape)
-		moveOutcomeVector = self.CreateMoveOutcomesVector(state.moveOutcomes)
-		numericalStateVector = np.array([state.aliveShips, state.piecesBeenHit])
-		stateVector = np.append(moveOutcomeVector, numericalStateVector)
+		oneHotLength = self.normedBoard.GetOneHotLength()
+		stateVector = np.zeros(oneHotLength + 2, dtype=np.float32)
+		self.normedBoard.EncodeMoveOutcomes(state.moveOutcomes, stateVector[:oneHotLength])
+		stateVector[oneHotLength] = state.aliveShips
+		stateVector[oneHotLength + 1] = state.piecesBeenHit
 		return stateVector
 	
+	# state vectors of N states given as an (N, rows, cols) outcome stack and N alive ship / hit piece counts
+	def CreateStateVectorsBatch(self, moveOutcomesBatch, aliveShips, piecesBeenHit):
+		moveOutcomesBatch = np.asarray(moveOutcomesBatch)
+		oneHotLength = self.normedBoard.GetOneHotLength()
+		stateVectors = np.zeros((moveOutcomesBatch.shape[0], oneHotLength + 2), dtype=np.float32)
+		self.normedBoard.EncodeMoveOutcomesBatch(moveOutcomesBatch, stateVectors[:,:oneHotLength])
+		stateVectors[:,oneHotLength] = aliveShips
+		stateVectors[:,oneHotLength + 1] = piecesBeenHit
+		return stateVectors
+	
 	def GetRoundMoveOutcomeVector(self, stateOfRounds):
-		moveOutcomesOfRound = np.zeros((len(MoveOutcome)))
-		
 		if len(stateOfRounds) > 1 and stateOfRounds[0].shape != stateOfRounds[1].shape:
 			raise Exception('AIGameState GetRoundMoveOutcomeVector rounds must have the same shape.')
-		
-		rows = stateOfRounds[0].shape[0]
-		columns = stateOfRounds[0].shape[1]
-		
-		for row in range(rows):
-			for col in range(rows):
-				round0_result = int(stateOfRounds[0][row,col])
-				if len(stateOfRounds) < 2 or round0_result != int(stateOfRounds[1][row,col]):
-					moveOutcomesOfRound[round0_result] += 1
-		return moveOutcomesOfRound
\ No newline at end of file
+		return GetMoveOutcomesOfRound(stateOfRounds[0], stateOfRounds[1] if len(stateOfRounds) > 1 else None)
\ No newline at end of file
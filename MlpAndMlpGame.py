@@ -5,6 +5,7 @@ from board import Board
 from game import Game
 from aiPlayer import AIPlayer
 from mlpModel import MLPAIModel
+from mlpModelTrainer import MLPModelTrainer
 from LogOutputter import LogOutputter
 
 import keras.backend as K
@@ -12,26 +13,33 @@ import tensorflow as tf
 import threading
 
 mlpLogs = [ LogOutputter('mlpModel_0_log.txt'), LogOutputter('mlpModel_1_log.txt') ]
+trainerLog = LogOutputter('mlpModelTrainer_log.txt')
 
 mainThreadSession = tf.Session()
 K.set_session(mainThreadSession)
 
 modelBuildLock = threading.Lock()
 with mainThreadSession.graph.as_default():
-	mlpModel_0 = MLPAIModel(0, modelBuildLock, mlpLogs[0], outputDiagnostics=True)
-	aiPlayer_0 = AIPlayer(mlpModel_0, mlpLogs[0])
+	# both models play with the weights of the one trainer and feed it their experiences
+	trainer = MLPModelTrainer(modelBuildLock, trainerLog, mainThreadSession)
+	mlpModel_0 = MLPAIModel(0, modelBuildLock, mlpLogs[0], outputDiagnostics=True, trainer=trainer)
+	aiPlayer_0 = AIPlayer(mlpModel_0, mlpLogs[0], sendStateDeltas=True)
 
-	mlpModel_1 = MLPAIModel(1, modelBuildLock, mlpLogs[1], outputDiagnostics=True)
-	aiPlayer_1 = AIPlayer(mlpModel_1, mlpLogs[1])
+	mlpModel_1 = MLPAIModel(1, modelBuildLock, mlpLogs[1], outputDiagnostics=True, trainer=trainer)
+	aiPlayer_1 = AIPlayer(mlpModel_1, mlpLogs[1], sendStateDeltas=True)
 
 	players = [aiPlayer_0, aiPlayer_1]
 	numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
 	boardSize = Vector2(10, 10)
 
+	mainThreadSession.run(tf.global_variables_initializer())
+	trainer.SignalModelBuilding()
+
 	while True:
 		aiPlayer_0.NewGame()
 		aiPlayer_1.NewGame()
 		board = Board(boardSize, numShipsOfSize, players)
-		game = Game(board)
-		mainThreadSession.run(tf.global_variables_initializer())
-		game.Play()
\ No newline at end of file
+		game = Game(board, headless=True)
+		gameResult = game.Play(trustedPlacement=True)
+		for mlpLog in mlpLogs:
+			mlpLog.Output('Game result: {}'.format(gameResult))
\ No newline at end of file
@@ -0,0 +1,15 @@
+import sys
+from vector2 import Vector2
+from selfPlayActors import RunRemoteSelfPlayActor
+
+# usage: MlpRemoteActor.py <learner host> <learner port> <actor number> [number of games]
+# actor numbers must be unique among the actors of one learner, local actors of the learner use 0 to n-1
+if __name__ == '__main__':
+	if len(sys.argv) < 4:
+		raise Exception('usage: MlpRemoteActor.py <learner host> <learner port> <actor number> [number of games]')
+	numGames = None
+	if len(sys.argv) > 4:
+		numGames = int(sys.argv[4])
+	numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
+	boardSize = Vector2(10, 10)
+	RunRemoteSelfPlayActor((sys.argv[1], int(sys.argv[2])), int(sys.argv[3]), boardSize, numShipsOfSize, numGames=numGames)
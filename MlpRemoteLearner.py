@@ -0,0 +1,12 @@
+import sys
+from vector2 import Vector2
+from selfPlayActors import SelfPlayLearner
+
+# usage: MlpRemoteLearner.py [port] [number of local actors]
+if __name__ == '__main__':
+	port = int(sys.argv[1]) if len(sys.argv) > 1 else 5717
+	numLocalActors = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+	numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
+	boardSize = Vector2(10, 10)
+	learner = SelfPlayLearner(numLocalActors, boardSize, numShipsOfSize, serverAddress=('0.0.0.0', port))
+	learner.Run()
@@ -0,0 +1,13 @@
+import sys
+import multiprocessing
+from vector2 import Vector2
+from selfPlayActors import SelfPlayLearner
+
+# usage: MlpSelfPlayGame.py [replay buffer directory]
+if __name__ == '__main__':
+	replayBufferPath = sys.argv[1] if len(sys.argv) > 1 else None
+	numActors = max(multiprocessing.cpu_count() - 1, 1)
+	numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
+	boardSize = Vector2(10, 10)
+	learner = SelfPlayLearner(numActors, boardSize, numShipsOfSize, replayBufferPath=replayBufferPath)
+	learner.Run()
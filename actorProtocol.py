@@ -0,0 +1,242 @@
+import io
+import time
+import queue
+import socket
+import struct
+import threading
+import socketserver
+import numpy as np
+from experienceReplayBuffer import ExperiencePack
+
+# every frame is a header of (message type, payload length) followed by the payload
+#	Hello - actor number, sent once per connection
+#	Experiences - arrays of an ExperiencePack, answered with Ack
+#	Ack - latest weights version of the learner
+#	WeightsRequest - empty, answered with Weights
+#	Weights - version and weight arrays of the actor model
+MessageHello = 1
+MessageExperiences = 2
+MessageAck = 3
+MessageWeightsRequest = 4
+MessageWeights = 5
+
+frameHeader = struct.Struct('!BI')
+uintPayload = struct.Struct('!I')
+maxPayloadLength = 1 << 30
+
+def SendFrame(connection, messageType, payload=None):
+	if payload is None:
+		payload = b''
+	if len(payload) > maxPayloadLength:
+		raise Exception('Frame payload of {} bytes is too large.'.format(len(payload)))
+	connection.sendall(frameHeader.pack(messageType, len(payload)) + payload)
+
+def ReceiveExactly(connection, numBytes):
+	received = bytearray()
+	while len(received) < numBytes:
+		chunk = connection.recv(min(numBytes - len(received), 1 << 20))
+		if not chunk:
+			raise ConnectionError('Connection closed while receiving frame.')
+		received.extend(chunk)
+	return bytes(received)
+
+def ReceiveFrame(connection):
+	messageType, payloadLength = frameHeader.unpack(ReceiveExactly(connection, frameHeader.size))
+	if payloadLength > maxPayloadLength:
+		raise ConnectionError('Frame payload of {} bytes is too large.'.format(payloadLength))
+	return messageType, ReceiveExactly(connection, payloadLength)
+
+# arrays are sent in .npz form, read back without pickle so a peer cannot run code on the receiver
+def EncodeArrays(arrays):
+	payload = io.BytesIO()
+	np.savez(payload, **arrays)
+	return payload.getvalue()
+
+def DecodeArrays(payload):
+	with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+		return { name : arrays[name] for name in arrays.files }
+
+def EncodeExperiencePack(experiencePack):
+	return EncodeArrays({'keys' : np.array(experiencePack.keys, dtype=np.int64), 'states' : experiencePack.states, 'statesAfterMove' : experiencePack.statesAfterMove, 'moves' : experiencePack.moves, 'rewards' : experiencePack.rewards,
+		'rolloutLengths' : experiencePack.rolloutLengths, 'rewardRolloutSums' : experiencePack.rewardRolloutSums, 'lastStatesInRollout' : experiencePack.lastStatesInRollout})
+
+def DecodeExperiencePack(payload):
+	arrays = DecodeArrays(payload)
+	experiencePack = ExperiencePack()
+	experiencePack.keys = [ tuple(int(keyPart) for keyPart in key) for key in arrays['keys'] ]
+	experiencePack.states = arrays['states']
+	experiencePack.statesAfterMove = arrays['statesAfterMove']
+	experiencePack.moves = arrays['moves']
+	experiencePack.rewards = arrays['rewards']
+	experiencePack.rolloutLengths = arrays['rolloutLengths']
+	experiencePack.rewardRolloutSums = arrays['rewardRolloutSums']
+	experiencePack.lastStatesInRollout = arrays['lastStatesInRollout']
+	if any(len(arrays[name]) != len(experiencePack.keys) for name in ['states', 'statesAfterMove', 'moves', 'rewards', 'rolloutLengths', 'rewardRolloutSums', 'lastStatesInRollout']):
+		raise Exception('Experience frame arrays differ in length.')
+	return experiencePack
+
+def EncodeWeights(weights, version):
+	arrays = { 'weight{}'.format(weightNum) : weight for weightNum, weight in enumerate(weights) }
+	arrays['version'] = np.array(version, dtype=np.int64)
+	return EncodeArrays(arrays)
+
+def DecodeWeights(payload):
+	arrays = DecodeArrays(payload)
+	weights = [ arrays['weight{}'.format(weightNum)] for weightNum in range(len(arrays) - 1) ]
+	return weights, int(arrays['version'])
+
+class LearnerRequestHandler(socketserver.BaseRequestHandler):
+	def handle(self):
+		self.server.learnerServer.ServeConnection(self.request)
+
+class LearnerTCPServer(socketserver.ThreadingTCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+# accepts actor connections, puts their experience packs on experienceQueue and serves the
+# weights of actorWeights (a WeightsContainer). A full queue stops the server reading from the
+# actor's socket, which in turn blocks the actor's sends until the learner catches up.
+# actors may disconnect and reconnect at any time.
+class LearnerServer:
+	def __init__(self, address, experienceQueue, actorWeights, logOutputter=None):
+		self.experienceQueue = experienceQueue
+		self.actorWeights = actorWeights
+		self.logOutputter = logOutputter
+		self.stopEvent = threading.Event()
+		self.encodedWeightsLock = threading.Lock()
+		self.encodedWeights = None
+		self.encodedWeightsVersion = None
+		self.tcpServer = LearnerTCPServer(address, LearnerRequestHandler)
+		self.tcpServer.learnerServer = self
+		self.serverThread = None
+	
+	def GetAddress(self):
+		return self.tcpServer.server_address
+	
+	def Start(self):
+		self.serverThread = threading.Thread(target=self.tcpServer.serve_forever)
+		self.serverThread.daemon = True
+		self.serverThread.start()
+	
+	def Stop(self):
+		self.stopEvent.set()
+		self.tcpServer.shutdown()
+		self.tcpServer.server_close()
+		if not self.serverThread is None:
+			self.serverThread.join()
+	
+	def Log(self, message):
+		if not self.logOutputter is None:
+			self.logOutputter.Output(message)
+	
+	def ServeConnection(self, connection):
+		actorNumber = None
+		try:
+			while not self.stopEvent.is_set():
+				messageType, payload = ReceiveFrame(connection)
+				if messageType == MessageHello:
+					actorNumber = uintPayload.unpack(payload)[0]
+					self.Log('Actor {} connected'.format(actorNumber))
+				elif messageType == MessageExperiences:
+					if not self.PutExperiencePack(DecodeExperiencePack(payload)):
+						return
+					SendFrame(connection, MessageAck, uintPayload.pack(self.actorWeights.GetVersion()))
+				elif messageType == MessageWeightsRequest:
+					SendFrame(connection, MessageWeights, self.GetEncodedWeights())
+				else:
+					raise ConnectionError('Unknown message type {}.'.format(messageType))
+		except (OSError, ConnectionError) as error:
+			self.Log('Actor {} disconnected: {}'.format(actorNumber, error))
+	
+	def PutExperiencePack(self, experiencePack):
+		while not self.stopEvent.is_set():
+			try:
+				self.experienceQueue.put(experiencePack, True, 1.0)
+				return True
+			except queue.Full:
+				pass
+		return False
+	
+	# weights are encoded once per version and shared by all connections
+	def GetEncodedWeights(self):
+		with self.encodedWeightsLock:
+			weights, version = self.actorWeights.GetWeightsValues()
+			if weights is None:
+				weights = []
+			if self.encodedWeights is None or self.encodedWeightsVersion != version:
+				self.encodedWeights = EncodeWeights(weights, version)
+				self.encodedWeightsVersion = version
+			return self.encodedWeights
+
+# actor side of the protocol, experiences are sent in batches of batchSize.
+# a failed request reconnects and is sent again, so a batch may reach the learner twice after
+# a reconnect but is never lost while the actor keeps running
+class ActorClient:
+	def __init__(self, address, actorNumber, batchSize=None, reconnectDelay=None, maxReconnectAttempts=None, connectionTimeout=None):
+		if batchSize is None:
+			batchSize = 256
+		if reconnectDelay is None:
+			reconnectDelay = 1.0
+		self.address = address
+		self.actorNumber = actorNumber
+		self.batchSize = batchSize
+		self.reconnectDelay = reconnectDelay
+		self.maxReconnectAttempts = maxReconnectAttempts
+		self.connectionTimeout = connectionTimeout
+		self.connection = None
+		self.pendingExperiences = []
+		self.learnerWeightsVersion = 0
+	
+	def Connect(self):
+		self.Close()
+		connection = socket.create_connection(self.address, self.connectionTimeout)
+		connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		SendFrame(connection, MessageHello, uintPayload.pack(self.actorNumber))
+		self.connection = connection
+	
+	def Close(self):
+		if not self.connection is None:
+			try:
+				self.connection.close()
+			except OSError:
+				pass
+			self.connection = None
+	
+	def Request(self, messageType, payload, responseType):
+		attempt = 0
+		while True:
+			try:
+				if self.connection is None:
+					self.Connect()
+				SendFrame(self.connection, messageType, payload)
+				receivedType, receivedPayload = ReceiveFrame(self.connection)
+				if receivedType != responseType:
+					raise ConnectionError('Expected message type {} but received {}.'.format(responseType, receivedType))
+				return receivedPayload
+			except (OSError, ConnectionError):
+				self.Close()
+				attempt += 1
+				if not self.maxReconnectAttempts is None and attempt > self.maxReconnectAttempts:
+					raise
+				time.sleep(self.reconnectDelay)
+	
+	def AddExperiences(self, experiences):
+		self.pendingExperiences.extend(experiences)
+		if len(self.pendingExperiences) >= self.batchSize:
+			self.Flush()
+	
+	def Flush(self):
+		if len(self.pendingExperiences) < 1:
+			return
+		payload = EncodeExperiencePack(ExperiencePack(self.pendingExperiences))
+		self.learnerWeightsVersion = uintPayload.unpack(self.Request(MessageExperiences, payload, MessageAck))[0]
+		self.pendingExperiences = []
+	
+	def HasNewerWeights(self, weightsVersion):
+		return self.learnerWeightsVersion > weightsVersion
+	
+	# returns (weights, version)
+	def GetWeights(self):
+		weights, version = DecodeWeights(self.Request(MessageWeightsRequest, None, MessageWeights))
+		self.learnerWeightsVersion = max(self.learnerWeightsVersion, version)
+		return weights, version
@@ -5,7 +5,7 @@ from ship import MoveOutcome
 from iaimodel import IAIModel, AIModelState
 
 class AIPlayer(IPlayer):	
-	def __init__(self, aiModel, logOutputter, numberShipPlacementRepeats = None):			
+	def __init__(self, aiModel, logOutputter, numberShipPlacementRepeats = None, fleetSampler = None, sendStateDeltas = None):			
 		self.aiModel = aiModel
 		self.playerNumber = self.aiModel.GetPlayerNumber()
 		self.playerName = 'AIPlayer{} #{}'.format(self.aiModel.GetModelName(), self.playerNumber)
@@ -25,6 +25,12 @@ class AIPlayer(IPlayer):
 			self.numberShipPlacementRepeats = numberShipPlacementRepeats
 		else:
 			self.numberShipPlacementRepeats = 5
+		self.fleetSampler = fleetSampler
+		# after the first full state of a game only the changes are sent, the model must support AIModelState deltas
+		if sendStateDeltas is None:
+			sendStateDeltas = False
+		self.sendStateDeltas = sendStateDeltas
+		self.fullStateSent = False
 	
 	def NewGame(self):
 		self.gameNum += 1
@@ -39,6 +45,7 @@ class AIPlayer(IPlayer):
 		self.currentlyPlaying = True
 		self.didWin = False
 		self.round = 0
+		self.fullStateSent = False
 		self.aiModel.ClearState()
 	
 	def SetBoard(self, board):
@@ -54,6 +61,10 @@ class AIPlayer(IPlayer):
 		if not self.lastShipPlacement is None and self.numberShipPlacementRepeated < self.numberShipPlacementRepeats:
 			self.ships = RepeatShipPlacement(board, self, self.lastShipPlacement)
 			self.numberShipPlacementRepeated += 1
+		elif not self.fleetSampler is None:
+			self.lastShipPlacement = self.fleetSampler.GetShipOrigins()
+			self.ships = RepeatShipPlacement(board, self, self.lastShipPlacement)
+			self.numberShipPlacementRepeated = 0
 		else:
 			self.ships, self.lastShipPlacement = RandomlyPlaceShips(board, self)
 			self.numberShipPlacementRepeated = 0
@@ -67,13 +78,20 @@ class AIPlayer(IPlayer):
 		#print('AIPlayer playerMove: {}\n'.format(playerMove))
 		return playerMove
 	
-	def SendStateUpdate(self):
+	def SendStateUpdate(self, changedLocation=None):
 		state = AIModelState()
 		state.aliveShips = self.aliveShips
-		state.moveOutcomes = np.copy(self.moveOutcomes)
 		state.piecesBeenHit = self.piecesBeenHit
 		state.currentlyPlaying = self.currentlyPlaying
 		state.didWin = self.didWin
+		if self.sendStateDeltas and self.fullStateSent:
+			state.isDelta = True
+			if not changedLocation is None:
+				state.changedLocation = changedLocation
+				state.changedMoveOutcome = self.moveOutcomes[changedLocation[0],changedLocation[1]]
+		else:
+			state.moveOutcomes = np.copy(self.moveOutcomes)
+			self.fullStateSent = True
 		self.aiModel.ReceiveStateUpdate(state)
 	
 	def ReceivePlayerMoveOutcome(self, round, moveOutcome):
@@ -82,7 +100,7 @@ class AIPlayer(IPlayer):
 		moveLocation = self.playerMoves[round]
 		self.logOutputter.Output('{} - ReceivePlayerMoveOutcome {} at {}'.format(self.playerName, moveOutcome, moveLocation))
 		self.moveOutcomes[moveLocation[0],moveLocation[1]] = moveOutcome.value
-		self.SendStateUpdate()
+		self.SendStateUpdate(moveLocation)
 		
 	def GetShips(self):
 		return list(self.ships)
@@ -0,0 +1,88 @@
+import queue
+import threading
+from collections import deque
+import numpy as np
+from experienceStaging import ExperienceStaging
+
+# samples and decodes the next numPrefetchedBatches training batches on a background thread while
+# the current batch trains. the worker owns the replay buffer: new experiences and priority updates
+# are handed over with AddExperiences / UpdateBellmanDifferences, from any number of threads, and
+# applied by the worker between batches, so prefetched batches were sampled with priorities up to numPrefetchedBatches steps old.
+# anything else touching the buffer while the worker runs must hold bufferLock
+class BatchPrefetcher:
+	def __init__(self, experienceBuffer, numPrefetchedBatches=None):
+		if numPrefetchedBatches is None:
+			numPrefetchedBatches = 4
+		self.experienceBuffer = experienceBuffer
+		self.bufferLock = threading.Lock()
+		self.batchQueue = queue.Queue(numPrefetchedBatches)
+		self.experienceStaging = ExperienceStaging()
+		self.pendingBellmanDifferences = deque()
+		self.workAvailableEvent = threading.Event()
+		self.stopEvent = threading.Event()
+		self.workerThread = None
+	
+	def Start(self):
+		self.stopEvent.clear()
+		self.workerThread = threading.Thread(target=self.PrefetchThread)
+		self.workerThread.daemon = True
+		self.workerThread.start()
+	
+	def Stop(self):
+		self.stopEvent.set()
+		self.workAvailableEvent.set()
+		if not self.workerThread is None:
+			self.workerThread.join()
+			self.workerThread = None
+		self.ApplyPendingWork()
+	
+	def AddExperiences(self, experiences):
+		self.experienceStaging.AddExperiences(experiences)
+		self.workAvailableEvent.set()
+	
+	def UpdateBellmanDifferences(self, keys, bellmanDifferences):
+		self.pendingBellmanDifferences.append((keys, bellmanDifferences))
+		self.workAvailableEvent.set()
+	
+	# the next prefetched batch, None when none arrives within timeout
+	def GetBatch(self, timeout=None):
+		try:
+			return self.batchQueue.get(True, timeout)
+		except queue.Empty:
+			return None
+	
+	def ApplyPendingWork(self):
+		with self.bufferLock:
+			for experience in self.experienceStaging.Drain():
+				self.experienceBuffer[experience.key] = experience
+			while len(self.pendingBellmanDifferences) > 0:
+				keys, bellmanDifferences = self.pendingBellmanDifferences.popleft()
+				self.experienceBuffer.UpdateBellmanDifferences(keys, bellmanDifferences)
+	
+	# batches are handed over in the dtypes the model trains on
+	def SampleBatch(self):
+		with self.bufferLock:
+			if len(self.experienceBuffer) < 1:
+				return None
+			experiencesBatch = self.experienceBuffer.GetBatchMatrices()
+		experiencesBatch.states = np.asarray(experiencesBatch.states, dtype=np.float32)
+		experiencesBatch.statesAfterMove = np.asarray(experiencesBatch.statesAfterMove, dtype=np.float32)
+		experiencesBatch.rewards = np.asarray(experiencesBatch.rewards, dtype=np.float32)
+		experiencesBatch.importanceSamplingWeights = np.asarray(experiencesBatch.importanceSamplingWeights, dtype=np.float32)
+		return experiencesBatch
+	
+	def PrefetchThread(self):
+		while not self.stopEvent.is_set():
+			self.workAvailableEvent.clear()
+			self.ApplyPendingWork()
+			experiencesBatch = self.SampleBatch()
+			if experiencesBatch is None:
+				self.workAvailableEvent.wait(1.0)
+				continue
+			while not self.stopEvent.is_set():
+				try:
+					self.batchQueue.put(experiencesBatch, True, 0.1)
+					break
+				except queue.Full:
+					# keep up with new experiences while the learner is busy
+					self.ApplyPendingWork()
\ No newline at end of file
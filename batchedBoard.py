@@ -0,0 +1,92 @@
+import numpy as np
+from ship import MoveOutcome
+from shipPlacementTable import GetShipSizesToPlace, SampleFleets, GetPlacementTable
+
+# holds many independent boards as arrays:
+#	shipIds[board, x, y] - index of the ship covering the location or -1
+#	shipHealth[board, shipId] - number of healthy pieces left on the ship
+#	hitPieces[board, x, y] - ship piece at the location has been hit
+class BatchedBoard(object):
+	def __init__(self, numBoards, boardSize, numShipsOfSize):
+		self.numBoards = numBoards
+		self.boardSize = (int(boardSize[0]), int(boardSize[1]))
+		self.numShipsOfSize = dict(numShipsOfSize)
+		self.shipSizes = np.array(GetShipSizesToPlace(self.numShipsOfSize), dtype=np.int8)
+		self.numShips = len(self.shipSizes)
+		
+		if self.numShips < 1:
+			raise Exception('BatchedBoard requires at least one ship.')
+		if self.numShips > np.iinfo(np.int8).max:
+			raise Exception('BatchedBoard supports at most {} ships per board.'.format(np.iinfo(np.int8).max))
+		
+		self.shipIds = np.full((self.numBoards, self.boardSize[0], self.boardSize[1]), -1, dtype=np.int8)
+		self.shipHealth = np.zeros((self.numBoards, self.numShips), dtype=np.int8)
+		self.hitPieces = np.zeros((self.numBoards, self.boardSize[0], self.boardSize[1]), dtype=bool)
+		self.aliveShips = np.zeros(self.numBoards, dtype=np.int8)
+		self.piecesBeenHit = np.zeros(self.numBoards, dtype=np.int16)
+		self.Reset()
+	
+	def GetBoardSize(self):
+		return self.boardSize
+	
+	def GetNumShipsOfSize(self):
+		return dict(self.numShipsOfSize)
+	
+	def GetAliveShips(self):
+		return self.aliveShips
+	
+	def GetPiecesBeenHit(self):
+		return self.piecesBeenHit
+	
+	def Reset(self, boardIndices=None):
+		if boardIndices is None:
+			boardIndices = np.arange(self.numBoards)
+		boardIndices = np.asarray(boardIndices, dtype=np.int64)
+		self.shipIds[boardIndices] = -1
+		self.hitPieces[boardIndices] = False
+		self.shipHealth[boardIndices] = self.shipSizes
+		self.aliveShips[boardIndices] = self.numShips
+		self.piecesBeenHit[boardIndices] = 0
+		self.PlaceFleets(boardIndices)
+	
+	def PlaceFleets(self, boardIndices):
+		fleets = SampleFleets(self.boardSize, self.numShipsOfSize, len(boardIndices))
+		shipIds = self.shipIds.reshape((self.numBoards, -1))
+		for shipId, shipSize in enumerate(self.shipSizes):
+			table = GetPlacementTable(self.boardSize, int(shipSize))
+			shipIds[boardIndices[:,None], table.locationIndices[fleets[:,shipId]]] = shipId
+	
+	# boardIndices must not repeat within one call
+	def Fire(self, boardIndices, xs, ys):
+		boardIndices = np.asarray(boardIndices, dtype=np.int64)
+		xs = np.asarray(xs, dtype=np.int64)
+		ys = np.asarray(ys, dtype=np.int64)
+		if np.any(xs < 0) or np.any(xs >= self.boardSize[0]) or np.any(ys < 0) or np.any(ys >= self.boardSize[1]):
+			raise Exception('BatchedBoard Fire called with invalid board location.')
+		
+		moveOutcomes = np.full(len(boardIndices), MoveOutcome.Miss.value, dtype=np.int8)
+		shipIds = self.shipIds[boardIndices, xs, ys]
+		isShip = shipIds >= 0
+		
+		hitBoards = boardIndices[isShip]
+		hitXs = xs[isShip]
+		hitYs = ys[isShip]
+		hitShipIds = shipIds[isShip]
+		shipHealth = self.shipHealth[hitBoards, hitShipIds]
+		locationAlreadyHit = self.hitPieces[hitBoards, hitXs, hitYs]
+		
+		shipOutcomes = np.full(len(hitBoards), MoveOutcome.HitAliveShip.value, dtype=np.int8)
+		shipOutcomes[locationAlreadyHit] = MoveOutcome.HitShipWhereAlreadyHit.value
+		shipOutcomes[shipHealth < 1] = MoveOutcome.HitAlreadyDestroyedShip.value
+		
+		newHits = (shipHealth > 0) & ~locationAlreadyHit
+		self.hitPieces[hitBoards[newHits], hitXs[newHits], hitYs[newHits]] = True
+		self.shipHealth[hitBoards[newHits], hitShipIds[newHits]] -= 1
+		self.piecesBeenHit[hitBoards[newHits]] += 1
+		
+		destroyedShips = newHits & (shipHealth == 1)
+		shipOutcomes[destroyedShips] = MoveOutcome.DestroyedShip.value
+		self.aliveShips[hitBoards[destroyedShips]] -= 1
+		
+		moveOutcomes[isShip] = shipOutcomes
+		return moveOutcomes
@@ -0,0 +1,80 @@
+import numpy as np
+from ship import MoveOutcome
+from batchedBoard import BatchedBoard
+from iaimodel import AIModelState
+
+# plays numGames two player games in lockstep, board of player p in game g is g*2 + p
+class BatchedGame(object):
+	def __init__(self, numGames, boardSize, numShipsOfSize, autoReset=None):
+		if autoReset is None:
+			autoReset = True
+		self.numGames = numGames
+		self.numPlayers = 2
+		self.autoReset = autoReset
+		self.gameIndices = np.arange(self.numGames)
+		self.board = BatchedBoard(self.numGames * self.numPlayers, boardSize, numShipsOfSize)
+		boardSize = self.board.GetBoardSize()
+		self.moveOutcomes = np.zeros((self.numGames, self.numPlayers, boardSize[0], boardSize[1]), dtype=np.int8)
+		self.playerAtTurn = np.zeros(self.numGames, dtype=np.int8)
+		self.turnNumbers = np.zeros((self.numGames, self.numPlayers), dtype=np.int32)
+		self.gameNumbers = np.zeros(self.numGames, dtype=np.int64)
+		self.Reset()
+	
+	def GetBoard(self):
+		return self.board
+	
+	def GetBoardIndex(self, gameIndices, players):
+		return np.asarray(gameIndices) * self.numPlayers + np.asarray(players)
+	
+	def GetPlayerAtTurn(self):
+		return self.playerAtTurn
+	
+	def GetMoveOutcomes(self):
+		return self.moveOutcomes
+	
+	def Reset(self, gameIndices=None):
+		if gameIndices is None:
+			gameIndices = self.gameIndices
+		gameIndices = np.asarray(gameIndices, dtype=np.int64)
+		boardIndices = np.concatenate([ self.GetBoardIndex(gameIndices, player) for player in range(self.numPlayers) ])
+		self.board.Reset(boardIndices)
+		self.moveOutcomes[gameIndices] = MoveOutcome.NoAttempt.value
+		self.playerAtTurn[gameIndices] = 0
+		self.turnNumbers[gameIndices] = 0
+		self.gameNumbers[gameIndices] += 1
+	
+	# moves holds one (x, y) location per game for the player at turn
+	# returns the MoveOutcome values, which games finished and the winning player (-1 if not finished)
+	# finished games are reset before returning when autoReset is set
+	def Step(self, moves):
+		moves = np.asarray(moves, dtype=np.int64)
+		if moves.shape != (self.numGames, 2):
+			raise Exception('BatchedGame Step requires exactly one move per game.')
+		xs = moves[:,0]
+		ys = moves[:,1]
+		
+		playersAtTurn = self.playerAtTurn
+		playersHit = 1 - playersAtTurn
+		moveOutcomes = self.board.Fire(self.GetBoardIndex(self.gameIndices, playersHit), xs, ys)
+		self.moveOutcomes[self.gameIndices, playersAtTurn, xs, ys] = moveOutcomes
+		self.turnNumbers[self.gameIndices, playersAtTurn] += 1
+		
+		gameOver = self.board.GetAliveShips()[self.GetBoardIndex(self.gameIndices, playersHit)] < 1
+		winners = np.where(gameOver, playersAtTurn, -1)
+		self.playerAtTurn = playersHit.astype(np.int8)
+		
+		if self.autoReset and np.any(gameOver):
+			self.Reset(self.gameIndices[gameOver])
+		return moveOutcomes, gameOver, winners
+	
+	# same contents AIPlayer sends to its model after a state change
+	def GetPlayerState(self, gameIndex, player):
+		boardIndex = self.GetBoardIndex(gameIndex, player)
+		opponentAliveShips = int(self.board.GetAliveShips()[self.GetBoardIndex(gameIndex, 1 - player)])
+		state = AIModelState()
+		state.aliveShips = int(self.board.GetAliveShips()[boardIndex])
+		state.moveOutcomes = self.moveOutcomes[gameIndex, player].astype(np.float64)
+		state.piecesBeenHit = int(self.board.GetPiecesBeenHit()[boardIndex])
+		state.currentlyPlaying = state.aliveShips > 0 and opponentAliveShips > 0
+		state.didWin = opponentAliveShips < 1
+		return state
@@ -0,0 +1,158 @@
+import random
+import timeit
+from vector2 import Vector2
+from iplayer import IPlayer
+from board import Board
+from bitBoard import BitBoard
+from shipPlacementUtility import RandomlyPlaceShips, RepeatShipPlacement
+from shipPlacementTable import SampleFleet, SampleFleets
+from ship import Ship, MoveOutcome
+from game import Game
+from densityPlayer import DensityPlayer
+
+numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
+boardSize = Vector2(10, 10)
+
+# places the given ships, or random ones, and shoots at every location in random order
+class BenchmarkPlayer(IPlayer):
+	def __init__(self, shipOrigins=None):
+		self.shipOrigins = shipOrigins
+		self.ships = []
+		self.aliveShips = 0
+		self.moves = []
+	
+	def PlaceShips(self, board):
+		if self.shipOrigins is None:
+			self.ships, shipOrigins = RandomlyPlaceShips(board, self)
+		else:
+			self.ships = RepeatShipPlacement(board, self, self.shipOrigins)
+		self.aliveShips = len(self.ships)
+		boardDimensions = board.GetBoardSize()
+		self.moves = [ Vector2(x, y) for x in range(boardDimensions[0]) for y in range(boardDimensions[1]) ]
+		random.shuffle(self.moves)
+		return self.ships
+	
+	def GetNextMove(self):
+		return self.moves.pop()
+	
+	def ReceivePlayerMoveOutcome(self, round, moveOutcome):
+		pass
+	
+	def GetShips(self):
+		return list(self.ships)
+	
+	def ReceiveShipHitEvent(self, ship, moveOutcome):
+		if moveOutcome == MoveOutcome.DestroyedShip:
+			self.aliveShips -= 1
+	
+	def GetAliveShips(self):
+		return self.aliveShips
+	
+	def GetPlayerName(self):
+		return 'BenchmarkPlayer'
+
+def OutputTiming(name, numOperations, seconds):
+	print('{:<40} {:>10.3f} s {:>12.0f} ops/s'.format(name, seconds, numOperations / seconds))
+
+def BenchmarkBoards(numGames=2000):
+	placementBoard = Board(boardSize, numShipsOfSize, [])
+	_, shipOrigins = RandomlyPlaceShips(placementBoard, None)
+	moves = [ Vector2(x, y) for x in range(boardSize[0]) for y in range(boardSize[1]) ]
+	random.shuffle(moves)
+	
+	boardsOfClass = {}
+	for boardClass in [Board, BitBoard]:
+		players = [ BenchmarkPlayer(shipOrigins) for gameNum in range(numGames) ]
+		startTime = timeit.default_timer()
+		boards = []
+		for player in players:
+			board = boardClass(boardSize, numShipsOfSize, [player])
+			board.PlaceShips()
+			boards.append(board)
+		OutputTiming('{} placement'.format(boardClass.__name__), numGames, timeit.default_timer() - startTime)
+		
+		startTime = timeit.default_timer()
+		for board, player in zip(boards, players):
+			for move in moves:
+				board.ResolveMove(player, move)
+		OutputTiming('{} ResolveMove'.format(boardClass.__name__), numGames * len(moves), timeit.default_timer() - startTime)
+		boardsOfClass[boardClass] = (boards, players)
+	
+	boards, players = boardsOfClass[Board]
+	startTime = timeit.default_timer()
+	for player in players:
+		all(not ship.IsAlive() for ship in player.GetShips())
+	OutputTiming('Board all ships sunk', numGames, timeit.default_timer() - startTime)
+	
+	boards, players = boardsOfClass[BitBoard]
+	startTime = timeit.default_timer()
+	for board, player in zip(boards, players):
+		board.AllShipsSunk(player)
+	OutputTiming('BitBoard AllShipsSunk', numGames, timeit.default_timer() - startTime)
+
+def BenchmarkShipPlacement(numFleets=20000, numBulkFleets=1000000):
+	board = Board(boardSize, numShipsOfSize, [])
+	SampleFleet(boardSize, numShipsOfSize)
+	
+	startTime = timeit.default_timer()
+	for fleetNum in range(numFleets):
+		RandomlyPlaceShips(board, None)
+	OutputTiming('RandomlyPlaceShips', numFleets, timeit.default_timer() - startTime)
+	
+	startTime = timeit.default_timer()
+	for fleetNum in range(numFleets):
+		SampleFleet(boardSize, numShipsOfSize)
+	OutputTiming('SampleFleet', numFleets, timeit.default_timer() - startTime)
+	
+	startTime = timeit.default_timer()
+	SampleFleets(boardSize, numShipsOfSize, numBulkFleets)
+	OutputTiming('SampleFleets', numBulkFleets, timeit.default_timer() - startTime)
+
+def BenchmarkShipHits(numShips=50000):
+	player = BenchmarkPlayer()
+	shipOrigin = Vector2(3, 2)
+	hitLocations = [ Vector2(shipOrigin[0], y) for y in range(boardSize[1]) ]
+	ships = [ Ship(5, player, shipOrigin, True) for shipNum in range(numShips) ]
+	
+	startTime = timeit.default_timer()
+	for ship in ships:
+		for hitLocation in hitLocations:
+			if ship.IsAlive():
+				ship.HitShip(hitLocation)
+	OutputTiming('Ship HitShip', numShips * len(hitLocations), timeit.default_timer() - startTime)
+	
+	startTime = timeit.default_timer()
+	for ship in ships:
+		for hitLocation in hitLocations:
+			ship.GetHitLocations()
+	OutputTiming('Ship GetHitLocations', numShips * len(hitLocations), timeit.default_timer() - startTime)
+
+def BenchmarkGames(numGames=2000):
+	for boardClass in [Board, BitBoard]:
+		totalMoves = 0
+		startTime = timeit.default_timer()
+		for gameNum in range(numGames):
+			board = boardClass(boardSize, numShipsOfSize, [BenchmarkPlayer(), BenchmarkPlayer()])
+			result = Game(board, headless=True).Play(trustedPlacement=True)
+			totalMoves += result.turns
+		OutputTiming('{} headless game moves'.format(boardClass.__name__), totalMoves, timeit.default_timer() - startTime)
+
+def BenchmarkDensityPlayer(numGames=200):
+	totalMoves = 0
+	totalShots = 0
+	startTime = timeit.default_timer()
+	for gameNum in range(numGames):
+		densityPlayer = DensityPlayer(0)
+		board = BitBoard(boardSize, numShipsOfSize, [densityPlayer, BenchmarkPlayer()])
+		result = Game(board, headless=True).Play(trustedPlacement=True)
+		totalMoves += result.turns
+		totalShots += result.hits[0] + result.misses[0]
+	OutputTiming('DensityPlayer game moves', totalMoves, timeit.default_timer() - startTime)
+	print('DensityPlayer mean shots per game {:.1f}'.format(totalShots / numGames))
+
+if __name__ == '__main__':
+	BenchmarkBoards()
+	BenchmarkShipPlacement()
+	BenchmarkShipHits()
+	BenchmarkGames()
+	BenchmarkDensityPlayer()
@@ -0,0 +1,104 @@
+from board import Board
+from ship import MoveOutcome
+
+class PlayerBitBoard(object):
+	__slots__ = ['occupied', 'hits', 'misses', 'shipMasks', 'shipAtLocation']
+	
+	def __init__(self, numLocations):
+		self.occupied = 0
+		self.hits = 0
+		self.misses = 0
+		self.shipMasks = {}
+		self.shipAtLocation = [None] * numLocations
+
+locationIndicesOfBoardSize = {}
+
+def GetLocationIndices(boardSize):
+	boardSize = (boardSize[0], boardSize[1])
+	if not boardSize in locationIndicesOfBoardSize:
+		locationIndicesOfBoardSize[boardSize] = { (x, y) : x * boardSize[1] + y for x in range(boardSize[0]) for y in range(boardSize[1]) }
+	return locationIndicesOfBoardSize[boardSize]
+
+# Board whose occupancy, hit and miss state per player are held in integer bitmasks,
+# bit x * boardSize[1] + y stands for location (x, y).
+# The bitmasks are the authoritative hit state, ships placed on it are not mutated
+# and IsShipSunk / AllShipsSunk should be queried instead of Ship.IsAlive.
+class BitBoard(Board):
+	def __init__(self, boardSize, numShipsOfSize, players):
+		self.boardSize = boardSize
+		self.numShipsOfSize = numShipsOfSize
+		self.shipSizes = list(self.numShipsOfSize.keys())
+		self.ships = {}
+		self.players = players
+		self.numLocations = self.boardSize[0] * self.boardSize[1]
+		self.locationIndices = GetLocationIndices(self.boardSize)
+		self.playerBoards = { player : PlayerBitBoard(self.numLocations) for player in players }
+	
+	def GetLocationIndex(self, location):
+		locationIndex = self.locationIndices.get(location)
+		if locationIndex is None:
+			raise Exception('Invalid board location {}.'.format(location))
+		return locationIndex
+	
+	def PlaceShip(self, player, ship, validate=None):
+		if validate is None:
+			validate = True
+		if validate:
+			self.ValidateShip(player, ship)
+		
+		playerBoard = self.playerBoards[player]
+		shipMask = 0
+		locationIndices = [ self.GetLocationIndex(location) for location in ship.GetPieceLocations() ]
+		for locationIndex in locationIndices:
+			shipMask |= 1 << locationIndex
+		if validate and playerBoard.occupied & shipMask:
+			raise Exception('Attempt to place more than one ship at location {}.'.format(ship.GetOrigin()))
+		playerBoard.occupied |= shipMask
+		playerBoard.shipMasks[ship] = shipMask
+		for locationIndex in locationIndices:
+			playerBoard.shipAtLocation[locationIndex] = ship
+		
+		self.AddShipOfPlayer(player, ship)
+	
+	def GetPlayersShipAtLocation(self, player, location):
+		return self.playerBoards[player].shipAtLocation[self.GetLocationIndex(location)]
+	
+	def ResolveMove(self, player, location):
+		playerBoard = self.playerBoards[player]
+		locationIndex = self.locationIndices.get(location)
+		if locationIndex is None:
+			raise Exception('Invalid board location {}.'.format(location))
+		locationBit = 1 << locationIndex
+		if not playerBoard.occupied & locationBit:
+			playerBoard.misses |= locationBit
+			return MoveOutcome.Miss
+		
+		ship = playerBoard.shipAtLocation[locationIndex]
+		shipMask = playerBoard.shipMasks[ship]
+		if not shipMask & ~playerBoard.hits:
+			return MoveOutcome.HitAlreadyDestroyedShip
+		
+		if playerBoard.hits & locationBit:
+			moveOutcome = MoveOutcome.HitShipWhereAlreadyHit
+		else:
+			playerBoard.hits |= locationBit
+			if shipMask & ~playerBoard.hits:
+				moveOutcome = MoveOutcome.HitAliveShip
+			else:
+				moveOutcome = MoveOutcome.DestroyedShip
+		player.ReceiveShipHitEvent(ship, moveOutcome)
+		return moveOutcome
+	
+	def IsShipSunk(self, player, ship):
+		playerBoard = self.playerBoards[player]
+		return not playerBoard.shipMasks[ship] & ~playerBoard.hits
+	
+	def AllShipsSunk(self, player):
+		playerBoard = self.playerBoards[player]
+		return not playerBoard.occupied & ~playerBoard.hits
+	
+	def GetHitMask(self, player):
+		return self.playerBoards[player].hits
+	
+	def GetMissMask(self, player):
+		return self.playerBoards[player].misses
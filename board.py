@@ -1,4 +1,4 @@
-from ship import Ship
+from ship import Ship, MoveOutcome
 from vector2 import Vector2
 import code
 
@@ -25,7 +25,7 @@ class Board(object):
 			return None
 		return self.ships[player]
 	
-	def PlaceShip(self, player, ship):
+	def ValidateShip(self, player, ship):
 		if not player in self.playerBoards:
 			raise Exception('Attempt to place ship of invalid player.')
 		playerShips = player.GetShips()
@@ -42,9 +42,27 @@ class Board(object):
 		maximumShipsOfSize = self.numShipsOfSize[shipSize]
 		if playerNumShipsOfSize > maximumShipsOfSize:
 			raise Exception('Attempt to place more than {} ships of size {}.'.format(maximumShipsOfSize, shipSize))
-		
+	
+	def AddShipOfPlayer(self, player, ship):
+		shipSize = ship.GetSize()
+		if not player in self.ships:
+			self.ships[player] = {}
+		if not shipSize in self.ships[player]:
+			self.ships[player][shipSize] = []
+		self.ships[player][shipSize].append(ship)
+	
+	def PlaceShip(self, player, ship, validate=None):
+		if validate is None:
+			validate = True
 		shipPieceLocations = ship.GetPieceLocations()
 		playerBoard = self.playerBoards[player]
+		if not validate:
+			for location in shipPieceLocations:
+				playerBoard[location[0]][location[1]] = ship
+			self.AddShipOfPlayer(player, ship)
+			return
+		
+		self.ValidateShip(player, ship)
 		for location in shipPieceLocations:
 			if location[0] < 0 or location[0] >= len(playerBoard):
 				raise Exception('Invalid board location {}.'.format(location))
@@ -54,18 +72,14 @@ class Board(object):
 				raise Exception('Attempt to place more than one ship at location {}.'.format(location))
 			playerBoard[location[0]][location[1]] = ship
 		
-		if not player in self.ships:
-			self.ships[player] = {}
-		if not shipSize in self.ships[player]:
-			self.ships[player][shipSize] = []
-		self.ships[player][shipSize].append(ship)
+		self.AddShipOfPlayer(player, ship)
 	
-	def PlaceShips(self):
+	def PlaceShips(self, validate=None):
 		for player in self.players:
 			playerShips = player.PlaceShips(self)
 			shipNum = 0
 			for ship in playerShips:
-				self.PlaceShip(player, ship)
+				self.PlaceShip(player, ship, validate)
 				shipNum += 1
 	
 	def GetPlayersShipAtLocation(self, player, location):
@@ -75,4 +89,13 @@ class Board(object):
 		boardRow = playerBoard[location[0]]
 		if location[1] < 0 or location[1] > len(boardRow):
 			raise Exception('GetPlayersShipAtLocation queried for invalid board location.')
-		return boardRow[location[1]]
\ No newline at end of file
+		return boardRow[location[1]]
+	
+	def ResolveMove(self, player, location):
+		shipAtLocation = self.GetPlayersShipAtLocation(player, location)
+		if shipAtLocation is None:
+			return MoveOutcome.Miss
+		elif shipAtLocation.IsAlive():
+			return shipAtLocation.HitShip(location)
+		else:
+			return MoveOutcome.HitAlreadyDestroyedShip
\ No newline at end of file
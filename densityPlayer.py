@@ -0,0 +1,187 @@
+import numpy as np
+from vector2 import Vector2
+from iplayer import IPlayer
+from shipPlacementUtility import RandomlyPlaceShips
+from shipPlacementTable import GetPlacementTable
+from ship import MoveOutcome
+
+UnknownLocation = 0
+MissedLocation = 1
+HitLocation = 2
+SunkLocation = 3
+
+# placement counts of one ship size on the opponent's board
+class ShipSizeDensity:
+	def __init__(self, boardSize, shipSize, numShips):
+		self.table = GetPlacementTable(boardSize, shipSize)
+		self.shipSize = shipSize
+		self.numShips = numShips
+		self.validPlacements = np.ones(len(self.table), dtype=bool)
+		self.hitsInPlacement = np.zeros(len(self.table), dtype=np.int64)
+
+# shoots at the location covered by the most placements of the ships still afloat,
+# placements through unsunk hits are weighted up so hit ships get finished first
+class DensityPlayer(IPlayer):
+	def __init__(self, playerNumber, hitWeight=None):
+		if hitWeight is None:
+			hitWeight = 100.0
+		self.playerName = 'DensityPlayer #{}'.format(playerNumber)
+		self.hitWeight = hitWeight
+		self.ships = []
+		self.aliveShips = 0
+		self.playerMoves = []
+	
+	def SetBoard(self, board):
+		if board is None:
+			raise Exception('DensityPlayer SetBoard called without board.')
+		super(DensityPlayer, self).SetBoard(board)
+		boardSize = board.GetBoardSize()
+		self.boardSize = (boardSize[0], boardSize[1])
+		self.numLocations = self.boardSize[0] * self.boardSize[1]
+		self.numShipsOfSize = board.GetNumShipsOfSize()
+		self.playerMoves = []
+		self.moveOutcomes = []
+		self.ResetDensity(True)
+	
+	def ResetDensity(self, guessAmbiguousSinks):
+		self.guessAmbiguousSinks = guessAmbiguousSinks
+		self.locationStates = np.zeros(self.numLocations, dtype=np.int8)
+		self.placementDensity = np.zeros(self.numLocations)
+		self.hitDensity = np.zeros(self.numLocations)
+		self.shipSizeDensities = []
+		for shipSize in self.numShipsOfSize.keys():
+			shipSizeDensity = ShipSizeDensity(self.boardSize, shipSize, self.numShipsOfSize[shipSize])
+			self.shipSizeDensities.append(shipSizeDensity)
+			self.placementDensity += shipSizeDensity.numShips * np.bincount(shipSizeDensity.table.locationIndices.ravel(), minlength=self.numLocations)
+	
+	def PlaceShips(self, board):
+		self.ships, shipOrigins = RandomlyPlaceShips(board, self)
+		self.aliveShips = len(self.ships)
+		return self.ships
+	
+	def GetLocationDensity(self):
+		return self.placementDensity + self.hitWeight * self.hitDensity
+	
+	def GetNextMove(self):
+		locationScores = self.GetLocationDensity() + np.random.random_sample(self.numLocations) * 1e-3
+		locationScores[self.locationStates != UnknownLocation] = -1.0
+		locationIndex = int(np.argmax(locationScores))
+		playerMove = Vector2(locationIndex // self.boardSize[1], locationIndex % self.boardSize[1])
+		self.playerMoves.append(playerMove)
+		return playerMove
+	
+	def ReceivePlayerMoveOutcome(self, round, moveOutcome):
+		if round < 0 or round >= len(self.playerMoves):
+			raise Exception('DensityPlayer received hit result with invalid round number.')
+		moveLocation = self.playerMoves[round]
+		locationIndex = moveLocation[0] * self.boardSize[1] + moveLocation[1]
+		self.moveOutcomes.append((locationIndex, moveOutcome))
+		
+		# a hit no remaining placement explains means an earlier sunk ship was guessed wrong,
+		# the densities are then rebuilt from the move history leaving ambiguous sunk ships unresolved
+		if self.guessAmbiguousSinks and self.locationStates[locationIndex] == UnknownLocation and moveOutcome in [MoveOutcome.HitAliveShip, MoveOutcome.DestroyedShip] and not self.IsHitExplained(locationIndex, 0):
+			self.ResetDensity(False)
+			for locationIndex, moveOutcome in self.moveOutcomes:
+				self.ApplyMoveOutcome(locationIndex, moveOutcome)
+		else:
+			self.ApplyMoveOutcome(locationIndex, moveOutcome)
+	
+	def ApplyMoveOutcome(self, locationIndex, moveOutcome):
+		if self.locationStates[locationIndex] != UnknownLocation:
+			return
+		
+		if moveOutcome == MoveOutcome.Miss:
+			self.locationStates[locationIndex] = MissedLocation
+			self.RemovePlacementsAt(locationIndex)
+		elif moveOutcome == MoveOutcome.HitAliveShip:
+			self.AddHit(locationIndex)
+		elif moveOutcome == MoveOutcome.DestroyedShip:
+			self.AddHit(locationIndex)
+			self.SinkShipAt(locationIndex)
+	
+	# only placements through the shot location change
+	def RemovePlacements(self, shipSizeDensity, placementIndices):
+		placementIndices = placementIndices[shipSizeDensity.validPlacements[placementIndices]]
+		if len(placementIndices) < 1:
+			return
+		shipSizeDensity.validPlacements[placementIndices] = False
+		pieceLocations = shipSizeDensity.table.locationIndices[placementIndices]
+		np.subtract.at(self.placementDensity, pieceLocations.ravel(), shipSizeDensity.numShips)
+		hitsInPlacements = np.repeat(shipSizeDensity.hitsInPlacement[placementIndices], shipSizeDensity.shipSize)
+		np.subtract.at(self.hitDensity, pieceLocations.ravel(), shipSizeDensity.numShips * hitsInPlacements)
+	
+	def RemovePlacementsAt(self, locationIndex):
+		for shipSizeDensity in self.shipSizeDensities:
+			self.RemovePlacements(shipSizeDensity, shipSizeDensity.table.placementsAtLocation[locationIndex])
+	
+	def AddHit(self, locationIndex):
+		self.locationStates[locationIndex] = HitLocation
+		for shipSizeDensity in self.shipSizeDensities:
+			placementIndices = shipSizeDensity.table.placementsAtLocation[locationIndex]
+			placementIndices = placementIndices[shipSizeDensity.validPlacements[placementIndices]]
+			shipSizeDensity.hitsInPlacement[placementIndices] += 1
+			np.add.at(self.hitDensity, shipSizeDensity.table.locationIndices[placementIndices].ravel(), shipSizeDensity.numShips)
+	
+	# the sunk ship lies entirely on unsunk hits through the location, the largest such ship that
+	# still leaves a placement for every other unsunk hit is taken
+	def SinkShipAt(self, locationIndex):
+		candidates = []
+		for shipSizeDensity in self.shipSizeDensities:
+			if shipSizeDensity.numShips < 1:
+				continue
+			placementIndices = shipSizeDensity.table.placementsAtLocation[locationIndex]
+			isSunkPlacement = shipSizeDensity.validPlacements[placementIndices] & (shipSizeDensity.hitsInPlacement[placementIndices] == shipSizeDensity.shipSize)
+			for placementIndex in placementIndices[isSunkPlacement]:
+				if self.HitsExplainedWithout(shipSizeDensity, placementIndex):
+					candidates.append((shipSizeDensity.shipSize, shipSizeDensity, placementIndex))
+		if len(candidates) < 1 or (len(candidates) > 1 and not self.guessAmbiguousSinks):
+			return
+		shipSize, sunkShipSize, sunkPlacement = max(candidates, key=lambda candidate: candidate[0])
+		
+		for sunkLocation in sunkShipSize.table.locationIndices[sunkPlacement]:
+			self.locationStates[sunkLocation] = SunkLocation
+			self.RemovePlacementsAt(sunkLocation)
+		
+		# remove the sunk ship's share of the remaining placements of its size
+		validPlacements = np.flatnonzero(sunkShipSize.validPlacements)
+		pieceLocations = sunkShipSize.table.locationIndices[validPlacements].ravel()
+		self.placementDensity -= np.bincount(pieceLocations, minlength=self.numLocations)
+		hitsInPlacements = np.repeat(sunkShipSize.hitsInPlacement[validPlacements], sunkShipSize.shipSize)
+		self.hitDensity -= np.bincount(pieceLocations, weights=hitsInPlacements, minlength=self.numLocations)
+		sunkShipSize.numShips -= 1
+	
+	def IsHitExplained(self, hitLocation, sunkMask, sunkShipSize=None):
+		for shipSizeDensity in self.shipSizeDensities:
+			numShips = shipSizeDensity.numShips - (1 if shipSizeDensity is sunkShipSize else 0)
+			if numShips < 1:
+				continue
+			masks = shipSizeDensity.table.masks
+			for placementIndex in shipSizeDensity.table.placementsAtLocation[hitLocation]:
+				if shipSizeDensity.validPlacements[placementIndex] and not masks[placementIndex] & sunkMask:
+					return True
+		return False
+	
+	def HitsExplainedWithout(self, sunkShipSize, sunkPlacement):
+		sunkMask = sunkShipSize.table.masks[sunkPlacement]
+		for hitLocation in np.flatnonzero(self.locationStates == HitLocation):
+			if not (sunkMask >> int(hitLocation)) & 1 and not self.IsHitExplained(hitLocation, sunkMask, sunkShipSize):
+				return False
+		return True
+	
+	def GetShips(self):
+		return list(self.ships)
+	
+	def ReceiveShipHitEvent(self, ship, moveOutcome):
+		if moveOutcome == MoveOutcome.DestroyedShip:
+			if self.aliveShips < 1:
+				raise Exception('Attempt to destroy ship of player that has no ships alive.')
+			self.aliveShips -= 1
+	
+	def ReceiveGameEndState(self, didWin):
+		pass
+	
+	def GetAliveShips(self):
+		return self.aliveShips
+	
+	def GetPlayerName(self):
+		return self.playerName
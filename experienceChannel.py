@@ -0,0 +1,55 @@
+import threading
+
+# hands batches of experiences from producers to a consumer that takes everything pending at once.
+# producers block while maxPendingExperiences are waiting and are woken as soon as the consumer takes
+# them, the consumer blocks until a batch arrives. a batch larger than maxPendingExperiences is only
+# accepted into an empty channel, so it cannot wait forever
+class ExperienceChannel:
+	def __init__(self, maxPendingExperiences=None):
+		if maxPendingExperiences is None:
+			maxPendingExperiences = 1000
+		self.maxPendingExperiences = maxPendingExperiences
+		self.lock = threading.Lock()
+		self.notFull = threading.Condition(self.lock)
+		self.notEmpty = threading.Condition(self.lock)
+		self.pendingExperiences = []
+		self.closed = False
+	
+	def IsFull(self, numExperiences):
+		return len(self.pendingExperiences) > 0 and len(self.pendingExperiences) + numExperiences > self.maxPendingExperiences
+	
+	# returns whether the batch was handed over, False after timeout seconds or once the channel is closed
+	def Put(self, experiences, timeout=None):
+		if len(experiences) < 1:
+			return True
+		with self.lock:
+			if not self.notFull.wait_for(lambda: self.closed or not self.IsFull(len(experiences)), timeout):
+				return False
+			if self.closed:
+				return False
+			self.pendingExperiences.extend(experiences)
+			self.notEmpty.notify()
+			return True
+	
+	# every pending experience, waiting up to timeout seconds for one when block is set
+	def GetAll(self, block=None, timeout=None):
+		if block is None:
+			block = True
+		with self.lock:
+			if block:
+				self.notEmpty.wait_for(lambda: self.closed or len(self.pendingExperiences) > 0, timeout)
+			experiences = self.pendingExperiences
+			self.pendingExperiences = []
+			self.notFull.notify_all()
+			return experiences
+	
+	# wakes every waiting producer and consumer, later batches are refused
+	def Close(self):
+		with self.lock:
+			self.closed = True
+			self.notFull.notify_all()
+			self.notEmpty.notify_all()
+	
+	def __len__(self):
+		with self.lock:
+			return len(self.pendingExperiences)
\ No newline at end of file
@@ -1,6 +1,10 @@
 import code
 import math
+import sys
+import time
 import numpy as np
+from segmentTree import SumTree, MinTree
+from stateHash import GetTransitionHash
 
 class Experience:
 	def __init__(self):
@@ -14,105 +18,372 @@ class Experience:
 		self.rewardRolloutSum = 0
 		self.rolloutLength = 0
 
+# states are stored in whatever form the model keeps them, stateDecoder (e.g. a StateRecordCodec)
+# turns them into model inputs once per batch
 class ExperiencesBatch:
-	def __init__(self, experiences, keys, importanceSamplingWeights):
+	def __init__(self, keys, states, statesAfterMove, moves, rewards, importanceSamplingWeights, stateDecoder=None, rolloutLengths=None):
+		if rolloutLengths is None:
+			rolloutLengths = np.ones(len(keys), dtype=np.int32)
 		self.keys = keys
-		
-		rewards = []
-		moves = []
-		states = []
-		statesAfterMove = []
-		for key in keys:
-			experience = experiences[key]
-			moves.append(experience.move)
-			states.append(experience.state)
-			if experience.lastStateInRollout is None:
-				statesAfterMove.append(experience.stateAfterMove)
-				rewards.append(experience.reward)
-			else:
-				statesAfterMove.append(experience.lastStateInRollout)
-				rewards.append(experience.rewardRolloutSum)
-		
-		self.states = np.array(states)
-		self.statesAfterMove = np.array(statesAfterMove)
-		self.moves = np.array(moves)
-		self.rewards = np.array(rewards)
+		self.states = states
+		self.statesAfterMove = statesAfterMove
+		self.moves = moves
+		self.rewards = rewards
+		# number of rewards summed in rewards, the state after the last of them is in statesAfterMove
+		self.rolloutLengths = rolloutLengths
 		self.importanceSamplingWeights = np.array(importanceSamplingWeights)
+		if not stateDecoder is None and len(keys) > 0:
+			self.states = stateDecoder.DecodeStates(self.states)
+			self.statesAfterMove = stateDecoder.DecodeStates(self.statesAfterMove)
 	
 	def __len__(self):
 		return len(self.states)
 
-# maintains (States, StatesAfterMove, Moves, Rewards) with a variety of reward values
+# experiences travel between processes as stacked arrays instead of one pickled Experience each
+class ExperiencePack:
+	def __init__(self, experiences=None):
+		if experiences is None:
+			experiences = []
+		self.keys = [ experience.key for experience in experiences ]
+		# states keep their own dtype, raw uint8 state records stay compact on the wire
+		self.states = np.array([ experience.state for experience in experiences ])
+		self.statesAfterMove = np.array([ experience.stateAfterMove for experience in experiences ])
+		self.moves = np.array([ experience.move for experience in experiences ], dtype=np.int32)
+		self.rewards = np.array([ experience.reward for experience in experiences ], dtype=np.float32)
+		self.rolloutLengths = np.array([ experience.rolloutLength for experience in experiences ], dtype=np.int32)
+		self.rewardRolloutSums = np.array([ experience.rewardRolloutSum for experience in experiences ], dtype=np.float32)
+		self.lastStatesInRollout = np.array([ experience.stateAfterMove if experience.lastStateInRollout is None else experience.lastStateInRollout for experience in experiences ])
+	
+	def __len__(self):
+		return len(self.keys)
+	
+	def GetExperiences(self):
+		experiences = []
+		for experienceNum in range(len(self.keys)):
+			experience = Experience()
+			experience.key = self.keys[experienceNum]
+			experience.state = self.states[experienceNum]
+			experience.stateAfterMove = self.statesAfterMove[experienceNum]
+			experience.move = int(self.moves[experienceNum])
+			experience.reward = float(self.rewards[experienceNum])
+			experience.rolloutLength = int(self.rolloutLengths[experienceNum])
+			if experience.rolloutLength > 0:
+				experience.rewardRolloutSum = float(self.rewardRolloutSums[experienceNum])
+				experience.lastStateInRollout = self.lastStatesInRollout[experienceNum]
+			experiences.append(experience)
+		return experiences
+
+# maintains (States, StatesAfterMove, Moves, Rewards) with a variety of reward values.
+# experiences are stored column by column in preallocated arrays of capacity slots, written in a ring
+# so the newest experience replaces the oldest. capacity is maxSize, or fewer when the columns, priority
+# trees and key bookkeeping of maxSize experiences would not fit in maxBytes.
+# every slot is a leaf of a sum tree and a min tree of its priority
+# (bellman difference + priorityBiasFactor) ^ priorityRandomness, so inserts, priority updates
+# and proportional sampling are O(log N) and a batch is gathered with one index per column.
+# with deduplicate, an experience repeating the state, move and rollout length of a stored one is merged
+# into it instead of taking a slot: the stored experience counts the visit, keeps the mean of the rewards
+# and rollout returns and takes the newest next states. returns of different rollout lengths are bootstrapped
+# differently and are never merged. merged experiences are not found under their own key
 class ExperienceReplayBuffer:
-	def __init__(self, maxSize, batchSize, priorityRandomness=0.6, priorityBiasFactor=0.01, importanceSamplingExponent=0.0):
+	def __init__(self, maxSize, batchSize, priorityRandomness=0.6, priorityBiasFactor=0.01, importanceSamplingExponent=0.0, stateDecoder=None, deduplicate=None, maxBytes=None):
+		if deduplicate is None:
+			deduplicate = False
 		self.maxSize = maxSize
 		self.batchSize = batchSize
-		self.experiences = {}
-		self.experienceKeysSorted = []
 		self.priorityRandomness = priorityRandomness
 		self.priorityBiasFactor = priorityBiasFactor
 		self.importanceSamplingExponent = importanceSamplingExponent
+		self.stateDecoder = stateDecoder
+		self.deduplicate = deduplicate
+		self.maxBytes = maxBytes
+		self.slotOfTransitionHash = {}
+		self.slotOfKey = {}
+		self.nextSlot = 0
+		self.maxPriority = self.GetPriorities(1.0)
+		self.numInserted = 0
+		self.numEvicted = 0
+		self.numMerged = 0
+		self.lastStatsTime = time.time()
+		self.lastStatsNumEvicted = 0
+		# allocated on the first insert, when the state shape and so the size of an experience is known
+		self.capacity = maxSize
+		self.bytesPerExperience = None
+		self.states = None
+	
+	# python objects kept for every stored experience: its key tuple with the ints in it, the slot int, a
+	# pointer in keyOfSlot and the slotOfKey entry, a dict entry with its share of the table is at most about 100 bytes.
+	# with deduplicate also the transition hash int and its slotOfTransitionHash entry
+	def GetBookkeepingBytesPerExperience(self, keyLength):
+		intBytes = sys.getsizeof(1 << 62)
+		dictEntryBytes = 100
+		keyBytes = sys.getsizeof(tuple(range(keyLength))) + keyLength * intBytes
+		bookkeepingBytes = keyBytes + intBytes + 8 + dictEntryBytes
+		if self.deduplicate:
+			bookkeepingBytes += intBytes + dictEntryBytes
+		return bookkeepingBytes
+	
+	# bytes of one slot in every column and of the python objects of its key, the priority trees are
+	# counted separately by GetTreeBytes
+	def GetBytesPerExperience(self, state, keyLength):
+		columnBytes = sum(np.dtype(dtype).itemsize * int(np.prod(shape[1:], dtype=np.int64)) for shape, dtype, initialValue in self.GetColumnLayouts(state).values())
+		return columnBytes + self.GetBookkeepingBytesPerExperience(keyLength)
+	
+	# the sum and min trees hold 2 * capacity rounded up to a power of two float64 nodes each
+	def GetTreeBytes(self, capacity):
+		treeLeaves = 1 << max(capacity - 1, 0).bit_length()
+		return 2 * 2 * treeLeaves * np.dtype(np.float64).itemsize
+	
+	def GetAllocatedBytes(self, capacity):
+		return capacity * self.bytesPerExperience + self.GetTreeBytes(capacity)
+	
+	# the largest capacity up to maxSize whose allocation fits in maxBytes
+	def GetCapacity(self, state, keyLength):
+		self.bytesPerExperience = self.GetBytesPerExperience(state, keyLength)
+		if self.maxBytes is None or self.GetAllocatedBytes(self.maxSize) <= self.maxBytes:
+			return self.maxSize
+		minCapacity = 0
+		maxCapacity = self.maxSize
+		while minCapacity < maxCapacity:
+			capacity = (minCapacity + maxCapacity + 1) // 2
+			if self.GetAllocatedBytes(capacity) <= self.maxBytes:
+				minCapacity = capacity
+			else:
+				maxCapacity = capacity - 1
+		if minCapacity < 1:
+			raise Exception('ExperienceReplayBuffer budget of {} bytes cannot hold an experience of {} bytes.'.format(self.maxBytes, self.GetAllocatedBytes(1)))
+		return minCapacity
+	
+	def AllocateSlots(self, capacity):
+		self.capacity = capacity
+		self.prioritySums = SumTree(self.capacity)
+		self.priorityMins = MinTree(self.capacity)
+		self.keyOfSlot = [None] * self.capacity
+	
+	# name : (shape, dtype, initial value) of every column
+	def GetColumnLayouts(self, state):
+		state = np.asarray(state)
+		stateLayout = ((self.capacity,) + state.shape, state.dtype, 0)
+		columnLayouts = {
+			'states' : stateLayout,
+			'statesAfterMove' : stateLayout,
+			'lastStatesInRollout' : stateLayout,
+			'moves' : ((self.capacity,), np.int32, 0),
+			'rewards' : ((self.capacity,), np.float32, 0),
+			'bellmanDifferences' : ((self.capacity,), np.float32, np.nan),
+			'rewardRolloutSums' : ((self.capacity,), np.float32, 0),
+			'rolloutLengths' : ((self.capacity,), np.int32, 0)
+		}
+		if self.deduplicate:
+			columnLayouts['transitionHashes'] = ((self.capacity,), np.uint64, 0)
+			columnLayouts['visitCounts'] = ((self.capacity,), np.int32, 0)
+			# sum of squared differences from the mean rollout return
+			columnLayouts['rewardRolloutSquaredDeviations'] = ((self.capacity,), np.float32, 0)
+		return columnLayouts
+	
+	def AllocateColumns(self, experience):
+		self.AllocateSlots(self.GetCapacity(experience.state, len(experience.key)))
+		for columnName, (shape, dtype, initialValue) in self.GetColumnLayouts(experience.state).items():
+			column = np.zeros(shape, dtype=dtype)
+			if initialValue != 0:
+				column[:] = initialValue
+			setattr(self, columnName, column)
 	
 	def SetImportanceSamplingExponent(self, importanceSamplingExponent):
 		self.importanceSamplingExponent = importanceSamplingExponent
 	
 	def GetExperiences(self):
-		return self.experiences
+		return { key : self[key] for key in self.slotOfKey.keys() }
+	
+	def GetPriorities(self, bellmanDifferences):
+		return np.power(np.asarray(bellmanDifferences, dtype=np.float64) + self.priorityBiasFactor, self.priorityRandomness)
 	
+	# one sample from each of batchSize equal slices of the total priority, an experience
+	# holding more than a slice of the total can be sampled more than once
 	def GetBatchMatrices(self):
-		priorityKeys, priorities = self.__GetExperiencePriorities()
-		batchSize = min(self.batchSize, len(priorityKeys))
+		numExperiences = len(self)
+		batchSize = min(self.batchSize, numExperiences)
 		
-		if batchSize > 0:
-			sampledKeysInBatch = np.random.choice(len(priorityKeys), batchSize, False, priorities)
-			sampledPriorities = priorities[sampledKeysInBatch]
-			importanceSamplingWeights = np.power(len(self.experiences) * sampledPriorities, -self.importanceSamplingExponent)
-			importanceSamplingWeights /= np.max(importanceSamplingWeights)
-			keys = [ priorityKeys[keyIndex] for keyIndex in sampledKeysInBatch ]
-		else:
-			keys = []
-			importanceSamplingWeights = []
-		return ExperiencesBatch(self.experiences, keys, importanceSamplingWeights)
+		if batchSize < 1:
+			return ExperiencesBatch([], np.array([]), np.array([]), np.array([]), np.array([]), [])
+		
+		prioritySum = self.prioritySums.Reduce()
+		prefixSums = (np.arange(batchSize) + np.random.random_sample(batchSize)) * (prioritySum / batchSize)
+		prefixSums = np.minimum(prefixSums, np.nextafter(prioritySum, 0))
+		sampledSlots = self.prioritySums.FindPrefixSums(prefixSums)
+		sampledProbabilities = self.prioritySums[sampledSlots] / prioritySum
+		# weights are scaled by the largest weight of any experience, the one of least priority
+		minProbability = self.priorityMins.Reduce() / prioritySum
+		importanceSamplingWeights = np.power(numExperiences * sampledProbabilities, -self.importanceSamplingExponent)
+		importanceSamplingWeights /= np.power(numExperiences * minProbability, -self.importanceSamplingExponent)
+		keys = [ self.keyOfSlot[slot] for slot in sampledSlots ]
+		
+		# experiences with a rollout are trained towards the end of their rollout
+		hasRollout = self.rolloutLengths[sampledSlots] > 0
+		statesAfterMove = self.statesAfterMove[sampledSlots]
+		statesAfterMove[hasRollout] = self.lastStatesInRollout[sampledSlots[hasRollout]]
+		rewards = np.where(hasRollout, self.rewardRolloutSums[sampledSlots], self.rewards[sampledSlots])
+		rolloutLengths = np.maximum(self.rolloutLengths[sampledSlots], 1)
+		return ExperiencesBatch(keys, self.states[sampledSlots], statesAfterMove, self.moves[sampledSlots], rewards, importanceSamplingWeights, self.stateDecoder, rolloutLengths)
 	
 	def UpdateBellmanDifferences(self, keys, bellmanDifferences):
 		bellmanDifferences = list(bellmanDifferences.flatten())
+		updatedSlots = []
+		updatedBellmanDifferences = []
 		for key, bellmanDifference in zip(keys, bellmanDifferences):
-			if key in self.experiences:
-				self.experiences[key].bellmanDifference = bellmanDifference
+			slot = self.slotOfKey.get(key)
+			if not slot is None:
+				updatedSlots.append(slot)
+				updatedBellmanDifferences.append(bellmanDifference)
+		if len(updatedSlots) > 0:
+			self.bellmanDifferences[updatedSlots] = updatedBellmanDifferences
+			self.SetSlotPriorities(updatedSlots, self.GetPriorities(updatedBellmanDifferences))
+	
+	def SetSlotPriorities(self, slots, priorities):
+		if len(slots) < 1:
+			return
+		self.prioritySums.Update(slots, priorities)
+		self.priorityMins.Update(slots, priorities)
+		self.maxPriority = max(self.maxPriority, float(np.max(priorities)))
+	
+	# (visits, mean rollout return, variance of the rollout returns) of the experience at key
+	def GetRewardStatistics(self, key):
+		slot = self.slotOfKey.get(key)
+		if slot is None:
+			return None
+		if not self.deduplicate:
+			return 1, float(self.rewardRolloutSums[slot]), 0.0
+		visitCount = int(self.visitCounts[slot])
+		return visitCount, float(self.rewardRolloutSums[slot]), float(self.rewardRolloutSquaredDeviations[slot]) / visitCount
+	
+	# the return of an experience without a rollout is its reward
+	def GetRewardRolloutSum(self, experience):
+		if experience.rolloutLength > 0:
+			return experience.rewardRolloutSum
+		return experience.reward
+	
+	# the stored experience has the same rollout length
+	def MergeExperience(self, slot, experience):
+		visitCount = self.visitCounts[slot] + 1
+		self.visitCounts[slot] = visitCount
+		self.rewards[slot] += (experience.reward - self.rewards[slot]) / visitCount
+		rewardRolloutSum = self.GetRewardRolloutSum(experience)
+		deviation = rewardRolloutSum - self.rewardRolloutSums[slot]
+		self.rewardRolloutSums[slot] += deviation / visitCount
+		self.rewardRolloutSquaredDeviations[slot] += deviation * (rewardRolloutSum - self.rewardRolloutSums[slot])
+		self.statesAfterMove[slot] = experience.stateAfterMove
+		if experience.rolloutLength > 0:
+			self.lastStatesInRollout[slot] = experience.stateAfterMove if experience.lastStateInRollout is None else experience.lastStateInRollout
+		
+		if not experience.bellmanDifference is None and (np.isnan(self.bellmanDifferences[slot]) or experience.bellmanDifference > self.bellmanDifferences[slot]):
+			self.bellmanDifferences[slot] = experience.bellmanDifference
+			self.SetSlotPriorities([slot], [float(self.GetPriorities(experience.bellmanDifference))])
+	
+	def RemoveSlotKey(self, slot):
+		key = self.keyOfSlot[slot]
+		if key is None:
+			return
+		del self.slotOfKey[key]
+		self.keyOfSlot[slot] = None
+		if self.deduplicate and self.slotOfTransitionHash.get(int(self.transitionHashes[slot])) == slot:
+			del self.slotOfTransitionHash[int(self.transitionHashes[slot])]
+	
+	# memory use and turnover of the buffer, eviction rate is per second since the previous call
+	def GetStats(self):
+		now = time.time()
+		evictionsPerSecond = (self.numEvicted - self.lastStatsNumEvicted) / max(now - self.lastStatsTime, 1e-9)
+		self.lastStatsTime = now
+		self.lastStatsNumEvicted = self.numEvicted
+		bytesPerExperience = 0 if self.bytesPerExperience is None else self.bytesPerExperience
+		return {
+			'experiences' : len(self),
+			'capacity' : self.capacity,
+			'fillRatio' : len(self) / self.capacity,
+			'bytesPerExperience' : bytesPerExperience,
+			'usedBytes' : len(self) * bytesPerExperience,
+			'allocatedBytes' : 0 if self.states is None else self.GetAllocatedBytes(self.capacity),
+			'maxBytes' : self.maxBytes,
+			'inserted' : self.numInserted,
+			'evicted' : self.numEvicted,
+			'merged' : self.numMerged,
+			'evictionsPerSecond' : evictionsPerSecond
+		}
 	
 	def __contains__(self, key):
-		return key in self.experiences
+		return key in self.slotOfKey
 	
+	# a copy of the stored experience, the buffer is changed through __setitem__ and UpdateBellmanDifferences
 	def __getitem__(self, key):
-		if key in self.experiences:
-			return self.experiences[key]
-		return None
+		slot = self.slotOfKey.get(key)
+		if slot is None:
+			return None
+		experience = Experience()
+		experience.key = key
+		experience.state = np.copy(self.states[slot])
+		experience.stateAfterMove = np.copy(self.statesAfterMove[slot])
+		experience.move = int(self.moves[slot])
+		experience.reward = float(self.rewards[slot])
+		if not np.isnan(self.bellmanDifferences[slot]):
+			experience.bellmanDifference = float(self.bellmanDifferences[slot])
+		experience.rolloutLength = int(self.rolloutLengths[slot])
+		if experience.rolloutLength > 0:
+			experience.lastStateInRollout = np.copy(self.lastStatesInRollout[slot])
+			experience.rewardRolloutSum = float(self.rewardRolloutSums[slot])
+		return experience
 	
 	def __delitem__(self, key):
-		if key in self.experiences:
-			self.__RemoveFromRewardValues(key)
-			return self.experiences[key]
-		return None
+		experience = self[key]
+		if not experience is None:
+			slot = self.slotOfKey[key]
+			self.RemoveSlotKey(slot)
+			self.prioritySums.Clear([slot])
+			self.priorityMins.Clear([slot])
+		return experience
 	
+	# new keys take the next slot of the ring, evicting its experience.
+	# experiences without a bellman difference get the highest priority seen so far
 	def __setitem__(self, key, experience):
-		if len(self.experiences) + 1 >= self.maxSize:
-			experienceToRemove = self.experienceKeysSorted[0]
-			self.experienceKeysSorted = self.experienceKeysSorted[1:]
-			del self.experiences[experienceToRemove]
-			
-		if len(self.experiences) < self.maxSize:
-			self.experiences[key] = experience
-			self.experienceKeysSorted.append(key)
+		if self.states is None:
+			self.AllocateColumns(experience)
+		slot = self.slotOfKey.get(key)
+		transitionHash = None
+		if slot is None and self.deduplicate:
+			transitionHash = GetTransitionHash(experience.state, experience.move, experience.rolloutLength)
+			repeatedSlot = self.slotOfTransitionHash.get(transitionHash)
+			if not repeatedSlot is None:
+				self.MergeExperience(repeatedSlot, experience)
+				self.numMerged += 1
+				return
+		if slot is None:
+			slot = self.nextSlot
+			self.nextSlot = (self.nextSlot + 1) % self.capacity
+			if not self.keyOfSlot[slot] is None:
+				self.RemoveSlotKey(slot)
+				self.numEvicted += 1
+			self.slotOfKey[key] = slot
+			self.keyOfSlot[slot] = key
+			self.numInserted += 1
+		if not transitionHash is None:
+			self.transitionHashes[slot] = transitionHash
+			self.slotOfTransitionHash[transitionHash] = slot
+			self.visitCounts[slot] = 1
+			self.rewardRolloutSquaredDeviations[slot] = 0
+		
+		self.states[slot] = experience.state
+		self.statesAfterMove[slot] = experience.stateAfterMove
+		self.moves[slot] = experience.move
+		self.rewards[slot] = experience.reward
+		self.rolloutLengths[slot] = experience.rolloutLength
+		self.rewardRolloutSums[slot] = self.GetRewardRolloutSum(experience)
+		if not experience.lastStateInRollout is None:
+			self.lastStatesInRollout[slot] = experience.lastStateInRollout
+		
+		if experience.bellmanDifference is None:
+			self.bellmanDifferences[slot] = np.nan
+			priority = self.maxPriority
+		else:
+			self.bellmanDifferences[slot] = experience.bellmanDifference
+			priority = float(self.GetPriorities(experience.bellmanDifference))
+		self.SetSlotPriorities([slot], [priority])
 	
 	def __len__(self):
-		return len(self.experiences)
-		
-	def __GetExperiencePriorities(self):
-		bellmanDifferences = []
-		keys = []
-		for key, experience in self.experiences.items():
-			bellmanDifferences.append(experience.bellmanDifference)
-			keys.append(key)
-		bellmanDifferencesExponentiated = np.power(np.array(bellmanDifferences) + self.priorityBiasFactor, self.priorityRandomness)
-		summed = np.sum(bellmanDifferencesExponentiated)
-		return keys, bellmanDifferencesExponentiated / summed
\ No newline at end of file
+		return len(self.slotOfKey)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import threading
+
+# collects experiences from any number of producer threads until the learner drains them.
+# every producer thread adds to one of numShards lists under that shard's own lock, so producers
+# rarely wait on each other and never on the replay buffer or its sampler. an experience is staged
+# whole when AddExperiences returns and every staged experience is drained exactly once
+class ExperienceStaging:
+	def __init__(self, numShards=None):
+		if numShards is None:
+			numShards = 8
+		self.shardLocks = [ threading.Lock() for shardNum in range(numShards) ]
+		self.shards = [ [] for shardNum in range(numShards) ]
+		self.threadShard = threading.local()
+		self.nextShardNum = 0
+		self.nextShardNumLock = threading.Lock()
+	
+	# producer threads are dealt the shards in turn on their first add
+	def GetShardNum(self):
+		shardNum = getattr(self.threadShard, 'shardNum', None)
+		if shardNum is None:
+			with self.nextShardNumLock:
+				shardNum = self.nextShardNum
+				self.nextShardNum = (self.nextShardNum + 1) % len(self.shards)
+			self.threadShard.shardNum = shardNum
+		return shardNum
+	
+	def AddExperiences(self, experiences):
+		shardNum = self.GetShardNum()
+		with self.shardLocks[shardNum]:
+			self.shards[shardNum].extend(experiences)
+	
+	# the staged experiences of every shard, each shard's list is swapped out under its lock
+	def Drain(self):
+		drainedExperiences = []
+		for shardNum in range(len(self.shards)):
+			with self.shardLocks[shardNum]:
+				shardExperiences = self.shards[shardNum]
+				self.shards[shardNum] = []
+			drainedExperiences.extend(shardExperiences)
+		return drainedExperiences
+	
+	def __len__(self):
+		return sum(len(shard) for shard in self.shards)
\ No newline at end of file
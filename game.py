@@ -1,22 +1,29 @@
+import time
 from ship import MoveOutcome
 
-class PlayerTurnIterator:
-	def __init__(self, players):
-		self.players = players
-		self.playersIndex = 0
+# outcome of one game, per player counts are indexed like Board.GetPlayers()
+class GameResult:
+	__slots__ = ['winner', 'loser', 'turns', 'hits', 'misses', 'repeats', 'wallTime']
 	
-	def __iter__(self):
-		return self
+	def __init__(self, numPlayers):
+		self.winner = None
+		self.loser = None
+		self.turns = 0
+		self.hits = [0] * numPlayers
+		self.misses = [0] * numPlayers
+		self.repeats = [0] * numPlayers
+		self.wallTime = 0.0
 	
-	def __next__(self):
-		currentPlayer = self.players[self.playersIndex]
-		self.playersIndex = (self.playersIndex + 1) % len(self.players)
-		return currentPlayer
+	def __str__(self):
+		return 'Winner: {}, turns: {}, hits: {}, misses: {}, repeats: {}, time: {:.3f}s'.format(self.winner.GetPlayerName() if not self.winner is None else None, self.turns, self.hits, self.misses, self.repeats, self.wallTime)
 
 class Game(object):
-	def __init__(self, board):
+	def __init__(self, board, headless=None):
+		if headless is None:
+			headless = False
 		self.board = board
 		self.players = self.board.GetPlayers()
+		self.headless = headless
 		
 		for player in self.players:
 			player.SetBoard(self.board)
@@ -26,44 +33,54 @@ class Game(object):
 		if len(self.players) != 2:
 			raise Exception('Must be exactly 2 players in game')
 	
-	def Play(self):
-		self.board.PlaceShips()
+	# trustedPlacement skips placement validation for ships coming from the placement sampler
+	def Play(self, trustedPlacement=None):
+		startTime = time.perf_counter()
+		self.board.PlaceShips(validate=not trustedPlacement)
 		
+		result = GameResult(len(self.players))
+		playerLost = None
 		for player in self.players:
 			numShips = len(player.GetShips())
 			self.aliveShipsOfPlayers[player] = numShips
+			if numShips < 1 and playerLost is None:
+				playerLost = player
 		
-		turnIteratorObj = PlayerTurnIterator(self.players)
-		turnIterator = iter(turnIteratorObj)
-		
-		playerTurnNumber = { player : 0 for player in self.players }
-		for playerAtTurn in turnIterator:
-			playerLost = False
-			for player, aliveShips in self.aliveShipsOfPlayers.items():
-				if aliveShips < 1:
-					print('{} has lost.'.format(player.GetPlayerName()))
-					playerLost = True
-					break
-			if playerLost:
-				break
-			
-			#print('\nIt is {}\'s turn'.format(playerAtTurn.GetPlayerName()))
-			
+		movesOfPlayers = [ set() for player in self.players ]
+		playerTurnNumber = [0] * len(self.players)
+		playerIndex = 0
+		while playerLost is None:
+			playerAtTurn = self.players[playerIndex]
+			playerHit = self.players[1 - playerIndex]
 			playerMove = playerAtTurn.GetNextMove()
-			#print('Player hit: {}\n'.format(playerMove))
-			for playerHit in self.players:
-				if playerHit == playerAtTurn:
-					continue
-				shipAtLocation = self.board.GetPlayersShipAtLocation(playerHit, playerMove)
-				if shipAtLocation is None:
-					playerAtTurn.ReceivePlayerMoveOutcome(playerTurnNumber[playerAtTurn], MoveOutcome.Miss)
-					continue
-				elif shipAtLocation.IsAlive():
-					moveOutcome = shipAtLocation.HitShip(playerMove)
-					playerAtTurn.ReceivePlayerMoveOutcome(playerTurnNumber[playerAtTurn], moveOutcome)
-				elif not shipAtLocation.IsAlive():
-					playerAtTurn.ReceivePlayerMoveOutcome(playerTurnNumber[playerAtTurn], MoveOutcome.HitAlreadyDestroyedShip)
-			self.aliveShipsOfPlayers = { player : player.GetAliveShips() for player in self.players }
-			playerTurnNumber[playerAtTurn] += 1
+			movesOfPlayer = movesOfPlayers[playerIndex]
+			if playerMove in movesOfPlayer:
+				result.repeats[playerIndex] += 1
+			else:
+				movesOfPlayer.add(playerMove)
+			
+			moveOutcome = self.board.ResolveMove(playerHit, playerMove)
+			playerAtTurn.ReceivePlayerMoveOutcome(playerTurnNumber[playerIndex], moveOutcome)
+			if moveOutcome is MoveOutcome.Miss:
+				result.misses[playerIndex] += 1
+			elif moveOutcome is MoveOutcome.HitAliveShip:
+				result.hits[playerIndex] += 1
+			elif moveOutcome is MoveOutcome.DestroyedShip:
+				result.hits[playerIndex] += 1
+				self.aliveShipsOfPlayers[playerHit] -= 1
+				if self.aliveShipsOfPlayers[playerHit] < 1:
+					playerLost = playerHit
+			playerTurnNumber[playerIndex] += 1
+			playerIndex = 1 - playerIndex
+		
+		result.turns = sum(playerTurnNumber)
+		result.loser = playerLost
+		for player in self.players:
+			if not player is playerLost:
+				result.winner = player
+		result.wallTime = time.perf_counter() - startTime
 		
-		print('Game over.')
\ No newline at end of file
+		if not self.headless:
+			print('{} has lost.'.format(playerLost.GetPlayerName()))
+			print('Game over.')
+		return result
\ No newline at end of file
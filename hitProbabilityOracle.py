@@ -0,0 +1,137 @@
+import os
+import pickle
+import numpy as np
+from vector2 import Vector2
+from ship import MoveOutcome
+from shipPlacementTable import GetPlacementTable
+
+bitCountOfByte = np.array([ bin(byteValue).count('1') for byteValue in range(256) ], dtype=np.int64)
+
+def GetBitCounts(masks):
+	return bitCountOfByte[masks.view(np.uint8).reshape((len(masks), 8))].sum(axis=1)
+
+# exact probability of every location holding a ship given the outcome grid seen so far,
+# every fleet consistent with the grid is taken as equally likely.
+# fleets are enumerated ship by ship as occupancy bitmasks, fleets reaching the same occupancy
+# are merged and only counted, so each observation costs one pass over the distinct occupancies.
+# results are kept in a table keyed by the observation masks and can be saved to / loaded from disk.
+class HitProbabilityOracle:
+	def __init__(self, boardSize, numShipsOfSize, tablePath=None, chunkSize=None):
+		if chunkSize is None:
+			chunkSize = 65536
+		self.boardSize = (int(boardSize[0]), int(boardSize[1]))
+		self.numShipsOfSize = dict(numShipsOfSize)
+		self.numLocations = self.boardSize[0] * self.boardSize[1]
+		self.tablePath = tablePath
+		self.chunkSize = chunkSize
+		if self.numLocations > 64:
+			raise Exception('HitProbabilityOracle supports boards of at most 64 locations, got {}.'.format(self.boardSize))
+		
+		# largest ships first keeps the number of distinct partial occupancies low
+		self.shipSizes = sorted([ shipSize for shipSize in self.numShipsOfSize.keys() for i in range(self.numShipsOfSize[shipSize]) ], reverse=True)
+		self.placementMasks = { shipSize : GetPlacementTable(self.boardSize, shipSize).maskWords[:,0] for shipSize in self.numShipsOfSize.keys() }
+		self.locationBits = np.left_shift(np.uint64(1), np.arange(self.numLocations, dtype=np.uint64))
+		
+		self.probabilityTable = {}
+		if not self.tablePath is None and os.path.exists(self.tablePath):
+			self.Load(self.tablePath)
+	
+	def GetMask(self, isLocationSet):
+		return int(np.bitwise_or.reduce(self.locationBits[isLocationSet]))
+	
+	# (hits, misses, destroyed ship locations, hits on already destroyed ships)
+	def GetObservationKey(self, moveOutcomes):
+		moveOutcomes = np.asarray(moveOutcomes).ravel()
+		if len(moveOutcomes) != self.numLocations:
+			raise Exception('HitProbabilityOracle observation does not match board size {}.'.format(self.boardSize))
+		isHit = (moveOutcomes >= MoveOutcome.HitAliveShip.value) & (moveOutcomes <= MoveOutcome.HitShipWhereAlreadyHit.value)
+		hitMask = self.GetMask(isHit)
+		missMask = self.GetMask(moveOutcomes == MoveOutcome.Miss.value)
+		destroyedMask = self.GetMask(moveOutcomes == MoveOutcome.DestroyedShip.value)
+		alreadyDestroyedMask = self.GetMask(moveOutcomes == MoveOutcome.HitAlreadyDestroyedShip.value)
+		return (hitMask, missMask, destroyedMask, alreadyDestroyedMask)
+	
+	def GetHitProbabilities(self, moveOutcomes):
+		return self.GetHitProbabilitiesOfKey(self.GetObservationKey(moveOutcomes)).reshape(self.boardSize)
+	
+	def GetHitProbabilitiesOfKey(self, observationKey):
+		hitProbabilities = self.probabilityTable.get(observationKey)
+		if hitProbabilities is None:
+			hitProbabilities = self.ComputeHitProbabilities(observationKey)
+			self.probabilityTable[observationKey] = hitProbabilities
+		return hitProbabilities
+	
+	def GetBestMove(self, moveOutcomes):
+		moveOutcomes = np.asarray(moveOutcomes)
+		locationScores = np.array(self.GetHitProbabilities(moveOutcomes), dtype=np.float64)
+		locationScores[moveOutcomes != MoveOutcome.NoAttempt.value] = -1.0
+		locationIndex = int(np.argmax(locationScores))
+		return Vector2(locationIndex // self.boardSize[1], locationIndex % self.boardSize[1])
+	
+	# placements of a ship size that agree with the observation on their own:
+	# no misses, and a ship is fully hit exactly when it holds a sunk location, holding at most one destroyed location
+	def GetConsistentPlacements(self, shipSize, observationKey):
+		hitMask, missMask, destroyedMask, alreadyDestroyedMask = [ np.uint64(mask) for mask in observationKey ]
+		masks = self.placementMasks[shipSize]
+		isFullyHit = (masks & ~hitMask) == 0
+		holdsSunkLocation = (masks & (destroyedMask | alreadyDestroyedMask)) != 0
+		isConsistent = ((masks & missMask) == 0) & (isFullyHit == holdsSunkLocation) & (GetBitCounts(masks & destroyedMask) <= 1)
+		return masks[isConsistent]
+	
+	def ComputeHitProbabilities(self, observationKey):
+		hitMask = np.uint64(observationKey[0])
+		consistentPlacements = { shipSize : self.GetConsistentPlacements(shipSize, observationKey) for shipSize in self.numShipsOfSize.keys() }
+		
+		occupancies = np.zeros(1, dtype=np.uint64)
+		numFleets = np.ones(1, dtype=np.float64)
+		remainingShipLocations = sum(self.shipSizes)
+		for shipSize in self.shipSizes:
+			placementMasks = consistentPlacements[shipSize]
+			remainingShipLocations -= shipSize
+			nextOccupancies = []
+			nextNumFleets = []
+			for chunkStart in range(0, len(occupancies), self.chunkSize):
+				chunkOccupancies = occupancies[chunkStart:chunkStart + self.chunkSize]
+				occupancyIndices, placementIndices = np.nonzero((chunkOccupancies[:,None] & placementMasks[None,:]) == 0)
+				chunkNextOccupancies = chunkOccupancies[occupancyIndices] | placementMasks[placementIndices]
+				# hits still uncovered must fit on the ships left to place
+				canCoverHits = GetBitCounts(hitMask & ~chunkNextOccupancies) <= remainingShipLocations
+				nextOccupancies.append(chunkNextOccupancies[canCoverHits])
+				nextNumFleets.append(numFleets[chunkStart + occupancyIndices[canCoverHits]])
+			occupancies, occupancyIndices = np.unique(np.concatenate(nextOccupancies), return_inverse=True)
+			numFleets = np.bincount(occupancyIndices.ravel(), weights=np.concatenate(nextNumFleets))
+		
+		coversHits = (occupancies & hitMask) == hitMask
+		occupancies = occupancies[coversHits]
+		numFleets = numFleets[coversHits]
+		totalFleets = numFleets.sum()
+		if totalFleets <= 0:
+			raise Exception('HitProbabilityOracle found no fleet consistent with the observation.')
+		
+		locationFleets = np.zeros(self.numLocations)
+		for chunkStart in range(0, len(occupancies), self.chunkSize):
+			chunkOccupancies = occupancies[chunkStart:chunkStart + self.chunkSize]
+			isOccupied = (chunkOccupancies[:,None] & self.locationBits[None,:]) != 0
+			locationFleets += numFleets[chunkStart:chunkStart + self.chunkSize].dot(isOccupied)
+		return (locationFleets / totalFleets).astype(np.float32)
+	
+	def GetTableSize(self):
+		return len(self.probabilityTable)
+	
+	def Save(self, tablePath=None):
+		if tablePath is None:
+			tablePath = self.tablePath
+		if tablePath is None:
+			raise Exception('HitProbabilityOracle Save called without table path.')
+		tableContents = {'boardSize' : self.boardSize, 'numShipsOfSize' : self.numShipsOfSize, 'probabilityTable' : self.probabilityTable}
+		# written next to the table first so an interrupted save leaves the old table intact
+		with open(tablePath + '.tmp', 'wb') as tableFile:
+			pickle.dump(tableContents, tableFile, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tablePath + '.tmp', tablePath)
+	
+	def Load(self, tablePath):
+		with open(tablePath, 'rb') as tableFile:
+			tableContents = pickle.load(tableFile)
+		if tuple(tableContents['boardSize']) != self.boardSize or tableContents['numShipsOfSize'] != self.numShipsOfSize:
+			raise Exception('HitProbabilityOracle table at {} was computed for a different board or fleet.'.format(tablePath))
+		self.probabilityTable.update(tableContents['probabilityTable'])
@@ -11,7 +11,7 @@ class HumanPlayer(IPlayer):
 		
 	def PlaceShips(self, board):
 		print('Randomly placing ships of {}'.format(self.playerName))
-		placedShips = RandomlyPlaceShips(board, self)
+		placedShips, shipOrigins = RandomlyPlaceShips(board, self)
 		for ship in placedShips:
 			orientation = 'vertically'
 			if not ship.IsVertical():
@@ -7,6 +7,11 @@ class AIModelState:
 		self.piecesBeenHit = None
 		self.currentlyPlaying = None
 		self.didWin = None
+		# set on states that only describe what changed since the previous state,
+		# moveOutcomes is then None and the changed location, if any, has the new outcome
+		self.isDelta = False
+		self.changedLocation = None
+		self.changedMoveOutcome = None
 
 class IAIModel:
 	__metaclass__ = ABCMeta
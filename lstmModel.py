@@ -7,11 +7,13 @@ import numpy as np
 from ship import MoveOutcome
 from vector2 import Vector2
 from experienceReplayBuffer import ExperienceReplayBuffer
+from normalizedBoard import NormalizedBoard
+from AIGameState import StateVectorRing
+import rewardFunction
 
 class LSTMAIModel:
 	def __init__(self, playerNumber, logOutputter=None):
 		self.stateSeq = []
-		self.stateSeqVectors = []
 		self.playerNumber = playerNumber
 		self.modelName = 'LSTM Model v1'
 		
@@ -32,6 +34,7 @@ class LSTMAIModel:
 		self.normedBoardLength = 10
 		self.normedBoardPositions = self.normedBoardLength*self.normedBoardLength
 		self.maxMoveOutcome = len(MoveOutcome) + 1 # add 1 for empty hit result
+		self.normedBoard = NormalizedBoard(self.normedBoardLength)
 		
 		self.actualBoardDimensions = None
 		
@@ -44,6 +47,7 @@ class LSTMAIModel:
 		self.maxSeqLength = 10
 		self.inputDimension = self.normedBoardPositions * self.maxMoveOutcome + 2
 		self.outputDimension = self.normedBoardPositions
+		self.stateVectors = StateVectorRing(self.maxSeqLength, self.inputDimension)
 		
 		if os.path.isfile(self.actorModelFilename):
 			print('Loading {}...'.format(self.actorModelFilename))
@@ -67,7 +71,7 @@ class LSTMAIModel:
 	
 	def ClearState(self):
 		self.stateSeq = []
-		self.stateSeqVectors = []
+		self.stateVectors.Clear()
 		self.rewards = []
 		self.numModelMovesAt = {}
 		self.stateBeforeLastMove = None
@@ -78,11 +82,6 @@ class LSTMAIModel:
 	def GetModelName(self):
 		return self.modelName
 	
-	def NormalizeBoardPosition(self, row, col):
-		normalizedRow = int((float(row) / self.actualBoardDimensions[1]) * self.normedBoardLength)
-		normalizedCol = int((float(col) / self.actualBoardDimensions[0]) * self.normedBoardLength)
-		return normalizedRow, normalizedCol
-		
 	def UnnormalizeBoardPosition(self, boardPos):
 		normedRow = boardPos / self.normedBoardLength
 		normedCol = boardPos - int(normedRow) * self.normedBoardLength
@@ -98,14 +97,7 @@ class LSTMAIModel:
 		self.actualBoardWidth = dimensions[1]
 	
 	def CreateMoveOutcomesVector(self, moveOutcomes):
-		normalizedMoveOutcomes = np.zeros((self.normedBoardLength,self.normedBoardLength,self.maxMoveOutcome))
-		
-		for rowNumber in range(moveOutcomes.shape[0]):
-			for colNumber in range(moveOutcomes.shape[1]):
-				moveOutcome = int(moveOutcomes[rowNumber,colNumber])
-				normalizedRow, normalizedCol = self.NormalizeBoardPosition(rowNumber, colNumber)
-				normalizedMoveOutcomes[normalizedRow,normalizedCol,moveOutcome] = 1		
-		return np.array(normalizedMoveOutcomes).flatten()
+		return self.normedBoard.EncodeMoveOutcomes(moveOutcomes)
 	
 	def CreateStateVector(self, state):
 		if state is None or state.moveOutcomes is None or state.moveOutcomes.shape[0] < 1:
@@ -117,12 +109,10 @@ class LSTMAIModel:
 		return stateVector
 		
 	def AppendState(self, state):		
-		if len(self.stateSeqVectors) >= self.maxSeqLength - 1:
-			self.stateSeqVectors = self.stateSeqVectors[1:]
+		if len(self.stateSeq) >= self.maxSeqLength - 1:
 			self.stateSeq = self.stateSeq[1:]
 		self.stateSeq.append(state)
-		stateVec = self.CreateStateVector(state)
-		self.stateSeqVectors.append(stateVec)
+		self.stateVectors.Append(self.CreateStateVector(state))
 		
 	def GetCriticBellmanDifference(self, statesAfterMove, moves, rewards):
 		batchIndices = np.arange(len(moves))
@@ -161,7 +151,7 @@ class LSTMAIModel:
 			reward = GetReward(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition, self.logOutputter)
 			self.rewards.append(reward)
 			
-			stateAfterMove = self.GetModelInputForState(self.stateSeqVectors)
+			stateAfterMove = np.copy(self.GetModelInputForState())
 			
 			# build batch from current state and experiences buffer
 			experiences_states, experiences_statesAfterMove, experiences_moves, experiences_rewards = self.experienceBuffer.GetBatch().ToMatrices()
@@ -202,11 +192,9 @@ class LSTMAIModel:
 			self.lastModelOutput = None
 			self.lastModelMove = None
 	
-	def GetModelInputForState(self, stateVectors):
-		modelInput = np.zeros((1, self.maxSeqLength, self.inputDimension))
-		for seqNum in range(len(stateVectors)):
-			modelInput[0, seqNum, :] = stateVectors[seqNum]
-		return modelInput
+	# view of the state window, valid until the next state update
+	def GetModelInputForState(self):
+		return self.stateVectors.GetWindow()[None,:,:]
 	
 	def RunModelAtStates(self, modelInputs, critic=None):
 		if critic is None or not critic:
@@ -254,7 +242,7 @@ class LSTMAIModel:
 		return boardPositions
 		
 	def GetNextMove(self):
-		modelInput = self.GetModelInputForState(self.stateSeqVectors)
+		modelInput = self.GetModelInputForState()
 		modelOutput = self.RunModelAtStates(modelInput)
 		boardPos = self.GetMovesFromModelOutput(modelOutput, exploreRandomly=True)
 		if len(boardPos.shape) > 0:
@@ -262,7 +250,7 @@ class LSTMAIModel:
 		else:
 			boardPos = int(boardPos)
 		
-		self.stateBeforeLastMove = modelInput
+		self.stateBeforeLastMove = np.copy(modelInput)
 		self.lastModelOutput = modelOutput
 		self.lastModelMove = boardPos
 			
@@ -327,20 +315,9 @@ def GetReward(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition, logOut
 	return reward
 		
 def GetMoveOutcomesOfRound(stateOfRounds):
-	moveOutcomesOfRound = np.zeros((len(MoveOutcome)))
-	
 	if len(stateOfRounds) > 1 and stateOfRounds[0].shape != stateOfRounds[1].shape:
 		raise Exception('LSTMAIModel GetMoveOutcomesOfRound rounds must have the same shape.')
-	
-	rows = stateOfRounds[0].shape[0]
-	columns = stateOfRounds[0].shape[1]
-	
-	for row in range(rows):
-		for col in range(rows):
-			round0_result = int(stateOfRounds[0][row,col])
-			if len(stateOfRounds) < 2 or round0_result != int(stateOfRounds[1][row,col]):
-				moveOutcomesOfRound[round0_result] += 1
-	return moveOutcomesOfRound
+	return rewardFunction.GetMoveOutcomesOfRound(stateOfRounds[0], stateOfRounds[1] if len(stateOfRounds) > 1 else None)
 
 def OutputModelMetrics(fitResult, logOutputter):
 	if not fitResult is None:
@@ -0,0 +1,133 @@
+import os
+import json
+import numpy as np
+from experienceReplayBuffer import ExperienceReplayBuffer
+
+# an ExperienceReplayBuffer whose columns are memory mapped .npy files in bufferPath, so the buffer
+# can be larger than RAM and outlives the process. the priority trees and the key index are kept in
+# memory and rebuilt from the mapped columns when an existing buffer is opened.
+# Flush writes the ring position to metadata.json, experiences written after the last Flush are
+# still found on reopening but may be overwritten before older ones.
+# readOnly opens an existing buffer without write access, e.g. for analysis scripts.
+# every writable opening of the buffer starts a new run with the next run number, callers put it in
+# their keys so the experiences of a restarted process never replace the ones stored under the same keys before
+class MappedExperienceReplayBuffer(ExperienceReplayBuffer):
+	def __init__(self, bufferPath, maxSize, batchSize, priorityRandomness=0.6, priorityBiasFactor=0.01, importanceSamplingExponent=0.0, stateDecoder=None, readOnly=None, deduplicate=None, maxBytes=None):
+		if readOnly is None:
+			readOnly = False
+		super(MappedExperienceReplayBuffer, self).__init__(maxSize, batchSize, priorityRandomness, priorityBiasFactor, importanceSamplingExponent, stateDecoder, deduplicate, maxBytes)
+		self.bufferPath = bufferPath
+		self.readOnly = readOnly
+		self.metadataPath = os.path.join(self.bufferPath, 'metadata.json')
+		self.keyLength = None
+		self.runNumber = 0
+		
+		if os.path.exists(self.metadataPath):
+			self.Open()
+		elif self.readOnly:
+			raise Exception('MappedExperienceReplayBuffer found no buffer at {} to open read only.'.format(self.bufferPath))
+		else:
+			os.makedirs(self.bufferPath, exist_ok=True)
+	
+	def GetColumnPath(self, columnName):
+		return os.path.join(self.bufferPath, columnName + '.npy')
+	
+	# keys are tuples of ints stored one per slot, slots without an experience are marked in isOccupied
+	def GetColumnLayouts(self, state):
+		columnLayouts = super(MappedExperienceReplayBuffer, self).GetColumnLayouts(state)
+		columnLayouts['keys'] = ((self.capacity, self.keyLength), np.int64, 0)
+		columnLayouts['isOccupied'] = ((self.capacity,), np.bool_, 0)
+		return columnLayouts
+	
+	def AllocateColumns(self, experience):
+		self.keyLength = len(experience.key)
+		self.stateShape = list(np.shape(experience.state))
+		self.stateDtype = np.asarray(experience.state).dtype.str
+		self.AllocateSlots(self.GetCapacity(experience.state, self.keyLength))
+		for columnName, (shape, dtype, initialValue) in self.GetColumnLayouts(experience.state).items():
+			column = np.lib.format.open_memmap(self.GetColumnPath(columnName), mode='w+', dtype=dtype, shape=shape)
+			if initialValue != 0:
+				column[:] = initialValue
+			setattr(self, columnName, column)
+		self.Flush()
+	
+	def Open(self):
+		with open(self.metadataPath, 'r') as metadataFile:
+			metadata = json.load(metadataFile)
+		if metadata['maxSize'] != self.maxSize:
+			raise Exception('MappedExperienceReplayBuffer at {} holds {} experiences, not {}.'.format(self.bufferPath, metadata['maxSize'], self.maxSize))
+		if metadata.get('deduplicate', False) != self.deduplicate:
+			raise Exception('MappedExperienceReplayBuffer at {} was not written with deduplicate {}.'.format(self.bufferPath, self.deduplicate))
+		self.keyLength = metadata['keyLength']
+		self.stateShape = metadata['stateShape']
+		self.stateDtype = metadata['stateDtype']
+		self.nextSlot = metadata['nextSlot']
+		self.runNumber = metadata.get('runNumber', 0)
+		if not self.readOnly:
+			self.runNumber += 1
+		self.bytesPerExperience = self.GetBytesPerExperience(np.zeros(self.stateShape, dtype=self.stateDtype), self.keyLength)
+		self.AllocateSlots(metadata['capacity'])
+		
+		mode = 'r' if self.readOnly else 'r+'
+		for columnName in self.GetColumnLayouts(np.zeros(self.stateShape, dtype=self.stateDtype)).keys():
+			setattr(self, columnName, np.lib.format.open_memmap(self.GetColumnPath(columnName), mode=mode))
+		
+		occupiedSlots = np.flatnonzero(self.isOccupied)
+		for slot, key in zip(occupiedSlots, self.keys[occupiedSlots].tolist()):
+			key = tuple(key)
+			self.slotOfKey[key] = int(slot)
+			self.keyOfSlot[slot] = key
+		if self.deduplicate:
+			for slot, transitionHash in zip(occupiedSlots, self.transitionHashes[occupiedSlots].tolist()):
+				self.slotOfTransitionHash[transitionHash] = int(slot)
+		bellmanDifferences = self.bellmanDifferences[occupiedSlots]
+		hasBellmanDifference = ~np.isnan(bellmanDifferences)
+		if np.any(hasBellmanDifference):
+			self.maxPriority = max(self.maxPriority, float(np.max(self.GetPriorities(bellmanDifferences[hasBellmanDifference]))))
+		priorities = np.where(hasBellmanDifference, self.GetPriorities(np.nan_to_num(bellmanDifferences)), self.maxPriority)
+		self.prioritySums.Update(occupiedSlots, priorities)
+		self.priorityMins.Update(occupiedSlots, priorities)
+		# the run is recorded before any of its experiences are written
+		if not self.readOnly:
+			self.Flush()
+	
+	def GetRunNumber(self):
+		return self.runNumber
+	
+	def Flush(self):
+		self.CheckWritable()
+		if self.states is None:
+			return
+		for columnName in self.GetColumnLayouts(np.zeros(self.stateShape, dtype=self.stateDtype)).keys():
+			getattr(self, columnName).flush()
+		metadata = {'maxSize' : self.maxSize, 'keyLength' : self.keyLength, 'stateShape' : self.stateShape, 'stateDtype' : self.stateDtype, 'nextSlot' : self.nextSlot, 'deduplicate' : self.deduplicate, 'capacity' : self.capacity, 'runNumber' : self.runNumber}
+		# written next to the metadata first so an interrupted flush leaves the old metadata intact
+		with open(self.metadataPath + '.tmp', 'w') as metadataFile:
+			json.dump(metadata, metadataFile)
+		os.replace(self.metadataPath + '.tmp', self.metadataPath)
+	
+	def CheckWritable(self):
+		if self.readOnly:
+			raise Exception('MappedExperienceReplayBuffer at {} is open read only.'.format(self.bufferPath))
+	
+	def UpdateBellmanDifferences(self, keys, bellmanDifferences):
+		self.CheckWritable()
+		super(MappedExperienceReplayBuffer, self).UpdateBellmanDifferences(keys, bellmanDifferences)
+	
+	def __delitem__(self, key):
+		self.CheckWritable()
+		slot = self.slotOfKey.get(key)
+		if not slot is None:
+			self.isOccupied[slot] = False
+		return super(MappedExperienceReplayBuffer, self).__delitem__(key)
+	
+	def __setitem__(self, key, experience):
+		self.CheckWritable()
+		if not self.keyLength is None and len(key) != self.keyLength:
+			raise Exception('MappedExperienceReplayBuffer keys have {} parts, got {}.'.format(self.keyLength, key))
+		super(MappedExperienceReplayBuffer, self).__setitem__(key, experience)
+		# merged experiences have no slot of their own
+		slot = self.slotOfKey.get(key)
+		if not slot is None:
+			self.keys[slot] = key
+			self.isOccupied[slot] = True
\ No newline at end of file
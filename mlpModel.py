@@ -9,7 +9,6 @@ from keras.models import load_model
 from LogOutputter import LogOutputter
 import numpy as np
 import threading
-import queue
 from ship import MoveOutcome
 from vector2 import Vector2
 from experienceReplayBuffer import ExperienceReplayBuffer, Experience
@@ -17,11 +16,18 @@ from mlpModel_build import BuildMLPModel
 from rewardFunction import GetReward
 from normalizedBoard import NormalizedBoard
 from AIGameState import AIGameState
+from nStepAccumulator import NStepAccumulator
+from experienceChannel import ExperienceChannel
+from stateHash import GetStateHash
 from weightsContainer import WeightsContainer
 
 class MLPAIModel:
-	def __init__(self, playerNumber, modelBuildLock, logOutputter=None, outputDiagnostics=None):
+	# with a trainer (MLPModelTrainer) the model only plays: its experiences go to the trainer and it
+	# takes the trainer's latest actor weights before a move whenever they changed. the replay buffer
+	# and the critic are the trainer's then, the model builds neither
+	def __init__(self, playerNumber, modelBuildLock, logOutputter=None, outputDiagnostics=None, trainer=None):
 		self.playerNumber = playerNumber
+		self.trainer = trainer
 		self.modelName = 'MLP Model v1'
 		
 		self.modelBuildLock = modelBuildLock
@@ -35,18 +41,35 @@ class MLPAIModel:
 		
 		experienceBufferSize = 1000000
 		experienceBufferBatch = 99
+		experienceBufferBytes = 1 << 30
 		priorityRandomness = 0.6
 		priorityBiasFactor = 0.01
+		# repeated (state, move) pairs share one buffer entry
+		deduplicateExperiences = True
 		self.currentRolloutLengthMax = 1
 		self.absoluteMaxRolloutLength = 10
 		self.rolloutLengthIncreaseEveryGame = 500
-		self.experienceBuffer = ExperienceReplayBuffer(experienceBufferSize, experienceBufferBatch, priorityRandomness, priorityBiasFactor)
-		self.newExperienceQueue = queue.Queue()
+		self.discount = 0.99
+		# experiences reach newExperienceChannel once their n step rollout is complete,
+		# handed over every experienceHandOffSize experiences and at the end of every game
+		self.nStepAccumulator = NStepAccumulator(self.currentRolloutLengthMax, self.discount)
+		self.experienceHandOffSize = 32
+		self.experiencesToHandOff = []
+		self.newExperienceChannel = ExperienceChannel()
+		self.experienceKeyPrefix = ()
+		if not self.trainer is None:
+			self.newExperienceChannel = self.trainer.newExperienceChannel
+			self.experienceKeyPrefix = (self.trainer.AddActor(),)
 		
 		self.normedBoardLength = 10
 		self.maxMoveOutcome = len(MoveOutcome) + 1 # add 1 for empty hit result
 		self.normedBoard = NormalizedBoard(self.normedBoardLength)
 		self.gameState = AIGameState(self.normedBoard, self.maxSeqLength)
+		if self.trainer is None:
+			# experiences hold raw uint8 state records, expanded to model inputs per batch
+			self.experienceBuffer = ExperienceReplayBuffer(experienceBufferSize, experienceBufferBatch, priorityRandomness, priorityBiasFactor, stateDecoder=self.gameState.GetStateRecordCodec(), deduplicate=deduplicateExperiences, maxBytes=experienceBufferBytes)
+		else:
+			self.experienceBuffer = self.trainer.experienceBuffer
 		self.LoadLogger(logOutputter, outputDiagnostics)
 		
 		# input:
@@ -64,25 +87,32 @@ class MLPAIModel:
 			self.LoadModel()
 			print('Built main models')
 		
-		weightsContainerLock = threading.Lock()
-		self.actorWeights = WeightsContainer(weightsContainerLock)
-		self.criticWeights = WeightsContainer(weightsContainerLock)
-		
-		self.actorWeights.PutWeights(self.actorModel)
-		self.criticWeights.PutWeights(self.criticModel)
+		if self.trainer is None:
+			weightsContainerLock = threading.Lock()
+			self.actorWeights = WeightsContainer(weightsContainerLock)
+			self.criticWeights = WeightsContainer(weightsContainerLock)
+			
+			self.actorWeights.PutWeights(self.actorModel)
+			self.criticWeights.PutWeights(self.criticModel)
+		else:
+			self.actorWeights = self.trainer.GetActorModelWeights()
+			self.criticWeights = self.trainer.GetCriticModelWeights()
 		
 		self.actorModelVersion = self.actorWeights.GetVersion()
 		self.criticModelVersion = self.criticWeights.GetVersion()
 		
 		self.stateBeforeLastMove = None
+		self.stateRecordBeforeLastMove = None
 		self.lastModelOutput = None
 		self.lastModelMove = None
 	
 	def NewGame(self):
+		self.PutExperiences(self.nStepAccumulator.EndGame(), endOfGame=True)
 		self.gameNum += 1
 		self.gameTurnNumber = 0
 		if self.gameNum > 0 and self.gameNum % self.rolloutLengthIncreaseEveryGame == 0:
 			self.currentRolloutLengthMax = min(self.currentRolloutLengthMax + 1, self.absoluteMaxRolloutLength)
+			self.nStepAccumulator.SetMaxRolloutLength(self.currentRolloutLengthMax)
 		
 	def ClearState(self):
 		self.logOutputter.Output('\n\n\n\n\nClearing MLP model state\n\n\n\n\n')
@@ -115,7 +145,9 @@ class MLPAIModel:
 		else:
 			self.actorModel = BuildMLPModel(self.maxSeqLength, self.inputDimension, self.outputDimension, tensorSuffix=('Actor' + modelSuffix))
 		
-		if os.path.isfile(self.criticModelFilename):
+		if not self.trainer is None:
+			self.criticModel = None
+		elif os.path.isfile(self.criticModelFilename):
 			print('Loading {}...'.format(self.criticModelFilename))
 			self.criticModel = load_model(self.criticModelFilename)
 		else:
@@ -124,17 +156,20 @@ class MLPAIModel:
 	def GetModelName(self):
 		return self.modelName
 		
-	def GetCriticBellmanTarget(self, statesAfterMove, moves, rewards, actorModel=None, criticModel=None):
+	# bootstrapDiscounts is discount ^ rollout length of every experience
+	def GetCriticBellmanTarget(self, statesAfterMove, moves, rewards, actorModel=None, criticModel=None, bootstrapDiscounts=None):
 		if actorModel is None:
 			actorModel = self.actorModel
 		if criticModel is None:
 			criticModel = self.criticModel
+		if bootstrapDiscounts is None:
+			bootstrapDiscounts = self.discount
 		batchIndices = np.arange(len(moves))
 		actorOutput = self.RunModelAtStates(statesAfterMove, model=actorModel)
 		criticOutput = self.RunModelAtStates(statesAfterMove, model=criticModel)
 		actorBestMoves = np.argmax(actorOutput, axis=-1)
 		maxQValuesAtState = criticOutput[batchIndices,actorBestMoves]
-		return rewards + 0.99*maxQValuesAtState
+		return rewards + bootstrapDiscounts*maxQValuesAtState
 	
 	def TrainModel(self, modelInput, correctModelOutput, importanceSamplingWeights=None, actorModel=None):
 		if actorModel is None:
@@ -149,16 +184,23 @@ class MLPAIModel:
 		if criticModel is None:
 			criticModel = self.criticModel
 		batchIndices = np.arange(len(experiencesBatch.moves))
-		bellmanTarget = self.GetCriticBellmanTarget(experiencesBatch.statesAfterMove, experiencesBatch.moves, experiencesBatch.rewards, actorModel=actorModel, criticModel=criticModel)
+		bootstrapDiscounts = np.power(self.discount, experiencesBatch.rolloutLengths)
+		bellmanTarget = self.GetCriticBellmanTarget(experiencesBatch.statesAfterMove, experiencesBatch.moves, experiencesBatch.rewards, actorModel=actorModel, criticModel=criticModel, bootstrapDiscounts=bootstrapDiscounts)
 		actorOutputAtMoves = actorOutputs[batchIndices,experiencesBatch.moves]
 		actorOutputs[batchIndices,experiencesBatch.moves] = bellmanTarget
 		self.TrainModel(experiencesBatch.states, actorOutputs, actorModel=actorModel)
 		bellmanDifference = np.abs(bellmanTarget - actorOutputAtMoves)
 		return bellmanDifference
 	
+	def LogExperienceBufferStats(self):
+		if not self.trainer is None:
+			self.trainer.LogExperienceBufferStats(self.logOutputter)
+			return
+		LogExperienceBufferStats(self.experienceBuffer, self.logOutputter)
+	
 	def LogQValues(self, reward, stateBeforeLastMove, lastModelOutput):
 		if not self.outputDiagnostics is None:
-			stateHash = tuple(stateBeforeLastMove.flatten().tolist())
+			stateHash = GetStateHash(stateBeforeLastMove)
 			if not stateHash in self.diagnosticsStateAtOutput:
 				self.diagnosticsStateAtOutput.add(stateHash)
 				self.diagnosticsLogOutputter.Output('Input')
@@ -190,13 +232,28 @@ class MLPAIModel:
 		except:
 			pass
 	
+	# blocks while the consumer of newExperienceChannel is behind
+	def PutExperiences(self, experiences, endOfGame=None):
+		if endOfGame is None:
+			endOfGame = False
+		self.experiencesToHandOff.extend(experiences)
+		if len(self.experiencesToHandOff) >= self.experienceHandOffSize or (endOfGame and len(self.experiencesToHandOff) > 0):
+			self.newExperienceChannel.Put(self.experiencesToHandOff)
+			self.experiencesToHandOff = []
+	
 	def ReceiveStateUpdate(self, state):
-		self.actualBoardDimensions = state.moveOutcomes.shape
+		if not state.isDelta:
+			self.actualBoardDimensions = state.moveOutcomes.shape
 		self.gameState.AppendState(state)
+		self.AddLastMoveExperience(state)
+		# the rollouts of a finished game end with the reward of its last move
+		if not state.currentlyPlaying:
+			self.PutExperiences(self.nStepAccumulator.EndGame(), endOfGame=True)
+	
+	# the experience of the move that led to state, once its outcome is known
+	def AddLastMoveExperience(self, state):
 		ownShipsDestroyed = 0
-		stateOfRounds = [state.moveOutcomes]
 		if len(self.gameState.stateSeq) > 1:
-			stateOfRounds.append(self.gameState.stateSeq[-2].moveOutcomes)
 			ownShipsDestroyed = self.gameState.stateSeq[-2].aliveShips - state.aliveShips
 		
 		if self.stateBeforeLastMove is None or self.lastModelOutput is None or self.lastModelMove is None:
@@ -206,40 +263,35 @@ class MLPAIModel:
 		self.gameState.MakeMoveAtPosition(self.lastModelMove)
 		
 		# calculate reward
-		moveOutcomesOfRound = self.gameState.GetRoundMoveOutcomeVector(stateOfRounds)
+		moveOutcomesOfRound = self.gameState.GetLatestRoundMoveOutcomeVector()
 		reward = GetReward(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition, self.logOutputter)
 		self.gameState.rewards.append(reward)
 		
-		stateAfterMove = self.GetModelInputForState(self.gameState.stateSeqVectors)
-		
 		# build batch from current state and experiences buffer
 		newExperience = Experience()
-		newExperience.key = (self.gameNum, self.gameTurnNumber)
-		newExperience.state = self.stateBeforeLastMove[0,:]
-		newExperience.stateAfterMove = stateAfterMove[0,:]
+		newExperience.key = self.experienceKeyPrefix + (self.gameNum, self.gameTurnNumber)
+		newExperience.state = self.stateRecordBeforeLastMove
+		newExperience.stateAfterMove = self.gameState.GetStateRecord()
 		newExperience.move = self.lastModelMove
 		newExperience.reward = reward
 		self.gameTurnNumber += 1
-		
-		while self.newExperienceQueue.qsize() > 1000:
-			time.sleep(20)
-		
-		self.newExperienceQueue.put(newExperience)
+		self.PutExperiences(self.nStepAccumulator.AddExperience(newExperience))
 		
 		self.stateBeforeLastMove = None
+		self.stateRecordBeforeLastMove = None
 		self.lastModelOutput = None
 		self.lastModelMove = None
 	
 	def UpdateImportanceSampling(self):
+		if not self.trainer is None:
+			self.trainer.UpdateImportanceSampling()
+			return
 		# tuned to gradually increase to 0.5 at 2 million iterations
 		self.experienceBuffer.SetImportanceSamplingExponent(self.modelIterations / (self.modelIterations + 2000000))
 	
-	def GetModelInputForState(self, stateVectors):
-		modelInput = np.zeros((1, self.maxSeqLength, self.inputDimension))
-		for seqNum in range(self.maxSeqLength):
-			modelInput[0, seqNum, :] = stateVectors[seqNum]
-		modelInput = modelInput.reshape((1, self.maxSeqLength * self.inputDimension))
-		return modelInput
+	# view of the state window, valid until the next state update
+	def GetModelInputForState(self):
+		return self.gameState.GetStateWindow().reshape((1, self.maxSeqLength * self.inputDimension))
 	
 	def RunModelAtStates(self, modelInputs, critic=None, model = None):
 		if not model is None:
@@ -279,18 +331,20 @@ class MLPAIModel:
 		boardPositions = np.array(modelMoves)
 		return boardPositions
 		
+	# published weight lists are never modified, so they are loaded outside the container's lock.
+	# moves only run the actor model, the critic is left to the trainer
+	def PullTrainerWeights(self):
+		if self.trainer is None:
+			return
+		if self.actorWeights.GetVersion() != self.actorModelVersion:
+			actorWeights, self.actorModelVersion = self.actorWeights.GetWeightsValues()
+			if not actorWeights is None:
+				self.actorModel.set_weights(actorWeights)
+	
 	def GetNextMove(self):
-		latestActorVersion = self.actorWeights.GetVersion()
-		latestCriticVersion = self.criticWeights.GetVersion()
-		
-		#if latestActorVersion > self.actorModelVersion:
-		#	self.actorWeights.GetWeights(self.actorModel)
-		#	self.actorModelVersion = latestActorVersion
-		#if latestCriticVersion > self.criticModelVersion:
-		#	self.criticWeights.GetWeights(self.criticModel)
-		#	self.criticModelVersion = latestCriticVersion
+		self.PullTrainerWeights()
 		#self.actorModel.summary()
-		modelInput = self.GetModelInputForState(self.gameState.stateSeqVectors)
+		modelInput = self.GetModelInputForState()
 		modelOutput = self.RunModelAtStates(modelInput)
 		boardPos = self.GetMovesFromModelOutput(modelOutput, exploreRandomly=True)
 		if len(boardPos.shape) > 0:
@@ -298,7 +352,8 @@ class MLPAIModel:
 		else:
 			boardPos = int(boardPos)
 		
-		self.stateBeforeLastMove = modelInput
+		self.stateBeforeLastMove = np.copy(modelInput)
+		self.stateRecordBeforeLastMove = self.gameState.GetStateRecord()
 		self.lastModelOutput = modelOutput
 		self.lastModelMove = boardPos
 			
@@ -306,6 +361,10 @@ class MLPAIModel:
 		moveVec = Vector2(moveRow, moveCol)
 		return moveVec
 
+def LogExperienceBufferStats(experienceBuffer, logOutputter):
+	stats = experienceBuffer.GetStats()
+	logOutputter.Output('Experience Buffer Stats: {}'.format(', '.join('{} - {}'.format(name, value) for name, value in stats.items())))
+
 def OutputModelMetrics(fitResult, logOutputter):
 	if not fitResult is None:
 		metrics = fitResult.history
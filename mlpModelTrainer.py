@@ -1,148 +1,225 @@
+import os.path
 import threading
+import numpy as np
+import keras.backend as K
+from keras.models import load_model
+from ship import MoveOutcome
 from experienceReplayBuffer import ExperienceReplayBuffer, Experience
 from mlpModel_build import BuildMLPModel
+from normalizedBoard import NormalizedBoard
+from AIGameState import AIGameState
 from weightsContainer import WeightsContainer
+from batchPrefetcher import BatchPrefetcher
+from experienceChannel import ExperienceChannel
+from mlpModel import LogExperienceBufferStats, OutputModelMetrics
 
+# learns from the experiences of any number of MLPAIModel actors on its own threads.
+# the trainer owns the replay buffer, the trained model with its optimizer and the critic (target) model,
+# actors hand their experiences over through newExperienceChannel and pull the weights published to
+# actorWeights whenever the version changed, so moves never wait on a training step.
+# training starts once SignalModelBuilding is called, after the session's variables are initialized
 class MLPModelTrainer:
-	def __init__(self, newExperienceQueue, modelBuildLock):
-		self.newExperienceQueue = newExperienceQueue
+	def __init__(self, modelBuildLock, logOutputter, session=None):
+		if session is None:
+			session = K.get_session()
 		self.modelBuildLock = modelBuildLock
+		self.logOutputter = logOutputter
+		self.session = session
 		self.modelBuildEvent = threading.Event()
+		self.stopEvent = threading.Event()
+		self.modelName = 'MLP Model v1'
 		
 		self.modelIterations = 0
 		self.trainCriticEveryIter = 20
 		self.saveModelEveryIter = 100
-		self.explorationProb = 0.005
+		self.publishWeightsEveryIter = 10
+		self.maxSeqLength = 1
+		self.discount = 0.99
 		
 		experienceBufferSize = 1000000
 		experienceBufferBatch = 99
+		experienceBufferBytes = 1 << 30
 		priorityRandomness = 0.6
 		priorityBiasFactor = 0.01
-		self.currentRolloutLengthMax = 1
-		self.absoluteMaxRolloutLength = 10
-		self.rolloutLengthIncreaseEveryGame = 500
-		self.experienceBuffer = ExperienceReplayBuffer(experienceBufferSize, experienceBufferBatch, priorityRandomness, priorityBiasFactor)
+		deduplicateExperiences = True
+		
+		# the same model inputs as MLPAIModel
+		self.normedBoardLength = 10
+		self.maxMoveOutcome = len(MoveOutcome) + 1 # add 1 for empty hit result
+		self.normedBoard = NormalizedBoard(self.normedBoardLength)
+		normedBoardDimensions = self.normedBoard.GetBoardDimensions()
+		self.normedBoardPositions = normedBoardDimensions[0]*normedBoardDimensions[1]
+		self.inputDimension = self.normedBoardPositions * self.maxMoveOutcome + 2
+		self.outputDimension = self.normedBoardPositions
+		
+		stateDecoder = AIGameState(self.normedBoard, self.maxSeqLength).GetStateRecordCodec()
+		self.experienceBuffer = ExperienceReplayBuffer(experienceBufferSize, experienceBufferBatch, priorityRandomness, priorityBiasFactor, stateDecoder=stateDecoder, deduplicate=deduplicateExperiences, maxBytes=experienceBufferBytes)
+		self.batchPrefetcher = BatchPrefetcher(self.experienceBuffer)
+		self.newExperienceChannel = ExperienceChannel()
+		self.numActors = 0
+		self.actorsLock = threading.Lock()
 		
-		self.LoadModel()
-				
 		weightsContainerLock = threading.Lock()
 		self.actorWeights = WeightsContainer(weightsContainerLock)
 		self.criticWeights = WeightsContainer(weightsContainerLock)
 		
-		self.actorWeights.PutWeights(self.actorModel)
-		self.criticWeights.PutWeights(self.criticModel)
-		
-		self.actorModelVersion = self.actorWeights.GetVersion()
-		self.criticModelVersion = self.criticWeights.GetVersion()
+		self.actorModel = None
+		self.criticModel = None
 		
+		# experiences are taken from the channel as they arrive, however long a training step takes
+		self.intakeThread = threading.Thread(target=self.IntakeThread)
+		self.intakeThread.daemon = True
+		self.intakeThread.start()
 		self.trainingThread = threading.Thread(target=self.TrainingThread)
+		self.trainingThread.daemon = True
 		self.trainingThread.start()
-		
+	
+	# the first of the files that exists, None when there is none
+	def FindModelFile(self, modelFilenames):
+		for modelFilename in modelFilenames:
+			if os.path.isfile(modelFilename):
+				return modelFilename
+		return None
+	
+	# without a checkpoint of its own the trainer starts from the one MLPAIModel saved for player 0,
+	# so the weights it publishes do not replace trained players with random ones
 	def LoadModel(self):
 		self.modelSavePrefix = self.modelName.replace(' ','_')
 		self.actorModelFilename = '{}_actor.h5'.format(self.modelSavePrefix)
 		self.criticModelFilename = '{}_critic.h5'.format(self.modelSavePrefix)
+		playerModelSavePrefix = '{}_Player0'.format(self.modelSavePrefix)
 		
-		modelSuffix = 'Model_'
+		modelSuffix = 'TrainerModel_'
 		
-		if os.path.isfile(self.actorModelFilename):
-			print('Loading {}...'.format(self.actorModelFilename))
-			self.actorModel = load_model(self.actorModelFilename)
+		actorModelFilename = self.FindModelFile([self.actorModelFilename, '{}_actor.h5'.format(playerModelSavePrefix)])
+		if not actorModelFilename is None:
+			print('Loading {}...'.format(actorModelFilename))
+			self.actorModel = load_model(actorModelFilename)
 		else:
 			self.actorModel = BuildMLPModel(self.maxSeqLength, self.inputDimension, self.outputDimension, tensorSuffix=('Actor' + modelSuffix))
 		
-		if os.path.isfile(self.criticModelFilename):
-			print('Loading {}...'.format(self.criticModelFilename))
-			self.criticModel = load_model(self.criticModelFilename)
+		criticModelFilename = self.FindModelFile([self.criticModelFilename, '{}_critic.h5'.format(playerModelSavePrefix)])
+		if not criticModelFilename is None:
+			print('Loading {}...'.format(criticModelFilename))
+			self.criticModel = load_model(criticModelFilename)
 		else:
 			self.criticModel = BuildMLPModel(self.maxSeqLength, self.inputDimension, self.outputDimension, tensorSuffix=('Critic' + modelSuffix))
-		
+	
 	def SignalModelBuilding(self):
 		self.modelBuildEvent.set()
 	
+	def Stop(self):
+		self.stopEvent.set()
+		self.modelBuildEvent.set()
+		self.newExperienceChannel.Close()
+		self.trainingThread.join()
+		self.intakeThread.join()
+		self.batchPrefetcher.Stop()
+	
+	# a number for every actor so the keys of their experiences do not collide in the buffer
+	def AddActor(self):
+		with self.actorsLock:
+			actorNumber = self.numActors
+			self.numActors += 1
+			return actorNumber
+	
 	def GetActorModelWeights(self):
 		return self.actorWeights
 	
 	def GetCriticModelWeights(self):
 		return self.criticWeights
 	
+	# the weights are copied out of the session before the container's lock is taken
+	def PublishWeights(self, critic=None):
+		self.actorWeights.PutWeightsValues(self.actorModel.get_weights())
+		if not critic is None and critic:
+			self.criticWeights.PutWeightsValues(self.criticModel.get_weights())
+	
 	def UpdateImportanceSampling(self):
 		# tuned to gradually increase to 0.5 at 2 million iterations
 		self.experienceBuffer.SetImportanceSamplingExponent(self.modelIterations / (self.modelIterations + 2000000))
-
+	
+	# the buffer is only read while the prefetcher does not change it
+	def LogExperienceBufferStats(self, logOutputter=None):
+		if logOutputter is None:
+			logOutputter = self.logOutputter
+		with self.batchPrefetcher.bufferLock:
+			LogExperienceBufferStats(self.experienceBuffer, logOutputter)
+	
+	def RunModelAtStates(self, modelInputs, critic=None):
+		if critic is None or not critic:
+			modelOutput = self.actorModel.predict(modelInputs, batch_size=len(modelInputs), verbose=0)
+		else:
+			modelOutput = self.criticModel.predict(modelInputs, batch_size=len(modelInputs), verbose=0)
+		
+		if modelOutput is None or modelOutput.shape != (len(modelInputs), self.outputDimension):
+			raise Exception('MLP Model Trainer predict returned invalid result.')
+		return modelOutput
+	
+	# bootstrapDiscounts is discount ^ rollout length of every experience
+	def GetCriticBellmanTarget(self, statesAfterMove, rewards, bootstrapDiscounts):
+		batchIndices = np.arange(len(rewards))
+		actorOutput = self.RunModelAtStates(statesAfterMove)
+		criticOutput = self.RunModelAtStates(statesAfterMove, critic=True)
+		actorBestMoves = np.argmax(actorOutput, axis=-1)
+		maxQValuesAtState = criticOutput[batchIndices,actorBestMoves]
+		return rewards + bootstrapDiscounts*maxQValuesAtState
+	
+	def TrainOnExperiences(self, experiencesBatch):
+		actorOutputs = self.RunModelAtStates(experiencesBatch.states)
+		batchIndices = np.arange(len(experiencesBatch.moves))
+		bootstrapDiscounts = np.power(self.discount, experiencesBatch.rolloutLengths)
+		bellmanTarget = self.GetCriticBellmanTarget(experiencesBatch.statesAfterMove, experiencesBatch.rewards, bootstrapDiscounts)
+		actorOutputAtMoves = actorOutputs[batchIndices,experiencesBatch.moves]
+		actorOutputs[batchIndices,experiencesBatch.moves] = bellmanTarget
+		fitResult = self.actorModel.fit(experiencesBatch.states, actorOutputs, batch_size=len(experiencesBatch.states), epochs=1, verbose=0, sample_weight=experiencesBatch.importanceSamplingWeights)
+		if self.modelIterations % 100 == 0:
+			OutputModelMetrics(fitResult, self.logOutputter)
+		return np.abs(bellmanTarget - actorOutputAtMoves)
+	
+	def TrainCritic(self):
+		self.criticModel.set_weights(self.actorModel.get_weights())
+	
+	def SaveModels(self):
+		try:
+			self.actorModel.save(self.actorModelFilename)
+			self.criticModel.save(self.criticModelFilename)
+		except:
+			pass
+	
+	def IntakeThread(self):
+		while not self.stopEvent.is_set():
+			# new experiences go to the buffer with the highest priority through the prefetcher
+			self.batchPrefetcher.AddExperiences(self.newExperienceChannel.GetAll(timeout=1.0))
+	
 	def TrainingThread(self):
 		self.modelBuildEvent.wait()
-		with self.modelBuildLock:
-			sess = K.get_session()
-			with sess.graph.as_default():
-				actorModel = BuildMLPModel(self.maxSeqLength, self.inputDimension, self.outputDimension, tensorSuffix='Actor')
-				criticModel = BuildMLPModel(self.maxSeqLength, self.inputDimension, self.outputDimension, tensorSuffix='Critic')
+		if self.stopEvent.is_set():
+			return
+		with self.session.graph.as_default():
+			with self.modelBuildLock:
+				self.LoadModel()
 				print('Built training models')
-			self.actorWeights.GetWeights(actorModel)
-			self.criticWeights.GetWeights(criticModel)
-		
-		while True:
-			self.UpdateImportanceSampling()
+			self.PublishWeights(critic=True)
 			
-			experiencesBatch = self.experienceBuffer.GetBatchMatrices()
-			newExperience = None
-			#print('Hi')
-			if not self.newExperienceQueue.empty():
-				#print('new experience')
-				newExperience = self.newExperienceQueue.get_nowait()
-				experiencesBatch.importanceSamplingWeights = np.append([1.0], experiencesBatch.importanceSamplingWeights)
-				
-				if experiencesBatch.states.shape[0] > 0:
-					experiencesBatch.states = np.append(experiencesBatch.states, [newExperience.state], axis=0)
-					experiencesBatch.statesAfterMove = np.append(experiencesBatch.statesAfterMove, [newExperience.stateAfterMove], axis=0)
-					experiencesBatch.moves = np.append(experiencesBatch.moves, [newExperience.move])
-					experiencesBatch.rewards = np.append(experiencesBatch.rewards, [newExperience.reward])
-				else:
-					experiencesBatch.states = np.array([newExperience.state])
-					experiencesBatch.statesAfterMove = np.array([newExperience.stateAfterMove])
-					experiencesBatch.moves = np.array([newExperience.move])
-					experiencesBatch.rewards = np.array([newExperience.reward])
+			self.batchPrefetcher.Start()
+			while not self.stopEvent.is_set():
+				self.UpdateImportanceSampling()
+				experiencesBatch = self.batchPrefetcher.GetBatch(1.0)
+				if experiencesBatch is None:
+					continue
 				
-				moveRow, moveCol = self.normedBoard.UnnormalizeBoardPosition(newExperience.move)
-				moveVec = Vector2(moveRow, moveCol)
-				self.logOutputter.Output('MLP shooting at {}'.format(moveVec))
+				bellmanDifferences = self.TrainOnExperiences(experiencesBatch)
+				self.batchPrefetcher.UpdateBellmanDifferences(experiencesBatch.keys, bellmanDifferences)
 				
-				#self.LogQValues(newExperience.reward)
-			
-			if len(experiencesBatch) < 1:
-				time.sleep(20)
-				continue
-			
-			actorOutputsAtBatch = self.RunModelAtStates(experiencesBatch.states, model=actorModel)
-			
-			# train model and add new experience to buffer
-			bellmanDifferences = self.TrainOnExperiences(experiencesBatch, actorOutputsAtBatch, actorModel=actorModel, criticModel=criticModel)
-			self.actorWeights.PutWeights(actorModel)
-			
-			if not newExperience is None:
-				self.experienceBuffer.UpdateBellmanDifferences(experiencesBatch.keys, bellmanDifferences[:-1])
-				newExperience.bellmanDifference = bellmanDifferences[-1]
-				self.experienceBuffer[newExperience.key] = newExperience
-			else:
-				self.experienceBuffer.UpdateBellmanDifferences(experiencesBatch.keys, bellmanDifferences)
+				if self.modelIterations > 0 and self.modelIterations % 100 == 0:
+					self.logOutputter.Output('Bellman Difference: Avg - {}, Min - {}, Max - {}'.format(np.mean(bellmanDifferences), np.min(bellmanDifferences), np.max(bellmanDifferences)))
+					self.LogExperienceBufferStats()
+				self.modelIterations += 1
 				
-			if self.modelIterations > 0 and self.modelIterations % 100 == 0:
-				self.logOutputter.Output('Bellman Difference: Avg - {}, Min - {}, Max - {}'.format(np.mean(bellmanDifferences), np.min(bellmanDifferences), np.max(bellmanDifferences)))
-			self.modelIterations += 1
-			
-			if self.modelIterations % self.trainCriticEveryIter == 0:
-				self.TrainCritic(actorModel=actorModel, criticModel=criticModel)
-				self.criticWeights.PutWeights(criticModel)
-			if self.modelIterations > 0 and self.modelIterations % self.saveModelEveryIter == 0:
-				pass#self.SaveModels(actorModel=actorModel, criticModel=criticModel)
-			
-			if not newExperience is None:
-				gameTurnNumber = newExperience.key[-1]
-				for experienceGameTurn in range(gameTurnNumber):
-					experienceKey = (self.gameNum, experienceGameTurn)
-					if experienceKey in self.experienceBuffer and self.experienceBuffer[experienceKey].rolloutLength < self.currentRolloutLengthMax:
-						self.experienceBuffer[experienceKey].rolloutLength += 1
-						self.experienceBuffer[experienceKey].rewardRolloutSum += newExperience.reward
-						self.experienceBuffer[experienceKey].lastStateInRollout = newExperience.stateAfterMove
-	
-	
\ No newline at end of file
+				if self.modelIterations % self.trainCriticEveryIter == 0:
+					self.TrainCritic()
+				if self.modelIterations % self.publishWeightsEveryIter == 0:
+					self.PublishWeights(critic=(self.modelIterations % self.trainCriticEveryIter == 0))
+				if self.modelIterations % self.saveModelEveryIter == 0:
+					self.SaveModels()
\ No newline at end of file
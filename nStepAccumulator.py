@@ -0,0 +1,38 @@
+from collections import deque
+
+# turns the one step experiences of a game into n step experiences as the turns arrive.
+# every pending experience collects the discounted rewards of the turns after it in rewardRolloutSum,
+# with the state after the latest of them in lastStateInRollout, and is released once its rollout
+# holds maxRolloutLength turns or the game ends
+class NStepAccumulator:
+	def __init__(self, maxRolloutLength, discount=None):
+		if discount is None:
+			discount = 0.99
+		self.maxRolloutLength = maxRolloutLength
+		self.discount = discount
+		self.pendingExperiences = deque()
+	
+	def SetMaxRolloutLength(self, maxRolloutLength):
+		self.maxRolloutLength = maxRolloutLength
+	
+	# returns the experiences whose rollout is complete
+	def AddExperience(self, experience):
+		for pendingExperience in self.pendingExperiences:
+			pendingExperience.rewardRolloutSum += (self.discount ** pendingExperience.rolloutLength) * experience.reward
+			pendingExperience.rolloutLength += 1
+			pendingExperience.lastStateInRollout = experience.stateAfterMove
+		experience.rewardRolloutSum = experience.reward
+		experience.rolloutLength = 1
+		experience.lastStateInRollout = experience.stateAfterMove
+		self.pendingExperiences.append(experience)
+		
+		completeExperiences = []
+		while len(self.pendingExperiences) > 0 and self.pendingExperiences[0].rolloutLength >= self.maxRolloutLength:
+			completeExperiences.append(self.pendingExperiences.popleft())
+		return completeExperiences
+	
+	# the rollouts of a finished game end with its last turn
+	def EndGame(self):
+		completeExperiences = list(self.pendingExperiences)
+		self.pendingExperiences.clear()
+		return completeExperiences
\ No newline at end of file
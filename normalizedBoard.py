@@ -1,3 +1,4 @@
+import numpy as np
 from ship import MoveOutcome
 
 class NormalizedBoard:
@@ -6,6 +7,8 @@ class NormalizedBoard:
 		self.normedBoardPositions = self.normedBoardLength*self.normedBoardLength
 		self.maxMoveOutcome = len(MoveOutcome) + 1 # add 1 for empty hit result
 		self.actualBoardDimensions = None
+		self.oneHotIndexMaps = {}
+		self.oneHotIndexMapsInjective = {}
 	
 	def GetBoardDimensions(self):
 		return (self.normedBoardLength, self.normedBoardLength)
@@ -16,8 +19,11 @@ class NormalizedBoard:
 	def NormalizeBoardPosition(self, row, col):
 		if self.actualBoardDimensions is None:
 			return None
-		normalizedRow = int((float(row) / self.actualBoardDimensions[1]) * self.normedBoardLength)
-		normalizedCol = int((float(col) / self.actualBoardDimensions[0]) * self.normedBoardLength)
+		return self.NormalizeBoardPositionOfDimensions(row, col, self.actualBoardDimensions)
+	
+	def NormalizeBoardPositionOfDimensions(self, row, col, actualBoardDimensions):
+		normalizedRow = int((float(row) / actualBoardDimensions[1]) * self.normedBoardLength)
+		normalizedCol = int((float(col) / actualBoardDimensions[0]) * self.normedBoardLength)
 		return normalizedRow, normalizedCol
 		
 	def UnnormalizeBoardPosition(self, boardPos):
@@ -28,3 +34,49 @@ class NormalizedBoard:
 		row = int((normedRow / self.normedBoardLength) * self.actualBoardDimensions[1])
 		col = int((normedCol / self.normedBoardLength) * self.actualBoardDimensions[0])
 		return row, col
+	
+	def GetOneHotLength(self):
+		return self.normedBoardPositions * self.maxMoveOutcome
+	
+	# index of the first one hot entry of every actual board location, computed once per board shape
+	def GetOneHotIndexMap(self, actualBoardDimensions):
+		actualBoardDimensions = (int(actualBoardDimensions[0]), int(actualBoardDimensions[1]))
+		indexMap = self.oneHotIndexMaps.get(actualBoardDimensions)
+		if indexMap is None:
+			indexMap = np.zeros(actualBoardDimensions, dtype=np.int64)
+			for row in range(actualBoardDimensions[0]):
+				for col in range(actualBoardDimensions[1]):
+					normalizedRow, normalizedCol = self.NormalizeBoardPositionOfDimensions(row, col, actualBoardDimensions)
+					indexMap[row,col] = (normalizedRow * self.normedBoardLength + normalizedCol) * self.maxMoveOutcome
+			self.oneHotIndexMaps[actualBoardDimensions] = indexMap
+		return indexMap
+	
+	# whether every actual location has its own normed location, only then can a single location be re-encoded on its own
+	def IsOneHotIndexMapInjective(self, actualBoardDimensions):
+		actualBoardDimensions = (int(actualBoardDimensions[0]), int(actualBoardDimensions[1]))
+		isInjective = self.oneHotIndexMapsInjective.get(actualBoardDimensions)
+		if isInjective is None:
+			indexMap = self.GetOneHotIndexMap(actualBoardDimensions)
+			isInjective = len(np.unique(indexMap)) == indexMap.size
+			self.oneHotIndexMapsInjective[actualBoardDimensions] = isInjective
+		return isInjective
+	
+	# one hot (normed rows, normed cols, outcome) encoding of an outcome grid, flattened.
+	# encoded, when given, must be zeroed and is filled in place
+	def EncodeMoveOutcomes(self, moveOutcomes, encoded=None):
+		indexMap = self.GetOneHotIndexMap(moveOutcomes.shape)
+		if encoded is None:
+			encoded = np.zeros(self.GetOneHotLength(), dtype=np.float32)
+		encoded[indexMap + moveOutcomes.astype(np.int64)] = 1
+		return encoded
+	
+	# encodes an (N, rows, cols) stack of outcome grids into an (N, one hot length) matrix
+	def EncodeMoveOutcomesBatch(self, moveOutcomesBatch, encoded=None):
+		moveOutcomesBatch = np.asarray(moveOutcomesBatch)
+		numGrids = moveOutcomesBatch.shape[0]
+		indexMap = self.GetOneHotIndexMap(moveOutcomesBatch.shape[1:])
+		if encoded is None:
+			encoded = np.zeros((numGrids, self.GetOneHotLength()), dtype=np.float32)
+		oneHotIndices = (indexMap[None,:,:] + moveOutcomesBatch.astype(np.int64)).reshape((numGrids, -1))
+		encoded[np.arange(numGrids)[:,None], oneHotIndices] = 1
+		return encoded
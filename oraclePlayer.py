@@ -0,0 +1,60 @@
+import numpy as np
+from iplayer import IPlayer
+from shipPlacementUtility import RandomlyPlaceShips
+from hitProbabilityOracle import HitProbabilityOracle
+from ship import MoveOutcome
+
+# always shoots at the location most likely to hold a ship according to the exact oracle
+class OraclePlayer(IPlayer):
+	def __init__(self, playerNumber, oracle=None):
+		self.playerName = 'OraclePlayer #{}'.format(playerNumber)
+		self.oracle = oracle
+		self.ships = []
+		self.aliveShips = 0
+		self.playerMoves = []
+	
+	def SetBoard(self, board):
+		if board is None:
+			raise Exception('OraclePlayer SetBoard called without board.')
+		super(OraclePlayer, self).SetBoard(board)
+		boardSize = board.GetBoardSize()
+		if self.oracle is None:
+			self.oracle = HitProbabilityOracle(boardSize, board.GetNumShipsOfSize())
+		elif self.oracle.boardSize != (boardSize[0], boardSize[1]) or self.oracle.numShipsOfSize != board.GetNumShipsOfSize():
+			raise Exception('OraclePlayer oracle does not match the board it plays on.')
+		self.moveOutcomes = np.zeros((boardSize[0], boardSize[1]), dtype=np.int8)
+		self.playerMoves = []
+	
+	def PlaceShips(self, board):
+		self.ships, shipOrigins = RandomlyPlaceShips(board, self)
+		self.aliveShips = len(self.ships)
+		return self.ships
+	
+	def GetNextMove(self):
+		playerMove = self.oracle.GetBestMove(self.moveOutcomes)
+		self.playerMoves.append(playerMove)
+		return playerMove
+	
+	def ReceivePlayerMoveOutcome(self, round, moveOutcome):
+		if round < 0 or round >= len(self.playerMoves):
+			raise Exception('OraclePlayer received hit result with invalid round number.')
+		moveLocation = self.playerMoves[round]
+		self.moveOutcomes[moveLocation[0],moveLocation[1]] = moveOutcome.value
+	
+	def GetShips(self):
+		return list(self.ships)
+	
+	def ReceiveShipHitEvent(self, ship, moveOutcome):
+		if moveOutcome == MoveOutcome.DestroyedShip:
+			if self.aliveShips < 1:
+				raise Exception('Attempt to destroy ship of player that has no ships alive.')
+			self.aliveShips -= 1
+	
+	def ReceiveGameEndState(self, didWin):
+		pass
+	
+	def GetAliveShips(self):
+		return self.aliveShips
+	
+	def GetPlayerName(self):
+		return self.playerName
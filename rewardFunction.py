@@ -1,49 +1,43 @@
+import numpy as np
 from ship import MoveOutcome
 
-class RewardState:
-	def __init__(self):
-		self.opponentShipsDestroyed = 0
-		self.ownShipsDestroyed = 0
-		self.successfulHits = 0
-		self.hitsOnDeadShip = 0
-		self.redundantHits = 0
-		self.misses = 0
-		self.numMovesAtPosition = 0
-		
-	def OutputToLog(self, logOutputter):
-		logOutputter.Output('ownShipsDestroyed: {}'.format(self.ownShipsDestroyed))
-		logOutputter.Output('opponentShipsDestroyed: {}'.format(self.opponentShipsDestroyed))
-		logOutputter.Output('successfulHits: {}'.format(self.successfulHits))
-		logOutputter.Output('misses: {}'.format(self.misses))
-		logOutputter.Output('hitsOnDeadShip: {}'.format(self.hitsOnDeadShip))
-		logOutputter.Output('redundantHits: {}'.format(self.redundantHits))
-		logOutputter.Output('numMovesAtPosition: {}'.format(self.numMovesAtPosition))
-	
-def GetReward(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition, logOutputter):
-	rewardState = RewardState()
-	rewardState.opponentShipsDestroyed = moveOutcomesOfRound[MoveOutcome.DestroyedShip.value]
-	rewardState.successfulHits = moveOutcomesOfRound[MoveOutcome.HitAliveShip.value]
-	rewardState.misses = moveOutcomesOfRound[MoveOutcome.Miss.value]
-	rewardState.hitsOnDeadShip = moveOutcomesOfRound[MoveOutcome.HitAlreadyDestroyedShip.value]
-	rewardState.redundantHits = moveOutcomesOfRound[MoveOutcome.HitShipWhereAlreadyHit.value]
-	rewardState.numMovesAtPosition = numMovesAtPosition
-	rewardState.ownShipsDestroyed = ownShipsDestroyed
-	#rewardState.OutputToLog(logOutputter)
+# counts of the outcomes at locations that differ from the previous outcome grid, of all locations without one
+def GetMoveOutcomesOfRound(moveOutcomes, previousMoveOutcomes=None):
+	moveOutcomes = np.asarray(moveOutcomes).astype(np.int64)
+	if not previousMoveOutcomes is None:
+		if previousMoveOutcomes.shape != moveOutcomes.shape:
+			raise Exception('GetMoveOutcomesOfRound rounds must have the same shape.')
+		moveOutcomes = moveOutcomes[moveOutcomes != previousMoveOutcomes]
+	return np.bincount(moveOutcomes.ravel(), minlength=len(MoveOutcome)).astype(np.float64)
+
+# one row of outcome counts per move, e.g. for the outcomes returned by BatchedGame.Step
+def GetMoveOutcomesOfMoves(moveOutcomes):
+	moveOutcomes = np.asarray(moveOutcomes).astype(np.int64).ravel()
+	moveOutcomesOfRounds = np.zeros((len(moveOutcomes), len(MoveOutcome)))
+	moveOutcomesOfRounds[np.arange(len(moveOutcomes)), moveOutcomes] = 1
+	return moveOutcomesOfRounds
+
+# rewards of N rounds given as an (N, len(MoveOutcome)) matrix of outcome counts
+def GetRewards(moveOutcomesOfRounds, ownShipsDestroyed=None, numMovesAtPosition=None):
+	moveOutcomesOfRounds = np.asarray(moveOutcomesOfRounds, dtype=np.float64).reshape((-1, len(MoveOutcome)))
+	if numMovesAtPosition is None:
+		numMovesAtPosition = 0
 	
-	if rewardState.successfulHits > 1:
-		code.interact(local=locals())
+	rewards = moveOutcomesOfRounds[:,MoveOutcome.DestroyedShip.value] * 20
+	rewards += moveOutcomesOfRounds[:,MoveOutcome.HitAliveShip.value] * 10
 	
-	reward = rewardState.opponentShipsDestroyed * 20
-	reward += rewardState.successfulHits * 10
+	#rewards -= ownShipsDestroyed * 3
+	#rewards -= np.minimum(moveOutcomesOfRounds[:,MoveOutcome.HitAlreadyDestroyedShip.value], 5) * 2
+	#rewards -= np.minimum(moveOutcomesOfRounds[:,MoveOutcome.HitShipWhereAlreadyHit.value], 5) * 2
+	rewards -= np.minimum(moveOutcomesOfRounds[:,MoveOutcome.Miss.value], 5)
+	rewards -= np.minimum(numMovesAtPosition, 4) * 3
 	
-	#reward -= rewardState.ownShipsDestroyed * 3
-	#reward -= min(rewardState.hitsOnDeadShip, 5) * 2
-	#reward -= min(rewardState.redundantHits, 5) * 2
-	reward -= min(rewardState.misses, 5)
-	reward -= min(rewardState.numMovesAtPosition, 4) * 3
+	return np.maximum(rewards, -20)
 	
-	reward = max(reward, -20)
+def GetReward(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition, logOutputter):
+	reward = GetRewards(moveOutcomesOfRound, ownShipsDestroyed, numMovesAtPosition)[0]
 	
-	logOutputter.Output('Reward: {}'.format(reward))
+	if not logOutputter is None:
+		logOutputter.Output('Reward: {}'.format(reward))
 	
 	return reward
\ No newline at end of file
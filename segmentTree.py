@@ -0,0 +1,63 @@
+import numpy as np
+
+# complete binary tree over a power of two number of leaves kept in one array,
+# node i has children 2i and 2i + 1 and node 1 holds the reduction of all leaves
+class SegmentTree:
+	def __init__(self, capacity, operation, neutralValue):
+		self.capacity = 1
+		while self.capacity < capacity:
+			self.capacity *= 2
+		self.operation = operation
+		self.neutralValue = neutralValue
+		self.nodes = np.full(2 * self.capacity, neutralValue, dtype=np.float64)
+		self.depth = self.capacity.bit_length() - 1
+	
+	def __getitem__(self, leafIndices):
+		return self.nodes[self.capacity + np.asarray(leafIndices, dtype=np.int64)]
+	
+	# sets the leaves and recomputes their ancestors level by level, O(len(leafIndices) log capacity)
+	def Update(self, leafIndices, values):
+		nodeIndices = self.capacity + np.asarray(leafIndices, dtype=np.int64).ravel()
+		if len(nodeIndices) < 1:
+			return
+		if len(nodeIndices) == 1:
+			self.UpdateLeaf(nodeIndices[0], np.ravel(values)[0])
+			return
+		self.nodes[nodeIndices] = values
+		while nodeIndices[0] > 1:
+			nodeIndices = np.unique(nodeIndices // 2)
+			self.nodes[nodeIndices] = self.operation(self.nodes[2 * nodeIndices], self.nodes[2 * nodeIndices + 1])
+	
+	# the ancestors of a single leaf are the running reduction of the leaf with the siblings on its path to the root
+	def UpdateLeaf(self, nodeIndex, value):
+		pathIndices = nodeIndex >> np.arange(self.depth + 1)
+		pathValues = np.empty(self.depth + 1, dtype=np.float64)
+		pathValues[0] = value
+		pathValues[1:] = self.nodes[pathIndices[:-1] ^ 1]
+		self.nodes[pathIndices] = self.operation.accumulate(pathValues)
+	
+	def Clear(self, leafIndices):
+		self.Update(leafIndices, self.neutralValue)
+	
+	def Reduce(self):
+		return self.nodes[1]
+
+class SumTree(SegmentTree):
+	def __init__(self, capacity):
+		super(SumTree, self).__init__(capacity, np.add, 0.0)
+	
+	# leaf of every prefix sum, the leaf i with sum(leaves[:i]) <= prefixSum < sum(leaves[:i+1])
+	def FindPrefixSums(self, prefixSums):
+		prefixSums = np.array(prefixSums, dtype=np.float64)
+		nodeIndices = np.ones(len(prefixSums), dtype=np.int64)
+		while len(nodeIndices) > 0 and nodeIndices[0] < self.capacity:
+			leftIndices = 2 * nodeIndices
+			leftSums = self.nodes[leftIndices]
+			goRight = prefixSums >= leftSums
+			prefixSums -= np.where(goRight, leftSums, 0.0)
+			nodeIndices = leftIndices + goRight
+		return nodeIndices - self.capacity
+
+class MinTree(SegmentTree):
+	def __init__(self, capacity):
+		super(MinTree, self).__init__(capacity, np.minimum, np.inf)
\ No newline at end of file
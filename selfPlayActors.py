@@ -0,0 +1,241 @@
+import queue
+import threading
+import multiprocessing
+import numpy as np
+import keras.backend as K
+import tensorflow as tf
+from vector2 import Vector2
+from bitBoard import BitBoard
+from game import Game
+from aiPlayer import AIPlayer
+from mlpModel import MLPAIModel
+from LogOutputter import LogOutputter
+from experienceReplayBuffer import ExperiencePack
+from mappedExperienceReplayBuffer import MappedExperienceReplayBuffer
+from batchPrefetcher import BatchPrefetcher
+from shipPlacementTable import FleetSampler
+from actorProtocol import LearnerServer, ActorClient
+from sharedWeights import SharedWeights, GetWeightLayouts
+
+# plays games between two copies of the same policy, the policy stays frozen until SetWeights
+class SelfPlayActor:
+	def __init__(self, actorNumber, boardSize, numShipsOfSize):
+		self.actorNumber = actorNumber
+		self.boardSize = boardSize
+		self.numShipsOfSize = numShipsOfSize
+		self.actorLogs = [ LogOutputter('selfPlay_actor{}_player{}_log.txt'.format(actorNumber, playerNumber)) for playerNumber in range(2) ]
+		self.session = tf.Session()
+		K.set_session(self.session)
+		modelBuildLock = threading.Lock()
+		with self.session.graph.as_default():
+			self.models = [ MLPAIModel(playerNumber, modelBuildLock, self.actorLogs[playerNumber]) for playerNumber in range(2) ]
+			fleetSampler = FleetSampler(boardSize, numShipsOfSize)
+			self.players = [ AIPlayer(model, actorLog, fleetSampler=fleetSampler, sendStateDeltas=True) for model, actorLog in zip(self.models, self.actorLogs) ]
+			self.session.run(tf.global_variables_initializer())
+	
+	def SetWeights(self, actorWeights):
+		with self.session.graph.as_default():
+			for model in self.models:
+				model.actorModel.set_weights(actorWeights)
+	
+	# loads the weights straight from the shared memory, returns their version
+	def LoadSharedWeights(self, sharedWeights):
+		with self.session.graph.as_default():
+			for model in self.models:
+				weightsVersion = sharedWeights.GetWeights(model.actorModel)
+		return weightsVersion
+	
+	# returns the experiences of both players, keys prefixed with (actor, player) so they are unique across actors
+	def PlayGame(self):
+		with self.session.graph.as_default():
+			for player in self.players:
+				player.NewGame()
+			board = BitBoard(self.boardSize, self.numShipsOfSize, self.players)
+			gameResult = Game(board, headless=True).Play(trustedPlacement=True)
+		for actorLog in self.actorLogs:
+			actorLog.Output('Game result: {}'.format(gameResult))
+		
+		experiences = []
+		for model in self.models:
+			for experience in model.newExperienceChannel.GetAll(block=False):
+				experience.key = (self.actorNumber, model.GetPlayerNumber()) + experience.key
+				experiences.append(experience)
+		return experiences
+
+# ships the experiences of a local actor to the learner through a process queue,
+# the learner's weights are mapped from its shared memory
+def RunSelfPlayActor(actorNumber, boardSize, numShipsOfSize, experienceQueue, weightsName, weightLayouts, stopEvent, experienceBatchSize):
+	actor = SelfPlayActor(actorNumber, boardSize, numShipsOfSize)
+	sharedWeights = SharedWeights(weightLayouts, weightsName)
+	# every actor starts from the learner's weights, published before the actors were started
+	weightsVersion = actor.LoadSharedWeights(sharedWeights)
+	pendingExperiences = []
+	try:
+		while not stopEvent.is_set():
+			pendingExperiences.extend(actor.PlayGame())
+			if len(pendingExperiences) >= experienceBatchSize:
+				# blocks while the learner is behind
+				experienceQueue.put(ExperiencePack(pendingExperiences))
+				pendingExperiences = []
+			if sharedWeights.GetVersion() != weightsVersion:
+				weightsVersion = actor.LoadSharedWeights(sharedWeights)
+	finally:
+		sharedWeights.Close()
+
+# ships the experiences of an actor on another node to the learner's server.
+# plays until stopEvent is set or numGames games were played, either of them None for no limit
+def RunRemoteSelfPlayActor(address, actorNumber, boardSize, numShipsOfSize, experienceBatchSize=None, stopEvent=None, numGames=None):
+	actor = SelfPlayActor(actorNumber, boardSize, numShipsOfSize)
+	client = ActorClient(address, actorNumber, experienceBatchSize)
+	weightsVersion = 0
+	gameNum = 0
+	try:
+		while (stopEvent is None or not stopEvent.is_set()) and (numGames is None or gameNum < numGames):
+			if weightsVersion < 1 or client.HasNewerWeights(weightsVersion):
+				actorWeights, weightsVersion = client.GetWeights()
+				if len(actorWeights) > 0:
+					actor.SetWeights(actorWeights)
+			client.AddExperiences(actor.PlayGame())
+			gameNum += 1
+	finally:
+		# the experiences of the last games are smaller than a batch
+		try:
+			client.Flush()
+		finally:
+			client.Close()
+
+# owns the replay buffer and the trained models, actors run in their own processes
+class SelfPlayLearner:
+	def __init__(self, numActors, boardSize=None, numShipsOfSize=None, experienceBatchSize=None, publishWeightsEveryIter=None, maxQueuedPacks=None, serverAddress=None, replayBufferPath=None):
+		if boardSize is None:
+			boardSize = Vector2(10, 10)
+		if numShipsOfSize is None:
+			numShipsOfSize = { 2 : 1, 3 : 2, 4 : 1, 5 : 1 }
+		if experienceBatchSize is None:
+			experienceBatchSize = 256
+		if publishWeightsEveryIter is None:
+			publishWeightsEveryIter = 50
+		if maxQueuedPacks is None:
+			maxQueuedPacks = 4 * max(numActors, 1)
+		self.numActors = numActors
+		self.boardSize = boardSize
+		self.numShipsOfSize = numShipsOfSize
+		self.experienceBatchSize = experienceBatchSize
+		self.publishWeightsEveryIter = publishWeightsEveryIter
+		self.maxBellmanDifference = 1.0
+		
+		# spawned so the actors do not inherit the learner's tensorflow state
+		self.processContext = multiprocessing.get_context('spawn')
+		self.experienceQueue = self.processContext.Queue(maxQueuedPacks)
+		self.stopEvent = self.processContext.Event()
+		self.actorProcesses = []
+		
+		self.logOutputter = LogOutputter('selfPlay_learner_log.txt')
+		self.session = tf.Session()
+		K.set_session(self.session)
+		with self.session.graph.as_default():
+			self.model = MLPAIModel(0, threading.Lock(), self.logOutputter)
+			# local actors map the published weights instead of receiving pickled copies
+			self.sharedWeights = SharedWeights(GetWeightLayouts(self.model.actorModel.get_weights()))
+		# a buffer on disk keeps the replay history across restarts of the learner, it is not held
+		# to the in-memory byte budget so it can grow past RAM
+		if not replayBufferPath is None:
+			memoryBuffer = self.model.experienceBuffer
+			self.model.experienceBuffer = MappedExperienceReplayBuffer(replayBufferPath, memoryBuffer.maxSize, memoryBuffer.batchSize, memoryBuffer.priorityRandomness, memoryBuffer.priorityBiasFactor, stateDecoder=memoryBuffer.stateDecoder, deduplicate=memoryBuffer.deduplicate)
+		self.experienceBuffer = self.model.experienceBuffer
+		# keys are prefixed with the run so the games of a restarted learner's actors, numbered from 0 again,
+		# do not replace the experiences persisted under the same keys
+		self.runNumber = 0
+		if isinstance(self.experienceBuffer, MappedExperienceReplayBuffer):
+			self.runNumber = self.experienceBuffer.GetRunNumber()
+		# batches are sampled from the buffer in the background while the previous one trains
+		self.batchPrefetcher = BatchPrefetcher(self.experienceBuffer)
+		
+		# remote actors put their experiences on the same queue as the local ones
+		self.server = None
+		if not serverAddress is None:
+			self.server = LearnerServer(serverAddress, self.experienceQueue, self.model.actorWeights, self.logOutputter)
+	
+	def StartActors(self):
+		self.PublishWeights()
+		for actorNumber in range(self.numActors):
+			actorProcess = self.processContext.Process(target=RunSelfPlayActor, args=(actorNumber, self.boardSize, self.numShipsOfSize, self.experienceQueue, self.sharedWeights.GetName(), self.sharedWeights.GetWeightLayouts(), self.stopEvent, self.experienceBatchSize))
+			actorProcess.daemon = True
+			actorProcess.start()
+			self.actorProcesses.append(actorProcess)
+	
+	def StopActors(self):
+		self.stopEvent.set()
+		# unblock actors waiting to put experiences
+		while any(actorProcess.is_alive() for actorProcess in self.actorProcesses):
+			self.ReceiveExperiences(block=False)
+			for actorProcess in self.actorProcesses:
+				actorProcess.join(0.1)
+		self.actorProcesses = []
+	
+	# the weights are written once, for every local actor, and also serve actors connected over the network
+	def PublishWeights(self):
+		with self.session.graph.as_default():
+			actorWeights = self.model.actorModel.get_weights()
+		self.sharedWeights.PutWeightsValues(actorWeights)
+		self.model.actorWeights.PutWeightsValues(actorWeights)
+	
+	def ReceiveExperiences(self, block):
+		numReceived = 0
+		while True:
+			try:
+				experiencePack = self.experienceQueue.get(block, 1.0) if block and numReceived < 1 else self.experienceQueue.get_nowait()
+			except queue.Empty:
+				return numReceived
+			# new experiences get the highest priority seen so they are sampled at least once
+			experiences = experiencePack.GetExperiences()
+			for experience in experiences:
+				experience.key = (self.runNumber,) + tuple(experience.key)
+				experience.bellmanDifference = self.maxBellmanDifference
+			self.batchPrefetcher.AddExperiences(experiences)
+			numReceived += len(experiencePack)
+	
+	def TrainIteration(self, experiencesBatch):
+		model = self.model
+		model.UpdateImportanceSampling()
+		actorOutputsAtBatch = model.RunModelAtStates(experiencesBatch.states)
+		bellmanDifferences = model.TrainOnExperiences(experiencesBatch, actorOutputsAtBatch)
+		self.batchPrefetcher.UpdateBellmanDifferences(experiencesBatch.keys, bellmanDifferences)
+		self.maxBellmanDifference = max(self.maxBellmanDifference, float(np.max(bellmanDifferences)))
+		model.modelIterations += 1
+		
+		if model.modelIterations % model.trainCriticEveryIter == 0:
+			model.TrainCritic()
+		if model.modelIterations % model.saveModelEveryIter == 0:
+			model.SaveModels()
+			self.FlushExperienceBuffer()
+			with self.batchPrefetcher.bufferLock:
+				model.LogExperienceBufferStats()
+		if model.modelIterations % self.publishWeightsEveryIter == 0:
+			self.PublishWeights()
+	
+	def FlushExperienceBuffer(self):
+		if isinstance(self.experienceBuffer, MappedExperienceReplayBuffer):
+			with self.batchPrefetcher.bufferLock:
+				self.experienceBuffer.Flush()
+	
+	def Run(self, numIterations=None):
+		self.StartActors()
+		if not self.server is None:
+			self.server.Start()
+		self.batchPrefetcher.Start()
+		try:
+			with self.session.graph.as_default():
+				while numIterations is None or self.model.modelIterations < numIterations:
+					self.ReceiveExperiences(block=False)
+					experiencesBatch = self.batchPrefetcher.GetBatch(1.0)
+					if experiencesBatch is None:
+						continue
+					self.TrainIteration(experiencesBatch)
+		finally:
+			if not self.server is None:
+				self.server.Stop()
+			self.StopActors()
+			self.batchPrefetcher.Stop()
+			self.FlushExperienceBuffer()
+			self.sharedWeights.Close()
@@ -0,0 +1,113 @@
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+
+# the (shape, dtype) of every weight array, all a process needs besides the name to map SharedWeights
+def GetWeightLayouts(weights):
+	return [ (tuple(np.shape(weight)), np.asarray(weight).dtype.str) for weight in weights ]
+
+# weights published by one process and read by any number of others through shared memory, without pickling.
+# the memory holds a header and two copies of every weight array. the writer fills the copy readers are
+# not pointed at and then switches them over with a new version, so a read only has to be retried when
+# two publications happen while it runs. every copy has a sequence counter that is odd while the copy is
+# written, a reader loads straight from the mapped arrays and keeps the result only if the counter of its
+# copy was even and unchanged from before to after the load.
+# the process creating the weights (name None) owns the memory and unlinks it, the others attach by name
+class SharedWeights:
+	# header: version, active copy, sequence counter of copy 0, sequence counter of copy 1
+	headerLength = 4
+	
+	def __init__(self, weightLayouts, name=None):
+		self.weightLayouts = [ (tuple(shape), np.dtype(dtype)) for shape, dtype in weightLayouts ]
+		self.weightOffsets = []
+		copyBytes = 0
+		for shape, dtype in self.weightLayouts:
+			# every array starts 8 byte aligned
+			copyBytes = (copyBytes + 7) // 8 * 8
+			self.weightOffsets.append(copyBytes)
+			copyBytes += int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+		self.copyBytes = (copyBytes + 7) // 8 * 8
+		headerBytes = self.headerLength * 8
+		
+		self.isOwner = name is None
+		if self.isOwner:
+			self.sharedMemory = shared_memory.SharedMemory(create=True, size=headerBytes + 2 * self.copyBytes)
+		else:
+			self.sharedMemory = shared_memory.SharedMemory(name=name)
+			if self.sharedMemory.size < headerBytes + 2 * self.copyBytes:
+				raise Exception('SharedWeights memory {} is smaller than its weight layouts.'.format(name))
+		self.header = np.ndarray((self.headerLength,), dtype=np.int64, buffer=self.sharedMemory.buf)
+		if self.isOwner:
+			self.header[:] = 0
+		self.weightCopies = [ self.GetCopyArrays(copyNum) for copyNum in range(2) ]
+		# publications from several threads of the owner must not interleave
+		self.writeLock = threading.Lock()
+	
+	def GetCopyArrays(self, copyNum):
+		copyOffset = self.headerLength * 8 + copyNum * self.copyBytes
+		weights = []
+		for (shape, dtype), weightOffset in zip(self.weightLayouts, self.weightOffsets):
+			weight = np.ndarray(shape, dtype=dtype, buffer=self.sharedMemory.buf, offset=copyOffset + weightOffset)
+			if not self.isOwner:
+				weight.flags.writeable = False
+			weights.append(weight)
+		return weights
+	
+	def GetName(self):
+		return self.sharedMemory.name
+	
+	def GetWeightLayouts(self):
+		return [ (shape, dtype.str) for shape, dtype in self.weightLayouts ]
+	
+	def GetVersion(self):
+		return int(self.header[0])
+	
+	def PutWeights(self, model):
+		self.PutWeightsValues(model.get_weights())
+	
+	def PutWeightsValues(self, weights, version=None):
+		if not self.isOwner:
+			raise Exception('SharedWeights can only be published by the process that created them.')
+		if len(weights) != len(self.weightLayouts):
+			raise Exception('SharedWeights got {} weight arrays for {} layouts.'.format(len(weights), len(self.weightLayouts)))
+		with self.writeLock:
+			copyNum = 1 - int(self.header[1])
+			sequenceIndex = 2 + copyNum
+			self.header[sequenceIndex] += 1
+			for sharedWeight, weight in zip(self.weightCopies[copyNum], weights):
+				sharedWeight[...] = weight
+			self.header[sequenceIndex] += 1
+			self.header[1] = copyNum
+			if version is None:
+				self.header[0] += 1
+			else:
+				self.header[0] = version
+	
+	# calls loadWeights with the mapped arrays of the latest copy until it loaded one that was not written meanwhile
+	def ReadWeights(self, loadWeights):
+		while True:
+			version = int(self.header[0])
+			copyNum = int(self.header[1])
+			sequenceIndex = 2 + copyNum
+			sequenceBefore = int(self.header[sequenceIndex])
+			if sequenceBefore % 2 == 1:
+				continue
+			loadedWeights = loadWeights(self.weightCopies[copyNum])
+			if int(self.header[sequenceIndex]) == sequenceBefore:
+				return loadedWeights, version
+	
+	# loads the latest weights into the model, returns their version
+	def GetWeights(self, model):
+		loadedWeights, version = self.ReadWeights(model.set_weights)
+		return version
+	
+	# copies of the latest weights, e.g. for an inference copy of the model in numpy
+	def GetWeightsValues(self):
+		return self.ReadWeights(lambda weights: [ np.copy(weight) for weight in weights ])
+	
+	def Close(self):
+		self.header = None
+		self.weightCopies = None
+		self.sharedMemory.close()
+		if self.isOwner:
+			self.sharedMemory.unlink()
\ No newline at end of file
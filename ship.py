@@ -11,25 +11,40 @@ class MoveOutcome(enum.Enum):
 	HitShipWhereAlreadyHit = 5
 
 class Ship:
+	__slots__ = ['size', 'origin', 'vertical', 'player', 'pieceLocations', 'hitLocations', 'numHealthyPieces']
+	
 	def __init__(self, size, player, origin, vertical):
 		self.size = size
 		self.origin = origin
 		self.vertical = vertical
 		self.player = player
 		self.pieceLocations = None
-		self.hitLocations = [False for i in range(self.size)]
+		self.hitLocations = bytearray(self.size)
 		self.numHealthyPieces = self.size
 	
 	def GetPieceLocations(self):
 		if self.size is None or self.origin is None or self.vertical is None:
 			raise Exception('Attempt to get piece locations of uninitialized ship.')
-		if not self.pieceLocations is None:
-			return self.pieceLocations
-		locationAddend = Vector2(1, 0)
+		if self.pieceLocations is None:
+			locationAddend = Vector2(1, 0)
+			if self.vertical:
+				locationAddend = Vector2(0, 1)
+			self.pieceLocations = tuple([ self.origin + locationAddend * length for length in range(self.size) ])
+		return self.pieceLocations
+	
+	# offset of the location along the ship or -1 if the ship does not cover it
+	def GetPieceIndex(self, location):
 		if self.vertical:
-			locationAddend = Vector2(0, 1)
-		self.pieceLocations = [ self.origin + locationAddend * length for length in range(self.size) ]
-		return list(self.pieceLocations)
+			if location[0] != self.origin[0]:
+				return -1
+			pieceIndex = location[1] - self.origin[1]
+		else:
+			if location[1] != self.origin[1]:
+				return -1
+			pieceIndex = location[0] - self.origin[0]
+		if pieceIndex < 0 or pieceIndex >= self.size:
+			return -1
+		return pieceIndex
 	
 	def HitShip(self, hitLocation):
 		if self.size is None or self.origin is None or self.vertical is None:
@@ -38,13 +53,10 @@ class Ship:
 		if self.numHealthyPieces < 1:
 			raise Exception('Attempt to hit already destroyed ship.')
 		
-		pieceLocations = self.GetPieceLocations()
-		locationAlreadyHit = False
+		hitIndex = self.GetPieceIndex(hitLocation)
 		moveOutcome = MoveOutcome.Miss
-		if hitLocation in pieceLocations:
-			hitIndex = pieceLocations.index(hitLocation)
-			locationAlreadyHit = self.hitLocations[hitIndex]
-			if locationAlreadyHit:
+		if hitIndex >= 0:
+			if self.hitLocations[hitIndex]:
 				moveOutcome = MoveOutcome.HitShipWhereAlreadyHit
 			else:
 				self.numHealthyPieces -= 1
@@ -55,9 +67,9 @@ class Ship:
 					moveOutcome = MoveOutcome.HitAliveShip
 		self.player.ReceiveShipHitEvent(self, moveOutcome)
 		return moveOutcome
-		
+	
 	def GetHitLocations(self):
-		return list(self.hitLocations)
+		return [ hitLocation == 1 for hitLocation in self.hitLocations ]
 	
 	def GetNumHealthyPieces(self):
 		return self.numHealthyPieces
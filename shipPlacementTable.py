@@ -0,0 +1,141 @@
+import random
+import numpy as np
+from vector2 import Vector2
+
+# every legal placement of one ship size on one board size
+# location (x, y) is bit / column x * boardSize[1] + y of the masks
+class PlacementTable:
+	def __init__(self, boardSize, shipSize):
+		self.boardSize = (int(boardSize[0]), int(boardSize[1]))
+		self.shipSize = shipSize
+		self.numLocations = self.boardSize[0] * self.boardSize[1]
+		
+		origins = []
+		isVertical = []
+		locationIndices = []
+		for vertical in [False, True]:
+			locationAddend = Vector2(0, 1) if vertical else Vector2(1, 0)
+			for x in range(self.boardSize[0] - (0 if vertical else shipSize - 1)):
+				for y in range(self.boardSize[1] - (shipSize - 1 if vertical else 0)):
+					origin = Vector2(x, y)
+					pieceLocations = [ origin + locationAddend * length for length in range(shipSize) ]
+					origins.append(origin)
+					isVertical.append(vertical)
+					locationIndices.append([ location[0] * self.boardSize[1] + location[1] for location in pieceLocations ])
+		
+		if len(origins) < 1:
+			raise Exception('Ship of size {} does not fit on board of size {}.'.format(shipSize, self.boardSize))
+		
+		self.origins = origins
+		self.isVertical = isVertical
+		self.locationIndices = np.array(locationIndices, dtype=np.int16)
+		self.masks = [ sum(1 << int(locationIndex) for locationIndex in pieceIndices) for pieceIndices in self.locationIndices ]
+		
+		# placements covering each location
+		placementsOfLocation = [ [] for locationIndex in range(self.numLocations) ]
+		for placementIndex, pieceIndices in enumerate(self.locationIndices):
+			for locationIndex in pieceIndices:
+				placementsOfLocation[locationIndex].append(placementIndex)
+		self.placementsAtLocation = [ np.array(placementIndices, dtype=np.int64) for placementIndices in placementsOfLocation ]
+		
+		# masks split into 64 bit words for vectorized overlap checks
+		self.numMaskWords = (self.numLocations + 63) // 64
+		self.maskWords = np.zeros((len(self.masks), self.numMaskWords), dtype=np.uint64)
+		for placementIndex, mask in enumerate(self.masks):
+			for wordIndex in range(self.numMaskWords):
+				self.maskWords[placementIndex, wordIndex] = (mask >> (64 * wordIndex)) & 0xFFFFFFFFFFFFFFFF
+	
+	def __len__(self):
+		return len(self.masks)
+	
+	def GetShipOrigin(self, placementIndex):
+		return {'size' : self.shipSize, 'origin' : self.origins[placementIndex], 'isVertical' : self.isVertical[placementIndex]}
+
+placementTables = {}
+
+def GetPlacementTable(boardSize, shipSize):
+	tableKey = (int(boardSize[0]), int(boardSize[1]), shipSize)
+	if not tableKey in placementTables:
+		placementTables[tableKey] = PlacementTable(boardSize, shipSize)
+	return placementTables[tableKey]
+
+def GetShipSizesToPlace(numShipsOfSize):
+	return [ shipSize for shipSize in numShipsOfSize.keys() for i in range(numShipsOfSize[shipSize]) ]
+
+# returns one placement index per ship, ships ordered as GetShipSizesToPlace
+# a placement drawn uniformly and rejected on overlap is uniform over the legal placements
+def SampleFleet(boardSize, numShipsOfSize):
+	tables = [ GetPlacementTable(boardSize, shipSize) for shipSize in GetShipSizesToPlace(numShipsOfSize) ]
+	for fleetAttempt in range(1000):
+		occupied = 0
+		fleet = []
+		for table in tables:
+			masks = table.masks
+			for placementAttempt in range(100):
+				placementIndex = random.randrange(len(masks))
+				if not masks[placementIndex] & occupied:
+					break
+			else:
+				break
+			occupied |= masks[placementIndex]
+			fleet.append(placementIndex)
+		if len(fleet) == len(tables):
+			return fleet
+	raise Exception('Failed to randomly place ships on board.')
+
+# returns a (numFleets, numShips) array of placement indices, ships ordered as GetShipSizesToPlace
+def SampleFleets(boardSize, numShipsOfSize, numFleets):
+	tables = [ GetPlacementTable(boardSize, shipSize) for shipSize in GetShipSizesToPlace(numShipsOfSize) ]
+	fleets = np.zeros((numFleets, len(tables)), dtype=np.uint16)
+	
+	pendingFleets = np.arange(numFleets)
+	fleetAttempts = 0
+	while len(pendingFleets) > 0:
+		if fleetAttempts >= 1000:
+			raise Exception('Failed to randomly place ships on board.')
+		fleetAttempts += 1
+		
+		occupied = np.zeros((len(pendingFleets), tables[0].numMaskWords), dtype=np.uint64)
+		fleetPlaced = np.ones(len(pendingFleets), dtype=bool)
+		for shipNum, table in enumerate(tables):
+			placementIndices = np.zeros(len(pendingFleets), dtype=np.int64)
+			unplaced = np.flatnonzero(fleetPlaced)
+			for placementAttempt in range(100):
+				if len(unplaced) < 1:
+					break
+				candidates = np.random.randint(0, len(table), len(unplaced))
+				candidateFree = np.all((occupied[unplaced] & table.maskWords[candidates]) == 0, axis=1)
+				placementIndices[unplaced[candidateFree]] = candidates[candidateFree]
+				unplaced = unplaced[~candidateFree]
+			# fleets that ran into a dead end are sampled again from scratch
+			fleetPlaced[unplaced] = False
+			occupied |= table.maskWords[placementIndices]
+			fleets[pendingFleets, shipNum] = placementIndices
+		pendingFleets = pendingFleets[~fleetPlaced]
+	return fleets
+
+def GetFleetShipOrigins(boardSize, numShipsOfSize, fleet):
+	shipSizes = GetShipSizesToPlace(numShipsOfSize)
+	return [ GetPlacementTable(boardSize, shipSize).GetShipOrigin(int(placementIndex)) for shipSize, placementIndex in zip(shipSizes, fleet) ]
+
+# hands out fleets one at a time from bulk sampled batches
+class FleetSampler:
+	def __init__(self, boardSize, numShipsOfSize, batchSize=None):
+		if batchSize is None:
+			batchSize = 4096
+		self.boardSize = boardSize
+		self.numShipsOfSize = dict(numShipsOfSize)
+		self.batchSize = batchSize
+		self.fleets = None
+		self.nextFleet = 0
+	
+	def GetFleet(self):
+		if self.fleets is None or self.nextFleet >= len(self.fleets):
+			self.fleets = SampleFleets(self.boardSize, self.numShipsOfSize, self.batchSize)
+			self.nextFleet = 0
+		fleet = self.fleets[self.nextFleet]
+		self.nextFleet += 1
+		return fleet
+	
+	def GetShipOrigins(self):
+		return GetFleetShipOrigins(self.boardSize, self.numShipsOfSize, self.GetFleet())
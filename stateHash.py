@@ -0,0 +1,18 @@
+import hashlib
+import numpy as np
+
+# 64 bit hashes of state arrays, cheap enough to compute for every turn.
+# equal arrays of the same dtype and shape always hash the same, in every process
+def GetStateHash(state):
+	state = np.ascontiguousarray(state)
+	return int.from_bytes(hashlib.blake2b(state.tobytes(), digest_size=8).digest(), 'little')
+
+# hash of a state together with the move taken at it and the number of turns of its rollout
+def GetTransitionHash(state, move, rolloutLength=None):
+	if rolloutLength is None:
+		rolloutLength = 0
+	state = np.ascontiguousarray(state)
+	transitionHash = hashlib.blake2b(state.tobytes(), digest_size=8)
+	transitionHash.update(int(move).to_bytes(4, 'little', signed=True))
+	transitionHash.update(int(rolloutLength).to_bytes(4, 'little', signed=True))
+	return int.from_bytes(transitionHash.digest(), 'little')
\ No newline at end of file
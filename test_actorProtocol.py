@@ -0,0 +1,132 @@
+import queue
+import threading
+import unittest
+import numpy as np
+from experienceReplayBuffer import Experience
+from weightsContainer import WeightsContainer
+from actorProtocol import LearnerServer, ActorClient
+
+# every field is derived from the key so experiences that were mixed up on the wire are detected
+def MakeExperience(batchNum, experienceNum):
+	experience = Experience()
+	experience.key = (7, batchNum, experienceNum)
+	experience.state = np.full(8, batchNum, dtype=np.uint8)
+	experience.state[1] = experienceNum
+	experience.stateAfterMove = experience.state + 1
+	experience.move = batchNum * 100 + experienceNum
+	experience.reward = float(experience.move) / 4
+	experience.rolloutLength = 1
+	experience.rewardRolloutSum = experience.reward
+	return experience
+
+def MakeBatch(batchNum, batchSize):
+	return [ MakeExperience(batchNum, experienceNum) for experienceNum in range(batchSize) ]
+
+class ListLogOutputter:
+	def __init__(self):
+		self.messages = []
+	
+	def Output(self, message):
+		self.messages.append(message)
+
+class LearnerServerTest(unittest.TestCase):
+	def setUp(self):
+		self.actorWeights = WeightsContainer()
+		self.servers = []
+	
+	def tearDown(self):
+		for server in self.servers:
+			server.Stop()
+	
+	def StartServer(self, experienceQueue, address=None):
+		if address is None:
+			address = ('127.0.0.1', 0)
+		logOutputter = ListLogOutputter()
+		server = LearnerServer(address, experienceQueue, self.actorWeights, logOutputter)
+		server.Start()
+		self.servers.append(server)
+		return server, logOutputter
+	
+	def CheckPack(self, experiencePack, batchNum, batchSize):
+		experiences = experiencePack.GetExperiences()
+		self.assertEqual([ experience.key for experience in experiences ], [ (7, batchNum, experienceNum) for experienceNum in range(batchSize) ])
+		for experience in experiences:
+			expectedExperience = MakeExperience(experience.key[1], experience.key[2])
+			self.assertTrue(np.array_equal(experience.state, expectedExperience.state))
+			self.assertTrue(np.array_equal(experience.stateAfterMove, expectedExperience.stateAfterMove))
+			self.assertTrue(np.array_equal(experience.lastStateInRollout, expectedExperience.stateAfterMove))
+			self.assertEqual(experience.move, expectedExperience.move)
+			self.assertEqual(experience.reward, expectedExperience.reward)
+			self.assertEqual(experience.rolloutLength, 1)
+			self.assertEqual(experience.rewardRolloutSum, expectedExperience.reward)
+	
+	def testExperiencesAndWeightsRoundTrip(self):
+		experienceQueue = queue.Queue()
+		server, logOutputter = self.StartServer(experienceQueue)
+		weights = [ np.arange(6, dtype=np.float32).reshape(2, 3), np.ones(3, dtype=np.float32) ]
+		self.actorWeights.PutWeightsValues(weights)
+		client = ActorClient(server.GetAddress(), 3, 4, maxReconnectAttempts=0)
+		try:
+			# fewer than a batch stay with the actor
+			client.AddExperiences(MakeBatch(0, 3))
+			self.assertTrue(experienceQueue.empty())
+			client.AddExperiences(MakeBatch(0, 4)[3:])
+			self.CheckPack(experienceQueue.get(timeout=5.0), 0, 4)
+			self.assertEqual(logOutputter.messages[0], 'Actor 3 connected')
+			# the ack carries the latest weights version
+			self.assertTrue(client.HasNewerWeights(0))
+			self.assertFalse(client.HasNewerWeights(1))
+			
+			receivedWeights, version = client.GetWeights()
+			self.assertEqual(version, 1)
+			self.assertEqual(len(receivedWeights), len(weights))
+			for receivedWeight, weight in zip(receivedWeights, weights):
+				self.assertEqual(receivedWeight.dtype, weight.dtype)
+				self.assertTrue(np.array_equal(receivedWeight, weight))
+		finally:
+			client.Close()
+	
+	def testFullQueueBlocksTheActor(self):
+		experienceQueue = queue.Queue(1)
+		server, logOutputter = self.StartServer(experienceQueue)
+		client = ActorClient(server.GetAddress(), 0, 2, maxReconnectAttempts=0)
+		try:
+			client.AddExperiences(MakeBatch(0, 2))
+			flushed = threading.Event()
+			def AddSecondBatch():
+				client.AddExperiences(MakeBatch(1, 2))
+				flushed.set()
+			sender = threading.Thread(target=AddSecondBatch)
+			sender.start()
+			# the second batch is not acknowledged while the learner has not taken the first
+			self.assertFalse(flushed.wait(0.5))
+			self.CheckPack(experienceQueue.get(timeout=5.0), 0, 2)
+			self.assertTrue(flushed.wait(5.0))
+			sender.join()
+			self.CheckPack(experienceQueue.get(timeout=5.0), 1, 2)
+		finally:
+			client.Close()
+	
+	def testActorReconnectsAfterRestart(self):
+		experienceQueue = queue.Queue()
+		server, logOutputter = self.StartServer(experienceQueue)
+		address = server.GetAddress()
+		client = ActorClient(address, 5, 2, reconnectDelay=0.05, maxReconnectAttempts=100)
+		try:
+			client.AddExperiences(MakeBatch(0, 2))
+			self.CheckPack(experienceQueue.get(timeout=5.0), 0, 2)
+			
+			server.Stop()
+			self.servers.remove(server)
+			restartedQueue = queue.Queue()
+			restartedServer, restartedLogOutputter = self.StartServer(restartedQueue, address)
+			# the batch sent on the old connection is sent again to the restarted learner
+			client.AddExperiences(MakeBatch(1, 2))
+			self.CheckPack(restartedQueue.get(timeout=5.0), 1, 2)
+			self.assertTrue(experienceQueue.empty())
+			self.assertIn('Actor 5 connected', restartedLogOutputter.messages)
+		finally:
+			client.Close()
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import threading
+import unittest
+from experienceChannel import ExperienceChannel
+
+# runs target on its own thread, done is set once it returned and result holds its return value
+class Call:
+	def __init__(self, target):
+		self.result = None
+		self.done = threading.Event()
+		self.thread = threading.Thread(target=self.Run, args=(target,))
+		self.thread.start()
+	
+	def Run(self, target):
+		self.result = target()
+		self.done.set()
+
+class ExperienceChannelTest(unittest.TestCase):
+	def testPutWaitsUntilConsumerTakesPending(self):
+		channel = ExperienceChannel(4)
+		self.assertTrue(channel.Put([0, 1, 2]))
+		self.assertFalse(channel.Put([3, 4], timeout=0.1))
+		put = Call(lambda: channel.Put([3, 4]))
+		self.assertFalse(put.done.wait(0.3))
+		self.assertEqual(channel.GetAll(), [0, 1, 2])
+		self.assertTrue(put.done.wait(5.0))
+		self.assertTrue(put.result)
+		self.assertEqual(channel.GetAll(block=False), [3, 4])
+		self.assertEqual(len(channel), 0)
+	
+	def testLargeBatchOnlyWaitsForEmptyChannel(self):
+		channel = ExperienceChannel(4)
+		self.assertTrue(channel.Put(list(range(10)), timeout=0.1))
+		self.assertFalse(channel.Put([10], timeout=0.1))
+		self.assertEqual(len(channel.GetAll()), 10)
+		self.assertTrue(channel.Put([10], timeout=0.1))
+	
+	def testGetAllWaitsForBatch(self):
+		channel = ExperienceChannel()
+		self.assertEqual(channel.GetAll(timeout=0.1), [])
+		getAll = Call(channel.GetAll)
+		self.assertFalse(getAll.done.wait(0.3))
+		channel.Put([0])
+		self.assertTrue(getAll.done.wait(5.0))
+		self.assertEqual(getAll.result, [0])
+	
+	def testCloseWakesProducersAndConsumers(self):
+		channel = ExperienceChannel(1)
+		getAll = Call(channel.GetAll)
+		self.assertFalse(getAll.done.wait(0.1))
+		channel.Close()
+		self.assertTrue(getAll.done.wait(5.0))
+		self.assertEqual(getAll.result, [])
+		
+		channel = ExperienceChannel(1)
+		channel.Put([0])
+		put = Call(lambda: channel.Put([1]))
+		self.assertFalse(put.done.wait(0.1))
+		channel.Close()
+		self.assertTrue(put.done.wait(5.0))
+		self.assertFalse(put.result)
+		# pending experiences can still be taken after closing
+		self.assertEqual(channel.GetAll(), [0])
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
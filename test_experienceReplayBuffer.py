@@ -0,0 +1,146 @@
+import tempfile
+import unittest
+import numpy as np
+from experienceReplayBuffer import ExperienceReplayBuffer, Experience
+from mappedExperienceReplayBuffer import MappedExperienceReplayBuffer
+
+# the transition (state, move, rollout length) is given separately from the key so repeats can be made
+def MakeExperience(key, stateNum, move, rewardRolloutSum, rolloutLength=None, reward=None):
+	if rolloutLength is None:
+		rolloutLength = 2
+	if reward is None:
+		reward = rewardRolloutSum / 2
+	experience = Experience()
+	experience.key = key
+	experience.state = np.full(6, stateNum, dtype=np.uint8)
+	experience.stateAfterMove = np.full(6, key[-1], dtype=np.uint8)
+	experience.lastStateInRollout = experience.stateAfterMove + 1
+	experience.move = move
+	experience.reward = reward
+	experience.rolloutLength = rolloutLength
+	experience.rewardRolloutSum = rewardRolloutSum
+	return experience
+
+def AddExperiences(experienceBuffer, experiences):
+	for experience in experiences:
+		experienceBuffer[experience.key] = experience
+
+class ExperienceReplayBufferTest(unittest.TestCase):
+	def testNewestExperienceEvictsOldest(self):
+		experienceBuffer = ExperienceReplayBuffer(4, 2)
+		AddExperiences(experienceBuffer, [ MakeExperience((0, keyNum), keyNum, keyNum, float(keyNum)) for keyNum in range(6) ])
+		self.assertEqual(len(experienceBuffer), 4)
+		self.assertEqual(set(experienceBuffer.slotOfKey.keys()), set((0, keyNum) for keyNum in range(2, 6)))
+		self.assertEqual(experienceBuffer.slotOfKey[(0, 4)], 0)
+		self.assertIsNone(experienceBuffer[(0, 0)])
+		self.assertEqual(experienceBuffer[(0, 5)].move, 5)
+		stats = experienceBuffer.GetStats()
+		self.assertEqual((stats['inserted'], stats['evicted'], stats['merged']), (6, 2, 0))
+		# evicted slots are never sampled
+		batch = experienceBuffer.GetBatchMatrices()
+		self.assertTrue(all(key in experienceBuffer for key in batch.keys))
+	
+	def testRepeatedTransitionsKeepRunningMeanAndVariance(self):
+		experienceBuffer = ExperienceReplayBuffer(8, 2, deduplicate=True)
+		rewardRolloutSums = [1.0, 2.0, 4.0, 9.0]
+		AddExperiences(experienceBuffer, [ MakeExperience((0, keyNum), 1, 3, rewardRolloutSum, reward=float(keyNum)) for keyNum, rewardRolloutSum in enumerate(rewardRolloutSums) ])
+		self.assertEqual(len(experienceBuffer), 1)
+		self.assertEqual(experienceBuffer.GetStats()['merged'], 3)
+		# only the first key is stored
+		self.assertIsNone(experienceBuffer[(0, 1)])
+		visitCount, meanRolloutSum, rolloutSumVariance = experienceBuffer.GetRewardStatistics((0, 0))
+		self.assertEqual(visitCount, 4)
+		self.assertAlmostEqual(meanRolloutSum, np.mean(rewardRolloutSums))
+		self.assertAlmostEqual(rolloutSumVariance, np.var(rewardRolloutSums), places=5)
+		storedExperience = experienceBuffer[(0, 0)]
+		self.assertAlmostEqual(storedExperience.reward, 1.5)
+		self.assertEqual(storedExperience.rolloutLength, 2)
+		# the newest next states are kept
+		self.assertTrue(np.array_equal(storedExperience.stateAfterMove, np.full(6, 3, dtype=np.uint8)))
+		self.assertTrue(np.array_equal(storedExperience.lastStateInRollout, np.full(6, 4, dtype=np.uint8)))
+		
+		# another move or rollout length is another transition
+		AddExperiences(experienceBuffer, [MakeExperience((0, 4), 1, 2, 5.0), MakeExperience((0, 5), 1, 3, 5.0, rolloutLength=1)])
+		self.assertEqual(len(experienceBuffer), 3)
+		self.assertEqual(experienceBuffer.GetRewardStatistics((0, 5)), (1, 5.0, 0.0))
+	
+	def testEvictedTransitionIsStoredAgain(self):
+		experienceBuffer = ExperienceReplayBuffer(2, 2, deduplicate=True)
+		AddExperiences(experienceBuffer, [ MakeExperience((0, keyNum), keyNum, 0, 1.0) for keyNum in range(3) ])
+		AddExperiences(experienceBuffer, [MakeExperience((0, 3), 0, 0, 3.0)])
+		self.assertEqual(experienceBuffer.GetStats()['merged'], 0)
+		self.assertEqual(experienceBuffer.GetRewardStatistics((0, 3)), (1, 3.0, 0.0))
+		# the transition of the evicted key merges into its new slot
+		AddExperiences(experienceBuffer, [MakeExperience((0, 4), 0, 0, 5.0)])
+		self.assertEqual(experienceBuffer.GetRewardStatistics((0, 3)), (2, 4.0, 1.0))
+		self.assertEqual(len(experienceBuffer), 2)
+	
+	def testCapacityFitsByteBudget(self):
+		maxBytes = 1 << 20
+		experienceBuffer = ExperienceReplayBuffer(100000, 2, deduplicate=True, maxBytes=maxBytes)
+		AddExperiences(experienceBuffer, [MakeExperience((0, 0, 0), 0, 0, 1.0)])
+		capacity = experienceBuffer.capacity
+		self.assertLess(capacity, 100000)
+		self.assertLessEqual(experienceBuffer.GetAllocatedBytes(capacity), maxBytes)
+		self.assertGreater(experienceBuffer.GetAllocatedBytes(capacity + 1), maxBytes)
+		self.assertEqual(experienceBuffer.prioritySums.capacity, 1 << (capacity - 1).bit_length())
+		stats = experienceBuffer.GetStats()
+		self.assertEqual(stats['capacity'], capacity)
+		self.assertLessEqual(stats['allocatedBytes'], maxBytes)
+		# the python objects of the keys are part of every experience
+		self.assertGreater(stats['bytesPerExperience'], experienceBuffer.GetBookkeepingBytesPerExperience(3))
+		
+		self.assertEqual(ExperienceReplayBuffer(1000, 2, maxBytes=None).GetCapacity(np.zeros(6, dtype=np.uint8), 3), 1000)
+		with self.assertRaises(Exception):
+			AddExperiences(ExperienceReplayBuffer(1000, 2, maxBytes=64), [MakeExperience((0, 0, 0), 0, 0, 1.0)])
+
+class MappedExperienceReplayBufferTest(unittest.TestCase):
+	def OpenBuffer(self, bufferPath, readOnly=None):
+		return MappedExperienceReplayBuffer(bufferPath, 16, 4, deduplicate=True, readOnly=readOnly)
+	
+	def CheckExperiences(self, experienceBuffer, experiences):
+		for experience in experiences:
+			storedExperience = experienceBuffer[experience.key]
+			self.assertTrue(np.array_equal(storedExperience.state, experience.state))
+			self.assertTrue(np.array_equal(storedExperience.lastStateInRollout, experience.lastStateInRollout))
+			self.assertEqual(storedExperience.move, experience.move)
+			self.assertEqual(storedExperience.rewardRolloutSum, experience.rewardRolloutSum)
+	
+	def testReopenedBufferKeepsEarlierRuns(self):
+		with tempfile.TemporaryDirectory() as bufferPath:
+			experienceBuffer = self.OpenBuffer(bufferPath)
+			self.assertEqual(experienceBuffer.GetRunNumber(), 0)
+			firstRunExperiences = [ MakeExperience((0, 0, keyNum), keyNum, keyNum, float(keyNum)) for keyNum in range(5) ]
+			AddExperiences(experienceBuffer, firstRunExperiences)
+			experienceBuffer.UpdateBellmanDifferences([(0, 0, 1)], np.array([3.0]))
+			experienceBuffer.Flush()
+			experienceBuffer = None
+			
+			experienceBuffer = self.OpenBuffer(bufferPath)
+			self.assertEqual(experienceBuffer.GetRunNumber(), 1)
+			self.assertEqual(len(experienceBuffer), 5)
+			self.CheckExperiences(experienceBuffer, firstRunExperiences)
+			self.assertEqual(experienceBuffer[(0, 0, 1)].bellmanDifference, 3.0)
+			self.assertAlmostEqual(experienceBuffer.prioritySums.Reduce(), float(np.sum(experienceBuffer.prioritySums[np.arange(5)])))
+			# the same turn of the restarted process gets a key of its own run
+			secondRunExperiences = [ MakeExperience((1, 0, keyNum), keyNum + 5, keyNum, float(keyNum)) for keyNum in range(5) ]
+			AddExperiences(experienceBuffer, secondRunExperiences)
+			# a repeated transition is merged into the stored one
+			AddExperiences(experienceBuffer, [MakeExperience((1, 1, 0), 0, 0, 2.0)])
+			experienceBuffer.Flush()
+			experienceBuffer = None
+			
+			experienceBuffer = self.OpenBuffer(bufferPath, readOnly=True)
+			self.assertEqual(experienceBuffer.GetRunNumber(), 1)
+			self.assertEqual(len(experienceBuffer), 10)
+			self.CheckExperiences(experienceBuffer, firstRunExperiences[1:] + secondRunExperiences)
+			self.assertEqual(experienceBuffer.GetRewardStatistics((0, 0, 0)), (2, 1.0, 1.0))
+			self.assertEqual(len(experienceBuffer.GetBatchMatrices().keys), 4)
+			with self.assertRaises(Exception):
+				AddExperiences(experienceBuffer, [MakeExperience((1, 2, 0), 20, 0, 1.0)])
+			experienceBuffer = None
+			
+			self.assertEqual(self.OpenBuffer(bufferPath).GetRunNumber(), 2)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
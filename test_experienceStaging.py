@@ -0,0 +1,100 @@
+import threading
+import unittest
+import numpy as np
+from experienceReplayBuffer import ExperienceReplayBuffer, Experience
+from experienceStaging import ExperienceStaging
+from batchPrefetcher import BatchPrefetcher
+
+numProducers = 16
+numBatchesPerProducer = 50
+batchSize = 20
+
+# every field is derived from the key so a torn or mixed up experience is detected
+def MakeExperience(producerNum, batchNum, experienceNum):
+	experience = Experience()
+	experience.key = (producerNum, batchNum, experienceNum)
+	experience.state = np.full(8, producerNum, dtype=np.uint8)
+	experience.state[1] = batchNum
+	experience.state[2] = experienceNum
+	experience.stateAfterMove = experience.state + 1
+	experience.move = producerNum * 1000 + batchNum * batchSize + experienceNum
+	experience.reward = float(experience.move) / 4
+	return experience
+
+def CheckExperience(testCase, experience):
+	producerNum, batchNum, experienceNum = experience.key
+	expectedExperience = MakeExperience(producerNum, batchNum, experienceNum)
+	testCase.assertTrue(np.array_equal(experience.state, expectedExperience.state))
+	testCase.assertTrue(np.array_equal(experience.stateAfterMove, expectedExperience.stateAfterMove))
+	testCase.assertEqual(experience.move, expectedExperience.move)
+	testCase.assertEqual(experience.reward, expectedExperience.reward)
+
+# adds from numProducers threads at once, each producer thread adds numBatchesPerProducer batches
+def RunProducers(addExperiences):
+	startBarrier = threading.Barrier(numProducers)
+	def Produce(producerNum):
+		startBarrier.wait()
+		for batchNum in range(numBatchesPerProducer):
+			addExperiences([ MakeExperience(producerNum, batchNum, experienceNum) for experienceNum in range(batchSize) ])
+	producers = [ threading.Thread(target=Produce, args=(producerNum,)) for producerNum in range(numProducers) ]
+	for producer in producers:
+		producer.start()
+	return producers
+
+def GetAllKeys():
+	return set((producerNum, batchNum, experienceNum) for producerNum in range(numProducers) for batchNum in range(numBatchesPerProducer) for experienceNum in range(batchSize))
+
+class ExperienceStagingTest(unittest.TestCase):
+	def testProducersSpreadAcrossShards(self):
+		staging = ExperienceStaging(8)
+		shardNums = []
+		shardNumsLock = threading.Lock()
+		def GetShardNum():
+			with shardNumsLock:
+				shardNums.append(staging.GetShardNum())
+		threads = [ threading.Thread(target=GetShardNum) for threadNum in range(16) ]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(sorted(set(shardNums)), list(range(8)))
+	
+	def testConcurrentAddsAndDrainsLoseNothing(self):
+		staging = ExperienceStaging()
+		producers = RunProducers(staging.AddExperiences)
+		drainedExperiences = []
+		while any(producer.is_alive() for producer in producers):
+			drainedExperiences.extend(staging.Drain())
+		for producer in producers:
+			producer.join()
+		drainedExperiences.extend(staging.Drain())
+		
+		drainedKeys = [ experience.key for experience in drainedExperiences ]
+		self.assertEqual(len(drainedKeys), len(set(drainedKeys)))
+		self.assertEqual(set(drainedKeys), GetAllKeys())
+		for experience in drainedExperiences:
+			CheckExperience(self, experience)
+		self.assertEqual(len(staging), 0)
+
+class BatchPrefetcherTest(unittest.TestCase):
+	def testConcurrentAddsReachTheBufferOnce(self):
+		experienceBuffer = ExperienceReplayBuffer(numProducers * numBatchesPerProducer * batchSize, 32)
+		batchPrefetcher = BatchPrefetcher(experienceBuffer)
+		batchPrefetcher.Start()
+		producers = RunProducers(batchPrefetcher.AddExperiences)
+		# sampling keeps running while the experiences arrive
+		while any(producer.is_alive() for producer in producers):
+			batchPrefetcher.GetBatch(0.1)
+		for producer in producers:
+			producer.join()
+		batchPrefetcher.Stop()
+		
+		self.assertEqual(experienceBuffer.GetStats()['inserted'], len(GetAllKeys()))
+		self.assertEqual(set(experienceBuffer.slotOfKey.keys()), GetAllKeys())
+		for key in GetAllKeys():
+			experience = experienceBuffer[key]
+			self.assertEqual(experience.key, key)
+			CheckExperience(self, experience)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+from ship import MoveOutcome
+from iaimodel import AIModelState
+from experienceReplayBuffer import Experience
+from nStepAccumulator import NStepAccumulator
+from experienceChannel import ExperienceChannel
+from normalizedBoard import NormalizedBoard
+from AIGameState import AIGameState
+try:
+	from mlpModel import MLPAIModel
+except ImportError:
+	MLPAIModel = None
+
+discount = 0.5
+
+# the discounted rewards of turns turnNum up to turnNum + rolloutLength, ending at the last turn of the game
+def GetExpectedRollout(rewards, turnNum, maxRolloutLength):
+	rolloutLength = min(maxRolloutLength, len(rewards) - turnNum)
+	rewardRolloutSum = sum((discount ** stepNum) * rewards[turnNum + stepNum] for stepNum in range(rolloutLength))
+	return rewardRolloutSum, rolloutLength, turnNum + rolloutLength - 1
+
+def CheckRollouts(testCase, experiences, rewards, statesAfterMove, maxRolloutLength):
+	testCase.assertEqual([ experience.key[-1] for experience in experiences ], list(range(len(rewards))))
+	for turnNum, experience in enumerate(experiences):
+		rewardRolloutSum, rolloutLength, lastTurnNum = GetExpectedRollout(rewards, turnNum, maxRolloutLength)
+		testCase.assertAlmostEqual(experience.rewardRolloutSum, rewardRolloutSum)
+		testCase.assertEqual(experience.rolloutLength, rolloutLength)
+		testCase.assertTrue(np.array_equal(experience.lastStateInRollout, statesAfterMove[lastTurnNum]))
+
+class NStepAccumulatorTest(unittest.TestCase):
+	def testShortGameRollouts(self):
+		rewards = [-1.0, 10.0, 10.0, 20.0]
+		statesAfterMove = [ np.full(4, turnNum, dtype=np.uint8) for turnNum in range(len(rewards)) ]
+		nStepAccumulator = NStepAccumulator(3, discount)
+		experiences = []
+		for turnNum, reward in enumerate(rewards):
+			experience = Experience()
+			experience.key = (0, turnNum)
+			experience.stateAfterMove = statesAfterMove[turnNum]
+			experience.reward = reward
+			experiences.extend(nStepAccumulator.AddExperience(experience))
+		# only the first turn has seen the 3 turns of its rollout
+		self.assertEqual(len(experiences), 2)
+		experiences.extend(nStepAccumulator.EndGame())
+		# hand computed: -1 + 0.5 * 10 + 0.25 * 10, 10 + 0.5 * 10 + 0.25 * 20, 10 + 0.5 * 20, 20
+		self.assertEqual([ experience.rewardRolloutSum for experience in experiences ], [6.5, 20.0, 20.0, 20.0])
+		CheckRollouts(self, experiences, rewards, statesAfterMove, 3)
+		self.assertEqual(nStepAccumulator.EndGame(), [])
+
+@unittest.skipIf(MLPAIModel is None, 'MLPAIModel needs keras')
+class MLPAIModelRolloutTest(unittest.TestCase):
+	# only the parts of the model ReceiveStateUpdate uses, without building the keras models
+	def GetModel(self, maxRolloutLength):
+		model = MLPAIModel.__new__(MLPAIModel)
+		model.maxSeqLength = 1
+		model.gameState = AIGameState(NormalizedBoard(10), model.maxSeqLength)
+		model.logOutputter = None
+		model.gameNum = 0
+		model.gameTurnNumber = 0
+		model.experienceKeyPrefix = ()
+		model.nStepAccumulator = NStepAccumulator(maxRolloutLength, discount)
+		model.experienceHandOffSize = 32
+		model.experiencesToHandOff = []
+		model.newExperienceChannel = ExperienceChannel()
+		model.stateBeforeLastMove = None
+		model.stateRecordBeforeLastMove = None
+		model.lastModelOutput = None
+		model.lastModelMove = None
+		return model
+	
+	def GetState(self, moveOutcomes=None, changedLocation=None, changedMoveOutcome=None, currentlyPlaying=None):
+		if currentlyPlaying is None:
+			currentlyPlaying = True
+		state = AIModelState()
+		state.aliveShips = 5
+		state.piecesBeenHit = 0
+		state.currentlyPlaying = currentlyPlaying
+		state.didWin = False
+		state.moveOutcomes = moveOutcomes
+		state.isDelta = moveOutcomes is None
+		state.changedLocation = changedLocation
+		state.changedMoveOutcome = changedMoveOutcome
+		return state
+	
+	def testLastMoveRewardEndsEveryRollout(self):
+		model = self.GetModel(3)
+		model.ReceiveStateUpdate(self.GetState(moveOutcomes=np.zeros((10, 10))))
+		# a miss, two hits and the sinking hit that ends the game
+		moveOutcomes = [MoveOutcome.Miss, MoveOutcome.HitAliveShip, MoveOutcome.HitAliveShip, MoveOutcome.DestroyedShip]
+		rewards = [-1.0, 10.0, 10.0, 20.0]
+		statesAfterMove = []
+		for moveNum, moveOutcome in enumerate(moveOutcomes):
+			model.stateBeforeLastMove = np.zeros(1)
+			model.stateRecordBeforeLastMove = model.gameState.GetStateRecord()
+			model.lastModelOutput = np.zeros(1)
+			model.lastModelMove = moveNum
+			isLastMove = moveNum == len(moveOutcomes) - 1
+			model.ReceiveStateUpdate(self.GetState(changedLocation=(0, moveNum), changedMoveOutcome=moveOutcome.value, currentlyPlaying=not isLastMove))
+			statesAfterMove.append(model.gameState.GetStateRecord())
+		
+		self.assertEqual(model.gameState.rewards, rewards)
+		# every experience of the game is handed over once the game is over
+		experiences = sorted(model.newExperienceChannel.GetAll(block=False), key=lambda experience: experience.key)
+		self.assertEqual(len(model.nStepAccumulator.EndGame()), 0)
+		CheckRollouts(self, experiences, rewards, statesAfterMove, 3)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+from segmentTree import SumTree, MinTree
+
+# every inner node must be the reduction of its two children
+def CheckNodes(testCase, tree):
+	for nodeIndex in range(1, tree.capacity):
+		testCase.assertEqual(tree.nodes[nodeIndex], tree.operation(tree.nodes[2 * nodeIndex], tree.nodes[2 * nodeIndex + 1]))
+
+class SegmentTreeTest(unittest.TestCase):
+	def testCapacityRoundsUpToPowerOfTwo(self):
+		self.assertEqual(SumTree(1).capacity, 1)
+		self.assertEqual(SumTree(5).capacity, 8)
+		self.assertEqual(MinTree(8).capacity, 8)
+		self.assertEqual(SumTree(5).Reduce(), 0.0)
+		self.assertEqual(MinTree(5).Reduce(), np.inf)
+	
+	def testPrefixSearch(self):
+		sumTree = SumTree(5)
+		sumTree.Update([0, 1, 2, 3, 4], [1.0, 2.0, 0.0, 3.0, 4.0])
+		self.assertEqual(sumTree.Reduce(), 10.0)
+		# leaf i covers [sum(leaves[:i]), sum(leaves[:i+1])), the empty leaf 2 is never found
+		prefixSums = [0.0, 0.99, 1.0, 2.99, 3.0, 5.99, 6.0, 9.99]
+		self.assertEqual(sumTree.FindPrefixSums(prefixSums).tolist(), [0, 0, 1, 1, 3, 3, 4, 4])
+		self.assertEqual(sumTree.FindPrefixSums([]).tolist(), [])
+		
+		sumTree.Update([1], [0.0])
+		self.assertEqual(sumTree.FindPrefixSums([0.5, 1.0, 3.99, 4.0]).tolist(), [0, 3, 3, 4])
+	
+	def testLeafUpdatesKeepEveryNode(self):
+		random = np.random.RandomState(3)
+		leaves = random.random_sample(13)
+		sumTree = SumTree(len(leaves))
+		minTree = MinTree(len(leaves))
+		sumTree.Update(np.arange(len(leaves)), leaves)
+		minTree.Update(np.arange(len(leaves)), leaves)
+		CheckNodes(self, sumTree)
+		for updateNum in range(200):
+			# single leaves take the path update, several leaves the level by level one
+			leafIndices = random.choice(len(leaves), random.randint(1, 4), replace=False)
+			values = random.random_sample(len(leafIndices))
+			leaves[leafIndices] = values
+			sumTree.Update(leafIndices, values)
+			minTree.Update(leafIndices, values)
+			self.assertAlmostEqual(sumTree.Reduce(), np.sum(leaves))
+			self.assertEqual(minTree.Reduce(), np.min(leaves))
+			self.assertEqual(sumTree[leafIndices].tolist(), values.tolist())
+		CheckNodes(self, sumTree)
+		CheckNodes(self, minTree)
+		# unused leaves stay neutral
+		self.assertEqual(minTree[np.arange(len(leaves), minTree.capacity)].tolist(), [np.inf] * (minTree.capacity - len(leaves)))
+		
+		minTree.Clear([int(np.argmin(leaves))])
+		leaves[np.argmin(leaves)] = np.inf
+		self.assertEqual(minTree.Reduce(), np.min(leaves))
+		CheckNodes(self, minTree)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
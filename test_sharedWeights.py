@@ -0,0 +1,74 @@
+import time
+import threading
+import unittest
+import numpy as np
+from sharedWeights import SharedWeights, GetWeightLayouts
+
+def MakeWeights(value):
+	return [ np.full((64, 300), value, dtype=np.float32), np.full(7, value, dtype=np.int64), np.full((3, 5), value, dtype=np.float64) ]
+
+class SharedWeightsTest(unittest.TestCase):
+	def setUp(self):
+		self.weights = SharedWeights(GetWeightLayouts(MakeWeights(0)))
+		self.readerWeights = SharedWeights(self.weights.GetWeightLayouts(), self.weights.GetName())
+	
+	def tearDown(self):
+		self.readerWeights.Close()
+		self.weights.Close()
+	
+	def testReaderSeesPublishedWeights(self):
+		self.assertEqual(self.readerWeights.GetVersion(), 0)
+		self.weights.PutWeightsValues(MakeWeights(2))
+		readWeights, version = self.readerWeights.GetWeightsValues()
+		self.assertEqual(version, 1)
+		for readWeight, weight in zip(readWeights, MakeWeights(2)):
+			self.assertEqual(readWeight.dtype, weight.dtype)
+			self.assertTrue(np.array_equal(readWeight, weight))
+		
+		self.weights.PutWeightsValues(MakeWeights(3), version=9)
+		readWeights, version = self.readerWeights.GetWeightsValues()
+		self.assertEqual(version, 9)
+		self.assertTrue(np.array_equal(readWeights[1], MakeWeights(3)[1]))
+		# the values read before are copies
+		self.weights.PutWeightsValues(MakeWeights(4))
+		self.assertTrue(np.array_equal(readWeights[0], MakeWeights(3)[0]))
+	
+	def testOnlyOwnerPublishes(self):
+		with self.assertRaises(Exception):
+			self.readerWeights.PutWeightsValues(MakeWeights(1))
+		with self.assertRaises(Exception):
+			self.weights.PutWeightsValues(MakeWeights(1)[:2])
+		with self.assertRaises(ValueError):
+			self.readerWeights.weightCopies[0][0][0, 0] = 1
+		with self.assertRaises(Exception):
+			SharedWeights(GetWeightLayouts(MakeWeights(0) + [np.zeros(1 << 20)]), self.weights.GetName())
+	
+	def testReadsAreNeverTorn(self):
+		numVersions = 200
+		def Publish():
+			for version in range(1, numVersions + 1):
+				self.weights.PutWeightsValues(MakeWeights(version), version=version)
+				time.sleep(0.002)
+		publisher = threading.Thread(target=Publish)
+		publisher.start()
+		# reads slower than the publications so they see the copies being rewritten
+		def SlowCopy(weight):
+			time.sleep(0.001)
+			return np.copy(weight)
+		numReads = 0
+		try:
+			while publisher.is_alive() or numReads < 1:
+				readWeights, version = self.readerWeights.ReadWeights(lambda weights: [ SlowCopy(weight) for weight in weights ])
+				# every array of one read comes from the same publication, one that is not older than the version
+				publishedVersion = readWeights[1][0]
+				self.assertGreaterEqual(publishedVersion, version)
+				for readWeight in readWeights:
+					self.assertTrue(np.all(readWeight == publishedVersion))
+				numReads += 1
+		finally:
+			publisher.join()
+		readWeights, version = self.readerWeights.GetWeightsValues()
+		self.assertEqual(version, numVersions)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
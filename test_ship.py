@@ -0,0 +1,42 @@
+import pickle
+import unittest
+from vector2 import Vector2
+from ship import Ship, MoveOutcome
+
+class HitEventPlayer:
+	def __init__(self):
+		self.moveOutcomes = []
+	
+	def ReceiveShipHitEvent(self, ship, moveOutcome):
+		self.moveOutcomes.append(moveOutcome)
+	
+	def GetPlayerName(self):
+		return 'Hit Event Player'
+
+class ShipTest(unittest.TestCase):
+	def testHitLocations(self):
+		ship = Ship(3, HitEventPlayer(), Vector2(2, 4), True)
+		self.assertEqual(ship.HitShip(Vector2(2, 5)), MoveOutcome.HitAliveShip)
+		self.assertEqual(ship.HitShip(Vector2(3, 5)), MoveOutcome.Miss)
+		self.assertEqual(ship.HitShip(Vector2(2, 5)), MoveOutcome.HitShipWhereAlreadyHit)
+		hitLocations = ship.GetHitLocations()
+		self.assertEqual(hitLocations, [False, True, False])
+		# the caller's copy does not change the ship or follow later hits
+		hitLocations[0] = True
+		self.assertEqual(ship.HitShip(Vector2(2, 6)), MoveOutcome.HitAliveShip)
+		self.assertEqual(hitLocations, [True, True, False])
+		self.assertEqual(ship.HitShip(Vector2(2, 4)), MoveOutcome.DestroyedShip)
+		self.assertEqual(ship.GetHitLocations(), [True, True, True])
+		self.assertFalse(ship.IsAlive())
+	
+	def testPickledShipKeepsItsHits(self):
+		ship = Ship(2, HitEventPlayer(), Vector2(0, 0), False)
+		ship.HitShip(Vector2(1, 0))
+		ship.GetHitLocations()
+		unpickledShip = pickle.loads(pickle.dumps(ship))
+		self.assertEqual(unpickledShip.GetHitLocations(), [False, True])
+		self.assertEqual(unpickledShip.GetNumHealthyPieces(), 1)
+		self.assertEqual(unpickledShip.HitShip(Vector2(0, 0)), MoveOutcome.DestroyedShip)
+
+if __name__ == '__main__':
+	unittest.main()
\ No newline at end of file
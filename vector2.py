@@ -4,6 +4,10 @@ class Vector2(tuple):
 	__slots__ = []
 	def __new__(cls, x, y):
 		return tuple.__new__(cls, (x, y))
+	
+	# lets vectors be pickled, e.g. when passed to other processes
+	def __getnewargs__(self):
+		return (self.x, self.y)
 	x = property(itemgetter(0))
 	y = property(itemgetter(1))
 	
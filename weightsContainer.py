@@ -1,4 +1,3 @@
-import keras
 import threading
 
 class WeightsContainer:
@@ -20,6 +19,19 @@ class WeightsContainer:
 			if not self.weights is None:
 				model.set_weights(self.weights)
 	
+	# raw weight arrays for containers that are filled and read without a model, e.g. across the network
+	def PutWeightsValues(self, weights, version=None):
+		with self.weightsLock:
+			self.weights = weights
+			if version is None:
+				self.version += 1
+			else:
+				self.version = version
+	
+	def GetWeightsValues(self):
+		with self.weightsLock:
+			return self.weights, self.version
+	
 	def GetVersion(self):
 		with self.weightsLock:
 			return self.version
\ No newline at end of file